@@ -1,21 +1,50 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash
+from flask import (Flask, jsonify, request, render_template, redirect, url_for, flash, g,
+                   has_app_context, has_request_context, make_response, Response,
+                   stream_with_context)
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from markupsafe import Markup
 import os
-import sqlite3
+import functools
+import time
 import json
+import base64
+import hashlib
+import heapq
+import itertools
+import math
+import re
+import tempfile
 from datetime import datetime
 from decimal import Decimal
 from werkzeug.utils import secure_filename
 
+from db_pool import ConnectionPool
+from replica_router import ReplicaRouter
+import sqlite_profile
+from response_cache import ResponseCache, SharedResponseCache, fcntl
+from fragment_cache import FragmentCache
+from facet_index import FacetIndex
+from catalogue_snapshot import (CatalogueSnapshot, DataVersionWatcher, NotifyWatcher,
+                                SNAPSHOT_SORTS, np)
+from json_stream import iter_json_records, JSONStreamError
+from migrations import run_migrations, SHORTLIST_BUCKET_SECONDS
+from session_cache import SessionShortlistCache
+from report_buffer import ReportWriteBehind
+from designer_repository import DesignerRepository, designer_values
+from metrics import Metrics
+
 app = Flask(__name__)
 CORS(app)
 app.secret_key = 'emptycup_secret_key_2024'  # For flash messages
 
 # File upload configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'json'}
+ALLOWED_EXTENSIONS = {'json', 'ndjson', 'jsonl'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Uploads are parsed as a stream, so memory no longer scales with file size
+MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', '512'))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
 
 # Create upload directory if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -28,6 +57,162 @@ if not USE_SQLITE:
     import psycopg2
     from psycopg2.extras import RealDictCursor
 
+# Optional read replicas (comma-separated, same backend as DATABASE_URL) for GET requests
+DATABASE_READ_URLS = [url.strip() for url in os.getenv('DATABASE_READ_URLS', '').split(',') if url.strip()]
+for url in [url for url in DATABASE_READ_URLS if url.startswith('sqlite') != USE_SQLITE]:
+    print(f"Ignoring read replica {re.sub(r'//[^@/]*@', '//', url)}: not the same backend as DATABASE_URL")
+    DATABASE_READ_URLS.remove(url)
+# least_outstanding (fewest connections in use by this worker) or round_robin
+DATABASE_READ_ROUTING = os.getenv('DATABASE_READ_ROUTING', 'least_outstanding')
+# Seconds a replica that failed a connection or health check is left out
+REPLICA_RETRY_INTERVAL = float(os.getenv('REPLICA_RETRY_INTERVAL', '10'))
+# Reads go to the primary this long after a write (keep it above the replicas' lag)
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+READ_YOUR_WRITES_COOKIE = 'emptycup_primary'
+
+# Connection pool configuration (per process, so per gunicorn worker)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '3600'))
+DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '30'))
+
+# Compiled statements kept per SQLite connection (list filter combinations add up)
+SQLITE_STATEMENT_CACHE = int(os.getenv('SQLITE_STATEMENT_CACHE', '256'))
+# SQLite 'production' profile: WAL, read-only connections for GET requests, one writer per worker
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'default').lower()
+SQLITE_WAL = USE_SQLITE and SQLITE_PROFILE == 'production'
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '5'))
+SQLITE_WRITE_POOL_SIZE = int(os.getenv('SQLITE_WRITE_POOL_SIZE', '1'))
+SQLITE_LOCK_RETRIES = int(os.getenv('SQLITE_LOCK_RETRIES', '3'))
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', '256'))
+SQLITE_CACHE_MB = int(os.getenv('SQLITE_CACHE_MB', '64'))
+SQLITE_CHECKPOINT_INTERVAL = float(os.getenv('SQLITE_CHECKPOINT_INTERVAL', '5'))
+SQLITE_WAL_MAX_MB = int(os.getenv('SQLITE_WAL_MAX_MB', '64'))
+# Server-side prepared statements on Postgres; turn off behind a transaction-mode pgbouncer
+PG_PREPARED_STATEMENTS = os.getenv('PG_PREPARED_STATEMENTS', 'true').lower() == 'true'
+
+# Seconds a starting worker waits for another worker's migration (the SQLite busy timeout is far shorter)
+MIGRATION_LOCK_TIMEOUT = float(os.getenv('MIGRATION_LOCK_TIMEOUT', '600'))
+
+# Bulk JSON import: rows per INSERT batch, each batch committed as one transaction
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+# Per-row error messages kept for the import report (the count is always exact)
+IMPORT_MAX_ERRORS = 100
+
+# Read-through cache of serialized designer list/detail responses
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+# Lifetime of a per-process entry: other workers' writes do not invalidate it
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '5'))
+# File that shares the cache (and its invalidations) between workers; empty for per-process caches.
+# By default one per database in /dev/shm, wherever flock() is available
+RESPONSE_CACHE_SHARED_PATH = os.getenv('RESPONSE_CACHE_SHARED_PATH')
+RESPONSE_CACHE_SLOT_KB = int(os.getenv('RESPONSE_CACHE_SLOT_KB', '128'))
+if RESPONSE_CACHE_SHARED_PATH is None and fcntl is not None:
+    RESPONSE_CACHE_SHARED_PATH = os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'emptycup-response-cache-' + hashlib.sha1(DATABASE_URL.encode('utf-8')).hexdigest()[:12])
+if RESPONSE_CACHE_SHARED_PATH and fcntl is None:
+    print("RESPONSE_CACHE_SHARED_PATH needs flock(); using a per-process response cache")
+    RESPONSE_CACHE_SHARED_PATH = ''
+if RESPONSE_CACHE_SHARED_PATH:
+    response_cache = SharedResponseCache(RESPONSE_CACHE_SHARED_PATH,
+                                         max_entries=RESPONSE_CACHE_SIZE,
+                                         slot_bytes=RESPONSE_CACHE_SLOT_KB * 1024)
+else:
+    response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+# Admin designer list: cards per page, and rendered cards kept per process
+ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', '24'))
+ADMIN_CARD_CACHE_SIZE = int(os.getenv('ADMIN_CARD_CACHE_SIZE', '5000'))
+card_cache = FragmentCache(max_entries=ADMIN_CARD_CACHE_SIZE)
+
+# Designer list pagination and sorting
+DESIGNERS_DEFAULT_LIMIT = 20
+DESIGNERS_MAX_LIMIT = 100
+# GET /api/designers/changes pages are larger: a first sync walks the whole catalogue
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+# sort key -> (column, default order); '$' < '$$' < '$$$' also holds as plain text
+DESIGNER_SORTS = {
+    'rating': ('rating', 'desc'),
+    'price_range': ('price_range', 'asc'),
+    'experience': ('experience', 'desc'),
+    'projects': ('projects', 'desc'),
+    # All-time shortlist count, kept in designer_stats by triggers
+    'popular': ('shortlist_count', 'desc'),
+}
+PRICE_RANGES = ['$', '$$', '$$$']
+# Full-text search paging
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Recently active sessions' shortlists kept per worker for GET /api/shortlists
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '30'))
+session_shortlists = SessionShortlistCache(max_sessions=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+# In-memory facet counts per worker; rebuilt from scratch at most this often when they drift
+FACET_REBUILD_INTERVAL = float(os.getenv('FACET_REBUILD_INTERVAL', '30'))
+facet_index = FacetIndex(rebuild_interval=FACET_REBUILD_INTERVAL)
+
+# Opt-in: each worker answers list requests from a NumPy copy of the designers table
+CATALOGUE_SNAPSHOT = os.getenv('CATALOGUE_SNAPSHOT', 'false').lower() == 'true'
+SNAPSHOT_POLL_INTERVAL = float(os.getenv('SNAPSHOT_POLL_INTERVAL', '0.25'))
+if CATALOGUE_SNAPSHOT and np is None:
+    print("CATALOGUE_SNAPSHOT needs numpy; serving designer lists from the database")
+    CATALOGUE_SNAPSHOT = False
+
+# Opt-in write-behind for reports: acknowledge at once, insert in background batches
+REPORTS_WRITE_BEHIND = os.getenv('REPORTS_WRITE_BEHIND', 'false').lower() == 'true'
+REPORT_QUEUE_SIZE = int(os.getenv('REPORT_QUEUE_SIZE', '10000'))
+REPORT_BATCH_SIZE = int(os.getenv('REPORT_BATCH_SIZE', '500'))
+REPORT_FLUSH_INTERVAL = float(os.getenv('REPORT_FLUSH_INTERVAL', '1.0'))
+
+# Largest offline shortlist queue accepted by POST /api/shortlists/batch
+SHORTLIST_BATCH_MAX = 500
+
+# Largest top-N accepted by GET /api/stats
+STATS_MAX_TOP = 100
+
+# GET /api/designers/trending windows, e.g. 24h or 7d; older shortlist buckets are pruned
+TRENDING_WINDOW_PATTERN = re.compile(r'^(\d+)([hd])$')
+TRENDING_MAX_WINDOW_HOURS = int(os.getenv('TRENDING_MAX_WINDOW_HOURS', str(30 * 24)))
+# Seconds between prunes of expired buckets, per worker, piggybacked on shortlist writes
+TRENDING_PRUNE_INTERVAL = 3600
+last_bucket_prune = 0.0
+
+# Rows fetched per round trip when streaming the full catalogue
+DESIGNER_STREAM_BATCH = int(os.getenv('DESIGNER_STREAM_BATCH', '500'))
+
+# Statements slower than this are logged and counted in /api/metrics (0 disables)
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+metrics = Metrics(slow_query_seconds=SLOW_QUERY_MS / 1000)
+
+def add_timing(bucket, seconds):
+    """Charge time to the current request's Server-Timing bucket (db or serialize)"""
+    if has_request_context():
+        timings = g.get('_timings')
+        if timings is not None:
+            timings[bucket] += seconds
+
+def record_query(shape, seconds):
+    """Repository hook: feed every statement's duration to metrics and Server-Timing"""
+    metrics.observe_query(shape, seconds)
+    add_timing('db', seconds)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that charges jsonify() time to serialize"""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_timing('serialize', time.perf_counter() - started)
+
+app.json = TimedJSONProvider(app)
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
@@ -63,138 +248,422 @@ def validate_designer_data(data):
 
     return errors
 
-def execute_query(cursor, query, params=None):
-    """Execute query with appropriate parameter style"""
-    if USE_SQLITE:
-        # Convert %s to ? for SQLite
-        sqlite_query = query.replace('%s', '?')
-        if params:
-            cursor.execute(sqlite_query, params)
-        else:
-            cursor.execute(sqlite_query)
+def designers_json_array(fragments):
+    """Join precomputed api_json fragments into a JSON array string"""
+    started = time.perf_counter()
+    body = '[' + ','.join(fragments) + ']'
+    add_timing('serialize', time.perf_counter() - started)
+    return body
+
+def json_body(body, status=200):
+    """Response for an already-serialized JSON body"""
+    return Response(body, status=status, mimetype='application/json')
+
+def encode_cursor(sort, order, value, designer_id):
+    """Encode the keyset position after the last row of a page"""
+    if isinstance(value, Decimal):
+        value = float(value)
+    raw = json.dumps([sort, order, value, designer_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort, order):
+    """Decode a cursor produced by encode_cursor for the same sort and order"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, designer_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort or cursor_order != order or not isinstance(designer_id, int):
+        raise ValueError('Cursor does not match the requested sort')
+    # The value is bound against the sort column, so it must have that column's type
+    if sort == 'price_range':
+        valid = isinstance(value, str)
+    elif isinstance(value, bool):
+        valid = False
+    elif sort == 'rating':
+        valid = isinstance(value, (int, float)) and math.isfinite(value)
     else:
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+        valid = isinstance(value, int)
+    if not valid or isinstance(designer_id, bool):
+        raise ValueError('Invalid cursor')
+    return value, designer_id
+
+def encode_change_cursor(change_seq, designer_id):
+    """Encode a position in the designer change feed"""
+    raw = json.dumps([change_seq, designer_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_change_cursor(cursor):
+    """Decode a cursor produced by encode_change_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        change_seq, designer_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(change_seq, int) or not isinstance(designer_id, int):
+        raise ValueError('Invalid cursor')
+    return change_seq, designer_id
+
+def parse_designer_list_args(args):
+    """Validate list query parameters for GET /api/designers"""
+    sort = args.get('sort', 'experience')
+    if sort not in DESIGNER_SORTS:
+        raise ValueError(f'sort must be one of: {", ".join(DESIGNER_SORTS)}')
+    column, default_order = DESIGNER_SORTS[sort]
+    order = args.get('order', default_order)
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+
+    filters = {}
+    if args.get('location'):
+        filters['location'] = args['location']
+    if args.get('price_range'):
+        if args['price_range'] not in PRICE_RANGES:
+            raise ValueError('price_range must be $, $$, or $$$')
+        filters['price_range'] = args['price_range']
+    specialties = [specialty for specialty in args.getlist('specialty') if specialty]
+    if specialties:
+        filters['specialties'] = specialties
+    if args.get('min_rating'):
+        try:
+            filters['min_rating'] = float(args['min_rating'])
+        except ValueError:
+            raise ValueError('min_rating must be a valid number')
+        if not math.isfinite(filters['min_rating']):
+            raise ValueError('min_rating must be a valid number')
+
+    # Without limit or cursor the endpoint keeps returning the plain full array
+    paginate = 'limit' in args or 'cursor' in args
+    limit = None
+    after = None
+    if paginate:
+        try:
+            limit = int(args.get('limit', DESIGNERS_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if not (1 <= limit <= DESIGNERS_MAX_LIMIT):
+            raise ValueError(f'limit must be between 1 and {DESIGNERS_MAX_LIMIT}')
+        if args.get('cursor'):
+            after = decode_cursor(args['cursor'], sort, order)
+
+    return {'sort': sort, 'column': column, 'order': order, 'filters': filters,
+            'paginate': paginate, 'limit': limit, 'after': after}
 
-def get_db_connection():
-    """Get database connection"""
+SQLITE_PATH = DATABASE_URL.replace('sqlite:///', '') if USE_SQLITE else None
+
+def _connect(readonly=False, url=None):
+    """Open a new raw database connection for the pool (to a read replica when url is given)"""
+    if USE_SQLITE:
+        path = url.replace('sqlite:///', '') if url else SQLITE_PATH
+        # Pooled connections move between request threads, one borrower at a time
+        if not SQLITE_WAL:
+            return sqlite_profile.connect(path, readonly=readonly, busy_timeout=SQLITE_BUSY_TIMEOUT,
+                                          cached_statements=SQLITE_STATEMENT_CACHE)
+        return sqlite_profile.connect(path, readonly=readonly, wal=True,
+                                      busy_timeout=SQLITE_BUSY_TIMEOUT,
+                                      mmap_bytes=SQLITE_MMAP_MB * 1024 * 1024,
+                                      cache_kib=SQLITE_CACHE_MB * 1024,
+                                      cached_statements=SQLITE_STATEMENT_CACHE)
+    else:
+        conn = psycopg2.connect(url or DATABASE_URL, cursor_factory=RealDictCursor)
+        if readonly:
+            conn.set_session(readonly=True)
+        return conn
+
+repository = DesignerRepository(USE_SQLITE, prepare=PG_PREPARED_STATEMENTS, on_query=record_query,
+                                lock_retries=SQLITE_LOCK_RETRIES if SQLITE_WAL else 0)
+
+# SQLite allows one writer at a time anyway; in the production profile each worker
+# funnels its writes through SQLITE_WRITE_POOL_SIZE connections and reads never wait for them
+db_pool = ConnectionPool(_connect,
+                         max_size=SQLITE_WRITE_POOL_SIZE if SQLITE_WAL else DB_POOL_SIZE,
+                         timeout=DB_POOL_TIMEOUT,
+                         max_idle=DB_POOL_MAX_IDLE,
+                         max_lifetime=DB_POOL_MAX_LIFETIME,
+                         ping_after=DB_POOL_PING_AFTER)
+read_pool = None
+wal_checkpointer = None
+if SQLITE_WAL:
+    read_pool = ConnectionPool(functools.partial(_connect, readonly=True),
+                               max_size=DB_POOL_SIZE,
+                               timeout=DB_POOL_TIMEOUT,
+                               max_idle=DB_POOL_MAX_IDLE,
+                               max_lifetime=DB_POOL_MAX_LIFETIME,
+                               ping_after=DB_POOL_PING_AFTER)
+    wal_checkpointer = sqlite_profile.WalCheckpointer(SQLITE_PATH,
+                                                      interval=SQLITE_CHECKPOINT_INTERVAL,
+                                                      max_wal_bytes=SQLITE_WAL_MAX_MB * 1024 * 1024)
+
+replica_router = None
+if DATABASE_READ_URLS:
+    replica_router = ReplicaRouter(
+        [(re.sub(r'//[^@/]*@', '//', url),
+          ConnectionPool(functools.partial(_connect, readonly=True, url=url),
+                         max_size=DB_POOL_SIZE,
+                         timeout=DB_POOL_TIMEOUT,
+                         max_idle=DB_POOL_MAX_IDLE,
+                         max_lifetime=DB_POOL_MAX_LIFETIME,
+                         ping_after=DB_POOL_PING_AFTER))
+         for url in DATABASE_READ_URLS],
+        strategy=DATABASE_READ_ROUTING,
+        retry_interval=REPLICA_RETRY_INTERVAL,
+        window=READ_YOUR_WRITES_SECONDS)
+
+def reads_pinned_to_primary():
+    """True when this request has to see a recent write, which replicas may not have yet"""
+    replica_router.note_generation(response_cache.generation)
+    user_session = None
+    if has_request_context():
+        if request.cookies.get(READ_YOUR_WRITES_COOKIE):
+            return True
+        user_session = request.args.get('user_session')
+    return replica_router.pinned(user_session)
+
+def note_write(user_session=None):
+    """After a committed write, keep this client's reads on the primary for a while"""
+    if replica_router is not None:
+        replica_router.note_write(user_session)
+        # Other workers only learn about it from the cookie
+        g.read_your_writes = True
+
+def get_db_connection(readonly=None, primary=False):
+    """Borrow a pooled database connection; conn.close() returns it to the pool.
+
+    GET and HEAD requests (or readonly=True) read from a replica when
+    DATABASE_READ_URLS is set, unless primary=True or the client wrote
+    recently; with the production SQLite profile the primary is read
+    through read-only connections. Everything else borrows a writer.
+    """
+    if readonly is None:
+        readonly = has_request_context() and request.method in ('GET', 'HEAD')
+    if wal_checkpointer is not None:
+        wal_checkpointer.ensure_started()
+    pool = read_pool if readonly and read_pool is not None else db_pool
     try:
-        if USE_SQLITE:
-            db_path = DATABASE_URL.replace('sqlite:///', '')
-            conn = sqlite3.connect(db_path)
-            conn.row_factory = sqlite3.Row  # This makes rows behave like dictionaries
-            return conn
-        else:
-            conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-            return conn
+        conn = None
+        if readonly and replica_router is not None and not primary:
+            conn = replica_router.acquire(pinned=reads_pinned_to_primary())
+        if conn is None:
+            conn = pool.acquire()
     except Exception as e:
         print(f"Database connection error: {e}")
         return None
 
+    if has_app_context():
+        # Remember the borrow so teardown can return it if a handler bails out early
+        g.setdefault('_db_conns', []).append(conn)
+    return conn
+
+def snapshot_watcher():
+    """Change detector for the catalogue snapshot: data_version on SQLite, LISTEN on Postgres"""
+    if USE_SQLITE:
+        return DataVersionWatcher(SQLITE_PATH)
+    return NotifyWatcher(DATABASE_URL)
+
+# The snapshot must load what its watcher saw change, so it reads from the primary
+catalogue_snapshot = CatalogueSnapshot(functools.partial(get_db_connection, readonly=True, primary=True),
+                                       repository, snapshot_watcher,
+                                       poll_interval=SNAPSHOT_POLL_INTERVAL,
+                                       on_change=response_cache.invalidate)
+
+def wants_stream():
+    """True when the client asked for a streamed (chunked) response"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def cached_response(view):
+    """Serve a GET view from the response cache, answering If-None-Match with 304"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if wants_stream():
+            # Streamed dumps bypass the cache; buffering them would defeat the point
+            return view(*args, **kwargs)
+        if request.args.get('sort') == 'popular':
+            # Shortlist toggles reorder this without invalidating the cache
+            return view(*args, **kwargs)
+
+        key = request.path + '?' + '&'.join(
+            f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        entry = response_cache.get(key)
+        if entry is None:
+            generation = response_cache.generation
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or g.pop('skip_response_cache', False):
+                return response
+            entry = response_cache.put(key, response.get_data(), response.mimetype, generation)
+
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.vary.add('Accept')
+        response.set_etag(entry.etag)
+        # Let browsers keep the body but revalidate it on every use
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+        if response.status_code == 304:
+            response_cache.record_not_modified()
+        return response
+    return wrapper
+
+@app.before_request
+def start_request_timer():
+    g._request_started = time.perf_counter()
+    g._timings = {'db': 0.0, 'serialize': 0.0}
+
+@app.after_request
+def record_request_timing(response):
+    """Add Server-Timing and record the request in the per-route histograms"""
+    started = g.get('_request_started')
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    timings = g._timings
+    # For streamed bodies this covers setup only; rows are sent after this point
+    response.headers['Server-Timing'] = (f'db;dur={timings["db"] * 1000:.2f}, '
+                                         f'serialize;dur={timings["serialize"] * 1000:.2f}, '
+                                         f'total;dur={total * 1000:.2f}')
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.observe_request(route, request.method, response.status_code, total)
+    return response
+
+@app.after_request
+def set_read_your_writes_cookie(response):
+    """Send this client's reads to the primary in every worker until replicas catch up"""
+    if g.get('read_your_writes'):
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, '1', max_age=max(1, round(READ_YOUR_WRITES_SECONDS)),
+                            httponly=True, samesite='Lax')
+    return response
+
+@app.teardown_appcontext
+def release_db_connections(exc):
+    """Return any connection a handler forgot to close"""
+    for conn in g.pop('_db_conns', []):
+        conn.close()
+
+def import_designers(conn, records, batch_size=IMPORT_BATCH_SIZE):
+    """Validate designer records and insert the valid ones in batched transactions.
+
+    records may be any iterable, including a streaming parser; only one
+    batch is held at a time. Returns (success_count, error_count, errors,
+    parse_error) where errors holds the per-designer messages shown in the
+    upload report and parse_error describes malformed input that stopped
+    the import early (records before it are still inserted).
+    """
+    success_count = 0
+    error_count = 0
+    errors = []
+    parse_error = None
+
+    def report(i, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append((i, message))
+
+    def flush(batch):
+        nonlocal success_count
+        try:
+            repository.insert_many(conn, [values for _, _, values in batch])
+            conn.commit()
+            success_count += len(batch)
+        except Exception:
+            conn.rollback()
+            # Retry the failed batch row by row so the report names the bad designers
+            for i, designer_data, values in batch:
+                try:
+                    repository.insert_many(conn, [values])
+                    conn.commit()
+                    success_count += 1
+                except Exception as e:
+                    conn.rollback()
+                    report(i, f'Designer {i+1} ({designer_data.get("name", "Unknown")}): {str(e)}')
+
+    batch = []
+    try:
+        for i, designer_data in enumerate(records):
+            if not isinstance(designer_data, dict):
+                report(i, f'Designer {i+1}: Designer must be a JSON object')
+                continue
+
+            validation_errors = validate_designer_data(designer_data)
+            if validation_errors:
+                report(i, f'Designer {i+1}: {", ".join(validation_errors)}')
+                continue
+
+            batch.append((i, designer_data, designer_values(designer_data)))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+    except JSONStreamError as e:
+        parse_error = str(e)
+
+    if batch:
+        flush(batch)
+
+    # Batch retries report late; keep the messages in file order
+    errors.sort(key=lambda item: item[0])
+    return success_count, error_count, [message for _, message in errors], parse_error
+
+def search_terms(q):
+    """Split a search string into plain word tokens, dropping query syntax"""
+    return re.findall(r'\w+', q.lower())
+
+def insert_reports(reports):
+    """Insert buffered reports in one transaction; returns how many could not be stored"""
+    conn = get_db_connection()
+    if not conn:
+        return len(reports)
+
+    failed = 0
+    try:
+        repository.insert_reports(conn, reports)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        # One bad report must not sink the rest of the batch
+        for report in reports:
+            try:
+                repository.insert_reports(conn, [report])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Error writing report for designer {report[0]}: {e}")
+                failed += 1
+    finally:
+        conn.close()
+    return failed
+
+report_writer = ReportWriteBehind(insert_reports,
+                                  max_queue=REPORT_QUEUE_SIZE,
+                                  batch_size=REPORT_BATCH_SIZE,
+                                  flush_interval=REPORT_FLUSH_INTERVAL)
+
+def migrate_database():
+    """Bring the schema up to date; safe to call from every worker at once"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        run_migrations(conn.raw, USE_SQLITE, lock_timeout=MIGRATION_LOCK_TIMEOUT)
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Database migration error: {e}")
+        conn.invalidate()
+        return False
+
 def init_database():
     """Initialize database with sample data"""
+    if not migrate_database():
+        return False
+
     conn = get_db_connection()
     if not conn:
         return False
 
     try:
-        cur = conn.cursor()
-
-        # Create designers table
-        if USE_SQLITE:
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS designers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    rating REAL NOT NULL,
-                    description TEXT NOT NULL,
-                    projects INTEGER NOT NULL,
-                    experience INTEGER NOT NULL,
-                    price_range TEXT NOT NULL,
-                    phone1 TEXT NOT NULL,
-                    phone2 TEXT NOT NULL,
-                    location TEXT NOT NULL,
-                    specialties TEXT NOT NULL,
-                    portfolio TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-        else:
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS designers (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    rating DECIMAL(2,1) NOT NULL,
-                    description TEXT NOT NULL,
-                    projects INTEGER NOT NULL,
-                    experience INTEGER NOT NULL,
-                    price_range VARCHAR(10) NOT NULL,
-                    phone1 VARCHAR(20) NOT NULL,
-                    phone2 VARCHAR(20) NOT NULL,
-                    location VARCHAR(100) NOT NULL,
-                    specialties JSONB NOT NULL,
-                    portfolio JSONB NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-        # Create shortlists table
-        if USE_SQLITE:
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS shortlists (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    designer_id INTEGER REFERENCES designers(id),
-                    user_session TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(designer_id, user_session)
-                )
-            ''')
-
-            # Create reports table
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    designer_id INTEGER REFERENCES designers(id),
-                    reason TEXT NOT NULL,
-                    description TEXT,
-                    user_session TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-        else:
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS shortlists (
-                    id SERIAL PRIMARY KEY,
-                    designer_id INTEGER REFERENCES designers(id),
-                    user_session VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(designer_id, user_session)
-                )
-            ''')
-
-            # Create reports table
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS reports (
-                    id SERIAL PRIMARY KEY,
-                    designer_id INTEGER REFERENCES designers(id),
-                    reason VARCHAR(100) NOT NULL,
-                    description TEXT,
-                    user_session VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
         # Check if data already exists
-        cur.execute('SELECT COUNT(*) as count FROM designers')
-        result = cur.fetchone()
-        # Both SQLite and PostgreSQL with RealDictCursor return dict-like objects
-        count = result['count']
-
-        if count == 0:
+        if repository.count(conn) == 0:
             # Insert sample data
             sample_designers = [
                 {
@@ -207,12 +676,12 @@ def init_database():
                     'phone1': '+91 - 984532853',
                     'phone2': '+91 - 984532854',
                     'location': 'Bangalore',
-                    'specialties': json.dumps(['Residential', 'Commercial', 'Modern']),
-                    'portfolio': json.dumps([
+                    'specialties': ['Residential', 'Commercial', 'Modern'],
+                    'portfolio': [
                         'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=400',
                         'https://images.unsplash.com/photo-1522708323590-d24dbb6b0267?w=400',
                         'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=400'
-                    ])
+                    ]
                 },
                 {
                     'name': 'Studio - D3',
@@ -224,12 +693,12 @@ def init_database():
                     'phone1': '+91 - 984532853',
                     'phone2': '+91 - 984532854',
                     'location': 'Bangalore',
-                    'specialties': json.dumps(['Luxury', 'Residential', 'Contemporary']),
-                    'portfolio': json.dumps([
+                    'specialties': ['Luxury', 'Residential', 'Contemporary'],
+                    'portfolio': [
                         'https://images.unsplash.com/photo-1618221195710-dd6b41faaea8?w=400',
                         'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=400',
                         'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=400'
-                    ])
+                    ]
                 },
                 {
                     'name': 'House of designs',
@@ -241,40 +710,18 @@ def init_database():
                     'phone1': '+91 - 984532853',
                     'phone2': '+91 - 984532854',
                     'location': 'Mumbai',
-                    'specialties': json.dumps(['Minimalist', 'Modern', 'Residential']),
-                    'portfolio': json.dumps([
+                    'specialties': ['Minimalist', 'Modern', 'Residential'],
+                    'portfolio': [
                         'https://images.unsplash.com/photo-1522708323590-d24dbb6b0267?w=400',
                         'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=400',
                         'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=400'
-                    ])
+                    ]
                 }
             ]
 
-            for designer in sample_designers:
-                if USE_SQLITE:
-                    cur.execute('''
-                        INSERT INTO designers (name, rating, description, projects, experience,
-                                             price_range, phone1, phone2, location, specialties, portfolio)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (designer['name'], designer['rating'], designer['description'],
-                          designer['projects'], designer['experience'], designer['price_range'],
-                          designer['phone1'], designer['phone2'], designer['location'],
-                          designer['specialties'], designer['portfolio']))
-                else:
-                    # For PostgreSQL, convert JSON strings to actual JSON objects
-                    designer_copy = designer.copy()
-                    designer_copy['specialties'] = json.loads(designer['specialties'])
-                    designer_copy['portfolio'] = json.loads(designer['portfolio'])
-
-                    cur.execute('''
-                        INSERT INTO designers (name, rating, description, projects, experience,
-                                             price_range, phone1, phone2, location, specialties, portfolio)
-                        VALUES (%(name)s, %(rating)s, %(description)s, %(projects)s, %(experience)s,
-                               %(price_range)s, %(phone1)s, %(phone2)s, %(location)s, %(specialties)s, %(portfolio)s)
-                    ''', designer_copy)
+            repository.insert_many(conn, [designer_values(designer) for designer in sample_designers])
 
         conn.commit()
-        cur.close()
         conn.close()
         return True
 
@@ -288,43 +735,36 @@ def init_database():
 @app.route('/', methods=['GET'])
 def admin_dashboard():
     """Admin dashboard for managing designers"""
-    # Get current designers count using the same logic as the working API endpoint
     conn = get_db_connection()
-    designer_count = 0
+    totals = {'designers': 0, 'shortlists': 0, 'reports': 0}
     recent_designers = []
+    top_shortlisted = []
 
     if not conn:
         return render_template('admin_dashboard.html',
-                             designer_count=designer_count,
-                             recent_designers=recent_designers)
+                             designer_count=totals['designers'],
+                             totals=totals,
+                             recent_designers=recent_designers,
+                             top_shortlisted=top_shortlisted)
 
     try:
-        cur = conn.cursor()
-
-        # Use the same query pattern as the working API endpoint
-        cur.execute('SELECT COUNT(*) as count FROM designers')
-        result = cur.fetchone()
-        designer_count = result['count']
+        # Trigger-maintained counters: no COUNT(*) scan per page load
+        totals = repository.totals(conn)
+        recent_designers = repository.recent(conn, 5)
+        top_shortlisted = repository.top_shortlisted(conn, 5)
 
-        # Get recent designers
-        cur.execute('''
-            SELECT id, name, rating, location, created_at
-            FROM designers
-            ORDER BY id DESC
-            LIMIT 5
-        ''')
-        recent_designers = cur.fetchall()
-
-        cur.close()
         conn.close()
 
     except Exception as e:
+        print(f"Error loading dashboard: {e}")
         if conn:
             conn.close()
 
     return render_template('admin_dashboard.html',
-                         designer_count=designer_count,
-                         recent_designers=recent_designers)
+                         designer_count=totals['designers'],
+                         totals=totals,
+                         recent_designers=recent_designers,
+                         top_shortlisted=top_shortlisted)
 
 @app.route('/api/info', methods=['GET'])
 def api_info():
@@ -336,8 +776,15 @@ def api_info():
             'health': '/api/health',
             'designers': '/api/designers',
             'designer_detail': '/api/designers/{id}',
+            'search': '/api/designers/search?q={query}',
+            'facets': '/api/designers/facets',
             'shortlist': '/api/designers/{id}/shortlist',
-            'report': '/api/designers/{id}/report'
+            'shortlists': '/api/shortlists?user_session={session}',
+            'metrics': '/api/metrics',
+            'report': '/api/designers/{id}/report',
+            'stats': '/api/stats',
+            'trending': '/api/designers/trending?window={24h|7d}',
+            'designer_stats': '/api/designers/{id}/stats'
         },
         'admin_interface': '/',
         'documentation': 'See README.md for full API documentation'
@@ -346,51 +793,209 @@ def api_info():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'EmptyCup API is running'})
+    return jsonify({'status': 'healthy', 'message': 'EmptyCup API is running',
+                    'db_pool': db_pool.stats(),
+                    'response_cache': response_cache.stats(),
+                    'session_cache': session_shortlists.stats(),
+                    'card_cache': card_cache.stats(),
+                    'facet_index': facet_index.stats(),
+                    'catalogue_snapshot': catalogue_snapshot.stats() if CATALOGUE_SNAPSHOT else None,
+                    'read_pool': read_pool.stats() if read_pool is not None else None,
+                    'sqlite_wal': wal_checkpointer.stats() if wal_checkpointer is not None else None,
+                    'sqlite_lock_retries': repository.lock_retry_count(),
+                    'replicas': replica_router.stats() if replica_router is not None else None,
+                    'prepared_statements': repository.prepared_count(),
+                    'report_queue': report_writer.stats() if REPORTS_WRITE_BEHIND else None})
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request and query timings for this worker in Prometheus text format"""
+    gauges = {}
+    stats = {'db_pool': db_pool.stats(),
+             'response_cache': response_cache.stats(),
+             'session_cache': session_shortlists.stats(),
+             'card_cache': card_cache.stats(),
+             'facet_index': facet_index.stats()}
+    if REPORTS_WRITE_BEHIND:
+        stats['report_queue'] = report_writer.stats()
+    if CATALOGUE_SNAPSHOT:
+        stats['catalogue_snapshot'] = catalogue_snapshot.stats()
+    if SQLITE_WAL:
+        stats['read_pool'] = read_pool.stats()
+        stats['sqlite_wal'] = wal_checkpointer.stats()
+    if replica_router is not None:
+        stats['replicas'] = replica_router.stats()
+    for prefix, values in stats.items():
+        for key, value in values.items():
+            gauges[f'emptycup_{prefix}_{key}'] = value
+    gauges['emptycup_prepared_statements'] = repository.prepared_count()
+    gauges['emptycup_sqlite_lock_retries'] = repository.lock_retry_count()
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Catalogue totals and the most shortlisted designers, from precomputed counters"""
+    try:
+        top = int(request.args.get('top', 10))
+    except ValueError:
+        return jsonify({'error': 'top must be an integer'}), 400
+    if not (0 <= top <= STATS_MAX_TOP):
+        return jsonify({'error': f'top must be between 0 and {STATS_MAX_TOP}'}), 400
 
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
 
+    try:
+        totals = repository.totals(conn)
+        top_shortlisted = repository.top_shortlisted(conn, top) if top else []
+        conn.close()
 
-@app.route('/api/designers', methods=['GET'])
-def get_designers():
-    """Get all designers"""
+        return jsonify({
+            'designers': totals['designers'],
+            'shortlists': totals['shortlists'],
+            'reports': totals['reports'],
+            'top_shortlisted': [{'id': designer_id, 'name': name,
+                                 'shortlist_count': shortlist_count,
+                                 'report_count': report_count}
+                                for designer_id, name, shortlist_count, report_count in top_shortlisted]
+        })
+
+    except Exception as e:
+        print(f"Error fetching stats: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': 'Failed to fetch stats'}), 500
+
+def window_start_bucket(hours):
+    """First shortlist bucket of a window ending now; the current, partly filled bucket is its last"""
+    return int(time.time()) // SHORTLIST_BUCKET_SECONDS - hours * 3600 // SHORTLIST_BUCKET_SECONDS + 1
+
+def prune_shortlist_buckets(conn):
+    """Drop trending buckets older than the longest window, at most once an interval per worker"""
+    global last_bucket_prune
+    now = time.monotonic()
+    if now - last_bucket_prune < TRENDING_PRUNE_INTERVAL:
+        return
+    last_bucket_prune = now
+    repository.prune_shortlist_buckets(conn, window_start_bucket(TRENDING_MAX_WINDOW_HOURS))
+
+def parse_trending_window(value):
+    """Hours in a window like 24h or 7d"""
+    match = TRENDING_WINDOW_PATTERN.match(value)
+    if not match:
+        raise ValueError('window must look like 24h or 7d')
+    hours = int(match.group(1)) * (24 if match.group(2) == 'd' else 1)
+    if not (1 <= hours <= TRENDING_MAX_WINDOW_HOURS):
+        raise ValueError(f'window must be between 1h and {TRENDING_MAX_WINDOW_HOURS}h')
+    return hours
+
+@app.route('/api/designers/trending', methods=['GET'])
+def trending_designers():
+    """Most shortlisted designers, all time or within a recent window"""
+    try:
+        limit = int(request.args.get('limit', DESIGNERS_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not (1 <= limit <= DESIGNERS_MAX_LIMIT):
+        return jsonify({'error': f'limit must be between 1 and {DESIGNERS_MAX_LIMIT}'}), 400
+
+    # Without a window the ranking is all-time, straight off designer_stats
+    window = request.args.get('window') or None
+    since_bucket = None
+    if window:
+        try:
+            since_bucket = window_start_bucket(parse_trending_window(window))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        # (shortlists, api_json) rows, ranked by the database
+        rows = repository.popular(conn, limit, since_bucket)
+        conn.close()
+
+        items = ('{"shortlists":' + str(count) + ',"designer":' + api_json + '}'
+                 for count, api_json in rows)
+        return json_body('{"window":' + json.dumps(window) +
+                         ',"designers":' + designers_json_array(items) + '}')
+
+    except Exception as e:
+        print(f"Error fetching trending designers: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': 'Failed to fetch trending designers'}), 500
+
+@app.route('/api/designers/<int:designer_id>/stats', methods=['GET'])
+def get_designer_stats(designer_id):
+    """Shortlist and report counts for one designer"""
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cur = conn.cursor()
-        cur.execute('''
-            SELECT id, name, rating, description, projects, experience,
-                   price_range, phone1, phone2, location,
-                   specialties, portfolio
-            FROM designers
-            ORDER BY experience DESC
-        ''')
-
-        designers = cur.fetchall()
-
-        # Convert to list of dictionaries and parse JSON fields
-        result = []
-        for designer in designers:
-            designer_dict = dict(designer)
-            # Add priceRange alias for frontend compatibility
-            designer_dict['priceRange'] = designer_dict['price_range']
-            # Convert Decimal to float for JSON serialization
-            if isinstance(designer_dict.get('rating'), Decimal):
-                designer_dict['rating'] = float(designer_dict['rating'])
-            # Handle JSON fields based on database type
-            if USE_SQLITE:
-                designer_dict['specialties'] = json.loads(designer_dict['specialties'])
-                designer_dict['portfolio'] = json.loads(designer_dict['portfolio'])
-            else:
-                # PostgreSQL JSONB fields are already parsed
-                pass
-            result.append(designer_dict)
-
-        cur.close()
+        counts = repository.designer_counts(conn, designer_id)
         conn.close()
 
-        return jsonify(result)
+        if counts is None:
+            return jsonify({'error': 'Designer not found'}), 404
+
+        return jsonify({
+            'designer_id': designer_id,
+            'shortlist_count': counts[0],
+            'report_count': counts[1]
+        })
+
+    except Exception as e:
+        print(f"Error fetching designer stats: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': 'Failed to fetch designer stats'}), 500
+
+@app.route('/api/designers', methods=['GET'])
+@cached_response
+def get_designers():
+    """Get designers, optionally filtered, sorted and keyset-paginated"""
+    try:
+        params = parse_designer_list_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if wants_stream():
+        return stream_designers(params)
+
+    snapshot = catalogue_snapshot.current() if CATALOGUE_SNAPSHOT else None
+    if snapshot is not None and params['column'] in SNAPSHOT_SORTS:
+        conn = None
+    else:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        # (id, sort value, api_json) tuples
+        if conn is None:
+            designers = snapshot.list_page(params)
+        else:
+            designers = repository.list_page(conn, params)
+            conn.close()
+
+        if not params['paginate']:
+            return json_body(designers_json_array(row[2] for row in designers))
+
+        next_cursor = None
+        if len(designers) > params['limit']:
+            designers = designers[:params['limit']]
+            last_id, last_value, _ = designers[-1]
+            next_cursor = encode_cursor(params['sort'], params['order'], last_value, last_id)
+
+        return json_body('{"designers":' + designers_json_array(row[2] for row in designers) +
+                         ',"next_cursor":' + json.dumps(next_cursor) +
+                         ',"limit":' + str(params['limit']) + '}')
 
     except Exception as e:
         print(f"Error fetching designers: {e}")
@@ -398,6 +1003,52 @@ def get_designers():
             conn.close()
         return jsonify({'error': 'Failed to fetch designers'}), 500
 
+def stream_designers(params):
+    """Stream every matching designer as NDJSON or a chunked JSON array"""
+    ndjson = (request.args.get('stream') == 'ndjson' or
+              request.accept_mimetypes.best == 'application/x-ndjson')
+    # A cursor may still pick the starting point, but a stream never stops at a page
+    params = dict(params, limit=None)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cur = repository.open_stream(conn, params, DESIGNER_STREAM_BATCH)
+    except Exception as e:
+        print(f"Error streaming designers: {e}")
+        conn.close()
+        return jsonify({'error': 'Failed to fetch designers'}), 500
+
+    def generate():
+        try:
+            separator = '\n' if ndjson else ','
+            first = True
+            if not ndjson:
+                yield '['
+            while True:
+                rows = cur.fetchmany(DESIGNER_STREAM_BATCH)
+                if not rows:
+                    break
+                chunk = separator.join(row[2] for row in rows)
+                if ndjson:
+                    yield chunk + '\n'
+                else:
+                    yield chunk if first else ',' + chunk
+                first = False
+            if not ndjson:
+                yield ']'
+        except Exception as e:
+            # Headers are already sent; all we can do is cut the stream short
+            print(f"Error streaming designers: {e}")
+        finally:
+            cur.close()
+            conn.close()
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @app.route('/api/designers', methods=['POST'])
 def add_designer():
     """Add a new designer"""
@@ -416,42 +1067,12 @@ def add_designer():
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cur = conn.cursor()
-
-        # Convert arrays to JSON strings
-        specialties_json = json.dumps(data['specialties']) if isinstance(data['specialties'], list) else data['specialties']
-        portfolio_json = json.dumps(data['portfolio']) if isinstance(data['portfolio'], list) else data['portfolio']
-
-        if USE_SQLITE:
-            cur.execute('''
-                INSERT INTO designers (name, rating, description, projects, experience,
-                                     price_range, phone1, phone2, location, specialties, portfolio)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (data['name'], data['rating'], data['description'],
-                  data['projects'], data['experience'], data['price_range'],
-                  data['phone1'], data['phone2'], data['location'],
-                  specialties_json, portfolio_json))
-        else:
-            cur.execute('''
-                INSERT INTO designers (name, rating, description, projects, experience,
-                                     price_range, phone1, phone2, location, specialties, portfolio)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (data['name'], data['rating'], data['description'],
-                  data['projects'], data['experience'], data['price_range'],
-                  data['phone1'], data['phone2'], data['location'],
-                  specialties_json, portfolio_json))
+        designer_id = repository.insert(conn, data)
 
         conn.commit()
-
-        # Get the ID of the newly inserted designer
-        if USE_SQLITE:
-            designer_id = cur.lastrowid
-        else:
-            cur.execute('SELECT LASTVAL()')
-            result = cur.fetchone()
-            designer_id = result['lastval']
-
-        cur.close()
+        response_cache.invalidate()
+        catalogue_snapshot.mark_stale()
+        note_write()
         conn.close()
 
         return jsonify({
@@ -466,49 +1087,134 @@ def add_designer():
             conn.close()
         return jsonify({'error': 'Failed to add designer'}), 500
 
-@app.route('/api/designers/<int:designer_id>', methods=['GET'])
-def get_designer(designer_id):
-    """Get specific designer by ID"""
+@app.route('/api/designers/facets', methods=['GET'])
+def designer_facets():
+    """Designer counts per location, price range and specialty, optionally filtered"""
+    try:
+        filters = parse_designer_list_args(request.args)['filters']
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cur = conn.cursor()
-        execute_query(cur, '''
-            SELECT id, name, rating, description, projects, experience,
-                   price_range, phone1, phone2, location,
-                   specialties, portfolio
-            FROM designers
-            WHERE id = %s
-        ''', (designer_id,))
+        # Loads only designers added since the last call; the counter check catches the rest
+        facet_index.refresh(functools.partial(repository.facet_designers, conn),
+                            functools.partial(repository.specialty_batches, conn),
+                            repository.totals(conn)['designers'])
+        conn.close()
+    except Exception as e:
+        print(f"Error refreshing facet index: {e}")
+        conn.close()
+        return jsonify({'error': 'Failed to fetch facets'}), 500
 
-        designer = cur.fetchone()
+    return jsonify(facet_index.counts(filters))
 
-        if not designer:
-            cur.close()
+@app.route('/api/designers/changes', methods=['GET'])
+@cached_response
+def designer_changes():
+    """Designers added, modified or deleted since a change cursor"""
+    try:
+        after = decode_change_cursor(request.args['since']) if request.args.get('since') else (0, 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        limit = int(request.args.get('limit', CHANGES_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not (1 <= limit <= CHANGES_MAX_LIMIT):
+        return jsonify({'error': f'limit must be between 1 and {CHANGES_MAX_LIMIT}'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        designers, tombstones, held_back = repository.changes(conn, after, limit)
+        conn.close()
+
+        # (change_seq, id, api_json) in change order, api_json None for a deletion
+        changes = list(itertools.islice(
+            heapq.merge(designers, ((change_seq, designer_id, None) for change_seq, designer_id in tombstones),
+                        key=lambda row: (row[0], row[1])),
+            limit + 1))
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        cursor = encode_change_cursor(*changes[-1][:2]) if changes else encode_change_cursor(*after)
+        if held_back:
+            # Newer changes are waiting on an older transaction; a cached copy would hide them
+            g.skip_response_cache = True
+
+        return json_body('{"designers":' +
+                         designers_json_array(row[2] for row in changes if row[2] is not None) +
+                         ',"deleted":' + json.dumps([row[1] for row in changes if row[2] is None]) +
+                         ',"cursor":' + json.dumps(cursor) +
+                         ',"has_more":' + json.dumps(has_more) + '}')
+
+    except Exception as e:
+        print(f"Error fetching designer changes: {e}")
+        if conn:
             conn.close()
-            return jsonify({'error': 'Designer not found'}), 404
+        return jsonify({'error': 'Failed to fetch designer changes'}), 500
+
+@app.route('/api/designers/search', methods=['GET'])
+@cached_response
+def search_designers():
+    """Ranked full-text search over designer name, description and specialties"""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if not (1 <= limit <= SEARCH_MAX_LIMIT) or offset < 0:
+        return jsonify({'error': f'limit must be between 1 and {SEARCH_MAX_LIMIT} and offset non-negative'}), 400
 
-        # Convert to dictionary and parse JSON fields
-        designer_dict = dict(designer)
-        # Add priceRange alias for frontend compatibility
-        designer_dict['priceRange'] = designer_dict['price_range']
-        # Convert Decimal to float for JSON serialization
-        if isinstance(designer_dict.get('rating'), Decimal):
-            designer_dict['rating'] = float(designer_dict['rating'])
-        # Handle JSON fields based on database type
-        if USE_SQLITE:
-            designer_dict['specialties'] = json.loads(designer_dict['specialties'])
-            designer_dict['portfolio'] = json.loads(designer_dict['portfolio'])
-        else:
-            # PostgreSQL JSONB fields are already parsed
-            pass
+    terms = search_terms(q)
+    if not terms:
+        return jsonify({'designers': [], 'next_offset': None, 'limit': limit})
 
-        cur.close()
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        # Every term must match; one extra row tells whether another page exists
+        designers = repository.search(conn, terms, limit + 1, offset)
         conn.close()
 
-        return jsonify(designer_dict)
+        next_offset = offset + limit if len(designers) > limit else None
+        return json_body('{"designers":' + designers_json_array(designers[:limit]) +
+                         ',"next_offset":' + json.dumps(next_offset) +
+                         ',"limit":' + str(limit) + '}')
+
+    except Exception as e:
+        print(f"Error searching designers: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': 'Failed to search designers'}), 500
+
+@app.route('/api/designers/<int:designer_id>', methods=['GET'])
+@cached_response
+def get_designer(designer_id):
+    """Get specific designer by ID"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        designer = repository.get_json(conn, designer_id)
+
+        conn.close()
+
+        if designer is None:
+            return jsonify({'error': 'Designer not found'}), 404
+
+        return json_body(designer)
 
     except Exception as e:
         print(f"Error fetching designer: {e}")
@@ -527,34 +1233,17 @@ def toggle_shortlist(designer_id):
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cur = conn.cursor()
-
-        # Check if already shortlisted
-        execute_query(cur, '''
-            SELECT id FROM shortlists
-            WHERE designer_id = %s AND user_session = %s
-        ''', (designer_id, user_session))
-
-        existing = cur.fetchone()
-
-        if existing:
-            # Remove from shortlist
-            execute_query(cur, '''
-                DELETE FROM shortlists
-                WHERE designer_id = %s AND user_session = %s
-            ''', (designer_id, user_session))
-            shortlisted = False
-        else:
-            # Add to shortlist
-            execute_query(cur, '''
-                INSERT INTO shortlists (designer_id, user_session)
-                VALUES (%s, %s)
-            ''', (designer_id, user_session))
-            shortlisted = True
+        shortlisted = repository.toggle_shortlist(conn, designer_id, user_session)
+        if shortlisted is None:
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': 'Designer not found'}), 404
+        prune_shortlist_buckets(conn)
 
         conn.commit()
-        cur.close()
         conn.close()
+        session_shortlists.apply(user_session, designer_id, shortlisted)
+        note_write(user_session)
 
         return jsonify({
             'success': True,
@@ -569,6 +1258,95 @@ def toggle_shortlist(designer_id):
             conn.close()
         return jsonify({'error': 'Failed to toggle shortlist'}), 500
 
+@app.route('/api/shortlists', methods=['GET'])
+def get_shortlists():
+    """Get the designer ids shortlisted by a session"""
+    user_session = request.args.get('user_session')
+    if not user_session:
+        return jsonify({'error': 'Query parameter user_session is required'}), 400
+
+    designer_ids = session_shortlists.get(user_session)
+    if designer_ids is not None:
+        return jsonify({'user_session': user_session, 'designer_ids': designer_ids})
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        version = session_shortlists.version
+        designer_ids = repository.shortlisted_ids(conn, user_session)
+        conn.close()
+
+        session_shortlists.put(user_session, designer_ids, version)
+        return jsonify({'user_session': user_session, 'designer_ids': designer_ids})
+
+    except Exception as e:
+        print(f"Error fetching shortlists: {e}")
+        if conn:
+            conn.close()
+        return jsonify({'error': 'Failed to fetch shortlists'}), 500
+
+@app.route('/api/shortlists/batch', methods=['POST'])
+def batch_shortlists():
+    """Apply many shortlist add/remove operations for a session in one transaction"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    user_session = data.get('user_session', 'default_session')
+    operations = data.get('operations')
+
+    if not isinstance(user_session, str) or not user_session:
+        return jsonify({'error': 'user_session must be a non-empty string'}), 400
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty array'}), 400
+    if len(operations) > SHORTLIST_BATCH_MAX:
+        return jsonify({'error': f'At most {SHORTLIST_BATCH_MAX} operations per batch'}), 400
+
+    # Collapse the queue to each designer's final state; the last operation wins
+    final_state = {}
+    for i, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            return jsonify({'error': f'Operation {i+1}: must be an object'}), 400
+        designer_id = operation.get('designer_id')
+        action = operation.get('action')
+        if not isinstance(designer_id, int) or isinstance(designer_id, bool):
+            return jsonify({'error': f'Operation {i+1}: designer_id must be an integer'}), 400
+        if action not in ('add', 'remove'):
+            return jsonify({'error': f'Operation {i+1}: action must be add or remove'}), 400
+        final_state[designer_id] = action == 'add'
+
+    to_add = [designer_id for designer_id, add in final_state.items() if add]
+    to_remove = [designer_id for designer_id, add in final_state.items() if not add]
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        added = repository.apply_shortlist_batch(conn, user_session, to_add, to_remove)
+        prune_shortlist_buckets(conn)
+
+        conn.commit()
+        conn.close()
+        for designer_id in final_state:
+            session_shortlists.apply(user_session, designer_id, designer_id in added)
+        note_write(user_session)
+
+        return jsonify({
+            'success': True,
+            'results': [{'designer_id': designer_id,
+                         'shortlisted': designer_id in added}
+                        for designer_id in final_state]
+        })
+
+    except Exception as e:
+        print(f"Error applying shortlist batch: {e}")
+        if conn:
+            conn.rollback()
+            conn.close()
+        return jsonify({'error': 'Failed to apply shortlist batch'}), 500
+
 @app.route('/api/designers/<int:designer_id>/report', methods=['POST'])
 def report_designer(designer_id):
     """Report a designer"""
@@ -580,21 +1358,30 @@ def report_designer(designer_id):
     if not reason:
         return jsonify({'error': 'Reason is required'}), 400
 
+    if REPORTS_WRITE_BEHIND:
+        if not report_writer.submit((designer_id, reason, description, user_session)):
+            response = jsonify({'error': 'Too many reports right now, please retry shortly'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        note_write(user_session)
+        return jsonify({
+            'success': True,
+            'message': 'Report submitted successfully'
+        }), 202
+
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cur = conn.cursor()
-
-        execute_query(cur, '''
-            INSERT INTO reports (designer_id, reason, description, user_session)
-            VALUES (%s, %s, %s, %s)
-        ''', (designer_id, reason, description, user_session))
+        if not repository.insert_report(conn, designer_id, reason, description, user_session):
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': 'Designer not found'}), 404
 
         conn.commit()
-        cur.close()
         conn.close()
+        note_write(user_session)
 
         return jsonify({
             'success': True,
@@ -616,29 +1403,18 @@ def delete_designer(designer_id):
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cur = conn.cursor()
-
-        # First check if designer exists
-        execute_query(cur, 'SELECT id FROM designers WHERE id = %s', (designer_id,))
-        designer = cur.fetchone()
-
-        if not designer:
-            cur.close()
+        # Shortlists and reports go in the same transaction as the designer
+        if repository.delete(conn, designer_id) is None:
             conn.close()
             return jsonify({'error': 'Designer not found'}), 404
 
-        # Delete related records first (to maintain referential integrity)
-        # Delete shortlists
-        execute_query(cur, 'DELETE FROM shortlists WHERE designer_id = %s', (designer_id,))
-
-        # Delete reports
-        execute_query(cur, 'DELETE FROM reports WHERE designer_id = %s', (designer_id,))
-
-        # Finally delete the designer
-        execute_query(cur, 'DELETE FROM designers WHERE id = %s', (designer_id,))
-
         conn.commit()
-        cur.close()
+        response_cache.invalidate()
+        catalogue_snapshot.mark_stale()
+        note_write()
+        session_shortlists.forget_designer(designer_id)
+        card_cache.discard(designer_id)
+        facet_index.remove(designer_id)
         conn.close()
 
         return jsonify({
@@ -687,40 +1463,12 @@ def add_designer_form():
                 flash('Database connection failed', 'error')
                 return render_template('add_designer.html', form_data=request.form)
 
-            cur = conn.cursor()
-            specialties_json = json.dumps(designer_data['specialties'])
-            portfolio_json = json.dumps(designer_data['portfolio'])
-
-            if USE_SQLITE:
-                cur.execute('''
-                    INSERT INTO designers (name, rating, description, projects, experience,
-                                         price_range, phone1, phone2, location, specialties, portfolio)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (designer_data['name'], designer_data['rating'], designer_data['description'],
-                      designer_data['projects'], designer_data['experience'], designer_data['price_range'],
-                      designer_data['phone1'], designer_data['phone2'], designer_data['location'],
-                      specialties_json, portfolio_json))
-            else:
-                cur.execute('''
-                    INSERT INTO designers (name, rating, description, projects, experience,
-                                         price_range, phone1, phone2, location, specialties, portfolio)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (designer_data['name'], designer_data['rating'], designer_data['description'],
-                      designer_data['projects'], designer_data['experience'], designer_data['price_range'],
-                      designer_data['phone1'], designer_data['phone2'], designer_data['location'],
-                      specialties_json, portfolio_json))
+            designer_id = repository.insert(conn, designer_data)
 
             conn.commit()
-
-            # Get the ID of the newly inserted designer
-            if USE_SQLITE:
-                designer_id = cur.lastrowid
-            else:
-                cur.execute('SELECT LASTVAL()')
-                result = cur.fetchone()
-                designer_id = result['lastval']
-
-            cur.close()
+            response_cache.invalidate()
+            catalogue_snapshot.mark_stale()
+            note_write()
             conn.close()
 
             flash(f'Designer "{designer_data["name"]}" added successfully with ID: {designer_id}', 'success')
@@ -748,121 +1496,108 @@ def upload_json():
 
         if file and allowed_file(file.filename):
             try:
-                # Read and parse JSON
-                json_data = json.loads(file.read().decode('utf-8'))
-
-                if not isinstance(json_data, list):
-                    flash('JSON file must contain an array of designers', 'error')
-                    return redirect(request.url)
-
-                # Process each designer
-                success_count = 0
-                error_count = 0
-                errors = []
-
                 conn = get_db_connection()
                 if not conn:
                     flash('Database connection failed', 'error')
                     return redirect(request.url)
 
-                for i, designer_data in enumerate(json_data):
-                    try:
-                        # Validate data
-                        validation_errors = validate_designer_data(designer_data)
-                        if validation_errors:
-                            errors.append(f'Designer {i+1}: {", ".join(validation_errors)}')
-                            error_count += 1
-                            continue
-
-                        # Add to database
-                        cur = conn.cursor()
-                        specialties_json = json.dumps(designer_data['specialties'])
-                        portfolio_json = json.dumps(designer_data['portfolio'])
-
-                        if USE_SQLITE:
-                            cur.execute('''
-                                INSERT INTO designers (name, rating, description, projects, experience,
-                                                     price_range, phone1, phone2, location, specialties, portfolio)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (designer_data['name'], designer_data['rating'], designer_data['description'],
-                                  designer_data['projects'], designer_data['experience'], designer_data['price_range'],
-                                  designer_data['phone1'], designer_data['phone2'], designer_data['location'],
-                                  specialties_json, portfolio_json))
-                        else:
-                            cur.execute('''
-                                INSERT INTO designers (name, rating, description, projects, experience,
-                                                     price_range, phone1, phone2, location, specialties, portfolio)
-                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ''', (designer_data['name'], designer_data['rating'], designer_data['description'],
-                                  designer_data['projects'], designer_data['experience'], designer_data['price_range'],
-                                  designer_data['phone1'], designer_data['phone2'], designer_data['location'],
-                                  specialties_json, portfolio_json))
-
-                        conn.commit()
-                        cur.close()
-                        success_count += 1
-
-                    except Exception as e:
-                        errors.append(f'Designer {i+1} ({designer_data.get("name", "Unknown")}): {str(e)}')
-                        error_count += 1
+                # Parse a JSON array or NDJSON incrementally straight off the upload stream
+                records = iter_json_records(file.stream)
+                success_count, error_count, errors, parse_error = import_designers(conn, records)
 
                 conn.close()
+                if success_count > 0:
+                    response_cache.invalidate()
+                    catalogue_snapshot.mark_stale()
+                    note_write()
 
                 # Show results
                 if success_count > 0:
                     flash(f'Successfully added {success_count} designers', 'success')
                 if error_count > 0:
                     flash(f'Failed to add {error_count} designers. Errors: {"; ".join(errors[:5])}', 'error')
+                if parse_error:
+                    flash(f'Invalid JSON file format: {parse_error}', 'error')
+                    if success_count == 0 and error_count == 0:
+                        return redirect(request.url)
 
                 return redirect(url_for('admin_dashboard'))
 
-            except json.JSONDecodeError:
-                flash('Invalid JSON file format', 'error')
             except Exception as e:
                 flash(f'Error processing file: {str(e)}', 'error')
         else:
             flash('Invalid file type. Please upload a JSON file.', 'error')
 
-    return render_template('upload_json.html')
+    return render_template('upload_json.html', max_upload_mb=MAX_UPLOAD_MB)
+
+def parse_page_id(args, name):
+    """Optional integer designer id bounding an admin list page"""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+
+def render_designer_cards(conn, designer_ids):
+    """Card HTML for each id in order, rendering and caching only the ones not cached yet"""
+    generation = card_cache.generation
+    cards = card_cache.get_many(designer_ids)
+    missing = [designer_id for designer_id in designer_ids if designer_id not in cards]
+    if missing:
+        for designer_id, designer in repository.by_ids(conn, missing).items():
+            card = Markup(render_template('designer_card.html', designer=designer))
+            card_cache.put(designer_id, card, generation)
+            cards[designer_id] = card
+    # An id deleted between the two queries simply drops off the page
+    return [cards[designer_id] for designer_id in designer_ids if designer_id in cards]
 
 @app.route('/designers-list')
 def designers_list():
-    """View all designers in web interface"""
+    """View one page of designers, newest first, in web interface"""
+    try:
+        filters = parse_designer_list_args(request.args)['filters']
+        before = parse_page_id(request.args, 'before')
+        after = parse_page_id(request.args, 'after')
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('designers_list'))
+    # Carried over into the Newer/Older links
+    filter_args = {key: request.args.getlist(key)
+                   for key in ('location', 'price_range', 'specialty', 'min_rating')
+                   if request.args.get(key)}
+
+    cards = []
+    total = None
+    newer_id = older_id = None
     conn = get_db_connection()
-    designers = []
 
     if conn:
         try:
-            cur = conn.cursor()
-            cur.execute('''
-                SELECT id, name, rating, description, projects, experience,
-                       price_range, phone1, phone2, location, specialties, portfolio,
-                       created_at
-                FROM designers
-                ORDER BY created_at DESC
-            ''')
-            designers_raw = cur.fetchall()
-
-            # Parse JSON fields based on database type
-            for designer in designers_raw:
-                designer_dict = dict(designer)
-                # Handle JSON fields based on database type
-                if USE_SQLITE:
-                    designer_dict['specialties'] = json.loads(designer_dict['specialties'])
-                    designer_dict['portfolio'] = json.loads(designer_dict['portfolio'])
+            designer_ids, more = repository.page_ids(conn, filters, before=before, after=after,
+                                                     limit=ADMIN_PAGE_SIZE)
+            cards = render_designer_cards(conn, designer_ids)
+            if designer_ids:
+                if after is not None:
+                    newer_id = designer_ids[0] if more else None
+                    older_id = designer_ids[-1]
                 else:
-                    # PostgreSQL JSONB fields are already parsed
-                    pass
-                designers.append(designer_dict)
+                    newer_id = designer_ids[0] if before is not None else None
+                    older_id = designer_ids[-1] if more else None
+            if not filters:
+                # Maintained counter, so the badge does not cost a COUNT(*)
+                total = repository.totals(conn)['designers']
 
-            cur.close()
             conn.close()
         except Exception as e:
             flash(f'Error fetching designers: {str(e)}', 'error')
             if conn:
                 conn.close()
 
-    return render_template('designers_list.html', designers=designers)
+    return render_template('designers_list.html', cards=cards, total=total, filters=filters,
+                           filter_args=filter_args, price_ranges=PRICE_RANGES,
+                           newer_id=newer_id, older_id=older_id)
 
 @app.route('/delete-designer/<int:designer_id>', methods=['POST'])
 def delete_designer_web(designer_id):
@@ -873,28 +1608,21 @@ def delete_designer_web(designer_id):
         return redirect(url_for('designers_list'))
 
     try:
-        cur = conn.cursor()
-
-        # Get designer name for confirmation message
-        execute_query(cur, 'SELECT name FROM designers WHERE id = %s', (designer_id,))
-        designer = cur.fetchone()
+        # Deletes shortlists and reports too; the name is kept for the confirmation message
+        designer_name = repository.delete(conn, designer_id)
 
-        if not designer:
+        if designer_name is None:
+            conn.close()
             flash('Designer not found', 'error')
             return redirect(url_for('designers_list'))
 
-        # Both SQLite and PostgreSQL with RealDictCursor return dict-like objects
-        designer_name = designer['name']
-
-        # Delete related records first
-        execute_query(cur, 'DELETE FROM shortlists WHERE designer_id = %s', (designer_id,))
-        execute_query(cur, 'DELETE FROM reports WHERE designer_id = %s', (designer_id,))
-
-        # Delete the designer
-        execute_query(cur, 'DELETE FROM designers WHERE id = %s', (designer_id,))
-
         conn.commit()
-        cur.close()
+        response_cache.invalidate()
+        catalogue_snapshot.mark_stale()
+        note_write()
+        session_shortlists.forget_designer(designer_id)
+        card_cache.discard(designer_id)
+        facet_index.remove(designer_id)
         conn.close()
 
         flash(f'Designer "{designer_name}" deleted successfully', 'success')
@@ -908,9 +1636,16 @@ def delete_designer_web(designer_id):
 
     return redirect(url_for('designers_list'))
 
+# Under gunicorn each worker imports the app; migrations serialize on a lock.
+# A worker must not serve a half-migrated schema, so a failed migration fails its boot
+if __name__ != '__main__' and os.getenv('AUTO_MIGRATE', 'true').lower() == 'true':
+    if not migrate_database():
+        raise RuntimeError('Database migration failed; refusing to start')
+
 if __name__ == '__main__':
     # Initialize database on startup
-    init_database()
+    if not init_database():
+        raise SystemExit('Database initialization failed')
 
     port = int(os.environ.get('PORT', 5001))
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
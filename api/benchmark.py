@@ -0,0 +1,388 @@
+"""Load-test the running API and report throughput and latency percentiles as JSON.
+
+Point it at a server backed by a catalogue from generate_catalogue.py:
+
+    python generate_catalogue.py --size 100k
+    gunicorn --workers 4 --bind 127.0.0.1:5001 app:app &
+    python benchmark.py --concurrency 16 --duration 10 --output before.json
+    # ...change something, restart the server...
+    python benchmark.py --concurrency 16 --duration 10 --output after.json --compare before.json
+
+Each scenario runs for --duration seconds with --concurrency threads, each
+holding its own keep-alive connection. Write scenarios (toggle, report, add,
+delete, upload_json) modify the database; run them against a throwaway copy.
+
+--write-load N adds N threads running --write-scenario (default toggle) for
+the whole of every scenario, to see how reads hold up while writes go on.
+Point --write-url at a second server process on the same database to
+measure database contention rather than two loads sharing one process:
+
+    python benchmark.py --scenarios list,detail,shortlists --write-load 8 --write-url http://127.0.0.1:5002
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import deque
+
+from generate_catalogue import LOCATIONS, NAME_PREFIXES, SPECIALTIES, make_designer
+
+DEFAULT_SCENARIOS = ['list', 'list_filtered', 'list_next_page', 'detail', 'search', 'facets', 'trending',
+                     'shortlists', 'toggle', 'report', 'add', 'delete', 'upload_json']
+# Not in the default set: a plain GET /api/designers returns the whole catalogue
+EXTRA_SCENARIOS = ['list_full']
+SORTS = ['rating', 'price_range', 'experience', 'projects', 'popular']
+
+
+class Client:
+    """Keep-alive HTTP connection owned by one worker thread"""
+
+    def __init__(self, base_url, timeout):
+        url = urllib.parse.urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.https = url.scheme == 'https'
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request and return (status, body bytes)"""
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request; the failure counts as an error
+            self.conn.close()
+            self.conn = None
+            raise
+
+    def get_json(self, path):
+        status, body = self.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f'GET {path} returned {status}')
+        return json.loads(body)
+
+    def post_json(self, path, payload, method='POST'):
+        return self.request(method, path, json.dumps(payload).encode('utf-8'),
+                            {'Content-Type': 'application/json'})
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Context:
+    """Data gathered before the run and shared by the scenario functions"""
+
+    def __init__(self, client, args):
+        self.args = args
+        self.ids = []
+        self.cursors = []
+        self.sessions = args.sessions
+        # Designers created by the 'add' scenario, consumed by 'delete'
+        self.created = deque()
+        self.upload_body = None
+        self.upload_boundary = uuid.uuid4().hex
+
+        # Spread the sample across sort orders so it is not just the top of one index
+        for sort in SORTS:
+            for order in ('asc', 'desc'):
+                page = client.get_json(f'/api/designers?limit=100&sort={sort}&order={order}')
+                self.ids.extend(designer['id'] for designer in page['designers'])
+                if page['next_cursor']:
+                    self.cursors.append((sort, order, page['next_cursor']))
+        if not self.ids:
+            raise RuntimeError('The catalogue is empty; load one with generate_catalogue.py first')
+        self.ids = sorted(set(self.ids))
+
+    def upload(self):
+        """Multipart body for /upload-json, built once"""
+        if self.upload_body is None:
+            rng = random.Random(7)
+            lines = [json.dumps(make_designer(rng, n)) for n in range(self.args.upload_size)]
+            self.upload_body = (
+                f'--{self.upload_boundary}\r\n'
+                'Content-Disposition: form-data; name="file"; filename="bench.ndjson"\r\n'
+                'Content-Type: application/x-ndjson\r\n\r\n'
+                + '\n'.join(lines) +
+                f'\r\n--{self.upload_boundary}--\r\n').encode('utf-8')
+        return self.upload_body
+
+
+def scenario_list(client, ctx, rng):
+    return client.request('GET', f'/api/designers?limit=20&sort={rng.choice(SORTS)}')[0]
+
+
+def scenario_list_filtered(client, ctx, rng):
+    location = urllib.parse.quote(rng.choice(LOCATIONS)[0])
+    specialty = urllib.parse.quote(rng.choice(SPECIALTIES))
+    return client.request('GET', f'/api/designers?limit=20&sort=rating'
+                                 f'&location={location}&specialty={specialty}')[0]
+
+
+def scenario_list_next_page(client, ctx, rng):
+    if not ctx.cursors:
+        return client.request('GET', '/api/designers?limit=20')[0]
+    sort, order, cursor = rng.choice(ctx.cursors)
+    return client.request('GET', f'/api/designers?limit=20&sort={sort}&order={order}&cursor={cursor}')[0]
+
+
+def scenario_list_full(client, ctx, rng):
+    return client.request('GET', '/api/designers')[0]
+
+
+def scenario_detail(client, ctx, rng):
+    return client.request('GET', f'/api/designers/{rng.choice(ctx.ids)}')[0]
+
+
+def scenario_search(client, ctx, rng):
+    q = urllib.parse.quote(f'{rng.choice(NAME_PREFIXES)} {rng.choice(SPECIALTIES)}'[:rng.randint(3, 12)])
+    return client.request('GET', f'/api/designers/search?q={q}&limit=20')[0]
+
+
+def scenario_facets(client, ctx, rng):
+    if rng.random() < 0.5:
+        return client.request('GET', '/api/designers/facets')[0]
+    location = urllib.parse.quote(rng.choice(LOCATIONS)[0])
+    return client.request('GET', f'/api/designers/facets?location={location}')[0]
+
+
+def scenario_trending(client, ctx, rng):
+    window = rng.choice(['', '&window=24h', '&window=7d'])
+    return client.request('GET', f'/api/designers/trending?limit=20{window}')[0]
+
+
+def scenario_shortlists(client, ctx, rng):
+    return client.request('GET', f'/api/shortlists?user_session=bench_session_{rng.randrange(ctx.sessions)}')[0]
+
+
+def scenario_toggle(client, ctx, rng):
+    return client.post_json(f'/api/designers/{rng.choice(ctx.ids)}/shortlist',
+                            {'user_session': f'bench_load_{rng.randrange(ctx.sessions)}'})[0]
+
+
+def scenario_report(client, ctx, rng):
+    return client.post_json(f'/api/designers/{rng.choice(ctx.ids)}/report',
+                            {'reason': 'Spam', 'description': 'benchmark',
+                             'user_session': f'bench_load_{rng.randrange(ctx.sessions)}'})[0]
+
+
+def scenario_add(client, ctx, rng):
+    status, body = client.post_json('/api/designers', make_designer(rng, rng.randrange(10**6)))
+    if status == 201:
+        ctx.created.append(json.loads(body)['designer_id'])
+    return status
+
+
+def scenario_delete(client, ctx, rng):
+    try:
+        designer_id = ctx.created.popleft()
+    except IndexError:
+        # Only designers made by 'add' are deleted; stop once they run out
+        return None
+    return client.request('DELETE', f'/api/designers/{designer_id}')[0]
+
+
+def scenario_upload_json(client, ctx, rng):
+    return client.request('POST', '/upload-json', ctx.upload(),
+                          {'Content-Type': f'multipart/form-data; boundary={ctx.upload_boundary}'})[0]
+
+
+SCENARIOS = {name: globals()[f'scenario_{name}'] for name in DEFAULT_SCENARIOS + EXTRA_SCENARIOS}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(p / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        'requests': len(ms),
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(sum(ms) / len(ms), 3) if ms else None,
+            'p50': round(percentile(ms, 50), 3) if ms else None,
+            'p95': round(percentile(ms, 95), 3) if ms else None,
+            'p99': round(percentile(ms, 99), 3) if ms else None,
+            'max': round(ms[-1], 3) if ms else None,
+        },
+    }
+
+
+def run_scenario(name, args, ctx):
+    """Drive one scenario from --concurrency threads for --duration seconds"""
+    # Measured threads first, then any --write-load threads running alongside them
+    funcs = ([SCENARIOS[name]] * args.concurrency +
+             [SCENARIOS[args.write_scenario]] * args.write_load)
+    latencies = ([], [])
+    errors = [0, 0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    start = threading.Barrier(len(funcs) + 1)
+
+    def worker(n):
+        func = funcs[n]
+        measured = 0 if n < args.concurrency else 1
+        rng = random.Random(args.seed * 1000 + n)
+        client = Client(args.url if not measured else args.write_url or args.url, args.timeout)
+        own_latencies = []
+        own_errors = 0
+        start.wait()
+        try:
+            while time.monotonic() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    status = func(client, ctx, rng)
+                except Exception:
+                    status = 0
+                elapsed = time.perf_counter() - t0
+                if status is None:
+                    break
+                own_latencies.append(elapsed)
+                if not 200 <= status < 400:
+                    own_errors += 1
+        finally:
+            client.close()
+            with lock:
+                latencies[measured].extend(own_latencies)
+                errors[measured] += own_errors
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True)
+               for n in range(len(funcs))]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.monotonic()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - began
+
+    result = summarize(latencies[0], errors[0], elapsed)
+    if args.write_load:
+        result['write_load'] = summarize(latencies[1], errors[1], elapsed)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Print throughput and p95/p99 change per scenario against an earlier run"""
+    print(f'\n{"scenario":<16}{"rps":>10}{"change":>9}{"p95 ms":>10}{"change":>9}{"p99 ms":>10}{"change":>9}',
+          file=sys.stderr)
+
+    def change(old, new):
+        if not old or new is None:
+            return '-'
+        return f'{(new - old) / old * 100:+.1f}%'
+
+    for name, result in current['scenarios'].items():
+        old = previous.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        latency, old_latency = result['latency_ms'], old['latency_ms']
+        print(f'{name:<16}{result["throughput_rps"]:>10}'
+              f'{change(old["throughput_rps"], result["throughput_rps"]):>9}'
+              f'{latency["p95"] or "-":>10}{change(old_latency["p95"], latency["p95"]):>9}'
+              f'{latency["p99"] or "-":>10}{change(old_latency["p99"], latency["p99"]):>9}',
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the designer API')
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS),
+                        help=f'comma-separated, from: {", ".join(SCENARIOS)}')
+    parser.add_argument('--sessions', type=int, default=1000,
+                        help='distinct user sessions to spread shortlist/report traffic over')
+    parser.add_argument('--upload-size', type=int, default=1000, help='designers per upload_json request')
+    parser.add_argument('--write-load', type=int, default=0,
+                        help='extra threads running --write-scenario during every scenario')
+    parser.add_argument('--write-scenario', default='toggle', help='scenario the --write-load threads run')
+    parser.add_argument('--write-url', help='server the --write-load threads use (default --url)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', metavar='PATH', help='earlier JSON report to diff against')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(unknown)}')
+    if args.write_scenario not in SCENARIOS:
+        parser.error(f'unknown write scenario: {args.write_scenario}')
+
+    setup = Client(args.url, args.timeout)
+    health = setup.get_json('/api/health')
+    ctx = Context(setup, args)
+    setup.close()
+
+    report = {
+        'meta': {
+            'url': args.url,
+            'git_revision': git_revision(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'sampled_designer_ids': len(ctx.ids),
+            'upload_size': args.upload_size,
+            'write_load': args.write_load,
+            'write_scenario': args.write_scenario if args.write_load else None,
+            'write_url': (args.write_url or args.url) if args.write_load else None,
+            'python': platform.python_version(),
+            'server_health': health,
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        result = run_scenario(name, args, ctx)
+        report['scenarios'][name] = result
+        print(f'{name:<16}{result["throughput_rps"]:>10} req/s  '
+              f'p50 {result["latency_ms"]["p50"]} ms  p95 {result["latency_ms"]["p95"]} ms  '
+              f'p99 {result["latency_ms"]["p99"]} ms  errors {result["errors"]}', file=sys.stderr)
+        if args.write_load:
+            writes = result['write_load']
+            print(f'{"  + writes":<16}{writes["throughput_rps"]:>10} req/s  '
+                  f'p50 {writes["latency_ms"]["p50"]} ms  p99 {writes["latency_ms"]["p99"]} ms  '
+                  f'errors {writes["errors"]}', file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
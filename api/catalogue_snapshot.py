@@ -0,0 +1,367 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:  # the snapshot is opt-in; without NumPy every read goes to the database
+    np = None
+
+try:
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+except ImportError:  # SQLite-only deployments
+    psycopg2 = None
+
+# GET /api/designers sorts the snapshot answers; sort=popular moves with every
+# shortlist toggle and stays on the database
+SNAPSHOT_SORTS = ('rating', 'experience', 'projects', 'price_range')
+# Postgres channel notified by the designers triggers of migration 009
+CHANGES_CHANNEL = 'designers_changed'
+# Ids per IN-list when loading designers committed below the high-water id
+MISSING_BATCH = 500
+
+
+def _column(rows, index, dtype, convert=None):
+    values = (row[index] for row in rows) if convert is None else (convert(row[index]) for row in rows)
+    return np.fromiter(values, dtype, len(rows))
+
+
+class Snapshot:
+    """Immutable column-oriented copy of the designers table, rows in id order.
+
+    Numbers live in NumPy arrays; location and price range are int32 codes
+    into one list of interned strings. Every sortable column keeps its
+    (value, id) order precomputed, so a list request is a boolean mask, a
+    slice and, for a cursor, one vectorized comparison. ``specialties`` maps
+    each specialty to the sorted ids that have it.
+    """
+
+    def __init__(self, ids, rating, experience, projects, price, location, strings,
+                 specialties, api_json):
+        self.ids = ids
+        self.rating = rating
+        self.experience = experience
+        self.projects = projects
+        self.price = price
+        self.location = location
+        self.strings = strings
+        self.codes = {value: code for code, value in enumerate(strings)}
+        self.specialties = specialties
+        self.api_json = api_json
+
+        # Price ranges sort as text, as they do in SQL
+        self.sorted_strings = sorted(strings)
+        rank = np.empty(len(strings), dtype=np.int64)
+        for position, value in enumerate(self.sorted_strings):
+            rank[self.codes[value]] = position
+        self.keys = {'rating': rating, 'experience': experience, 'projects': projects,
+                     'price_range': rank[price]}
+        self.orders = {column: np.lexsort((ids, key)) for column, key in self.keys.items()}
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, np.int64), np.empty(0, np.float64), np.empty(0, np.int64),
+                   np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int32),
+                   [], {}, [])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def high_water(self):
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def with_rows(self, designers, specialty_rows):
+        """New snapshot with designers not held yet added, or self when there are none.
+
+        designers are (id, rating, experience, projects, price_range,
+        location, api_json) rows; specialty_rows are (designer_id, specialty).
+        """
+        if not designers:
+            return self
+        strings = list(self.strings)
+        codes = dict(self.codes)
+
+        def code(value):
+            found = codes.get(value)
+            if found is None:
+                found = codes[value] = len(strings)
+                strings.append(sys.intern(value))
+            return found
+
+        ids = np.concatenate((self.ids, _column(designers, 0, np.int64)))
+        rating = np.concatenate((self.rating, _column(designers, 1, np.float64, float)))
+        experience = np.concatenate((self.experience, _column(designers, 2, np.int64)))
+        projects = np.concatenate((self.projects, _column(designers, 3, np.int64)))
+        price = np.concatenate((self.price, _column(designers, 4, np.int32, code)))
+        location = np.concatenate((self.location, _column(designers, 5, np.int32, code)))
+        api_json = self.api_json + [row[6] for row in designers]
+
+        grouped = {}
+        for designer_id, specialty in specialty_rows:
+            grouped.setdefault(specialty, []).append(designer_id)
+        specialties = dict(self.specialties)
+        for specialty, added in grouped.items():
+            added = np.array(added, np.int64)
+            # Specialties are read after designers, so they can name designers
+            # committed in between; those arrive with the next refresh
+            added = added[np.isin(added, ids)]
+            if not len(added):
+                continue
+            held = specialties.get(specialty, np.empty(0, np.int64))
+            specialties[sys.intern(specialty)] = np.unique(np.concatenate((held, added)))
+
+        if len(self.ids) and designers[0][0] <= self.ids[-1]:
+            # Rows committed below the high-water id (Postgres sequences): restore id order
+            order = np.argsort(ids, kind='stable')
+            ids, rating, experience, projects, price, location = (
+                column[order] for column in (ids, rating, experience, projects, price, location))
+            api_json = [api_json[position] for position in order.tolist()]
+        return Snapshot(ids, rating, experience, projects, price, location, strings,
+                        specialties, api_json)
+
+    def without(self, removed):
+        """New snapshot minus the given ids (a NumPy array)"""
+        keep = ~np.isin(self.ids, removed)
+        specialties = {}
+        for specialty, ids in self.specialties.items():
+            ids = ids[~np.isin(ids, removed)]
+            if len(ids):
+                specialties[specialty] = ids
+        return Snapshot(self.ids[keep], self.rating[keep], self.experience[keep],
+                        self.projects[keep], self.price[keep], self.location[keep],
+                        self.strings, specialties,
+                        [fragment for fragment, kept in zip(self.api_json, keep.tolist()) if kept])
+
+    def _filter_mask(self, filters):
+        mask = np.ones(len(self.ids), dtype=bool)
+        for column, codes in (('location', self.location), ('price_range', self.price)):
+            if column in filters:
+                code = self.codes.get(filters[column])
+                if code is None:
+                    return np.zeros(len(self.ids), dtype=bool)
+                mask &= codes == code
+        if 'min_rating' in filters:
+            mask &= self.rating >= filters['min_rating']
+        for specialty in filters.get('specialties', []):
+            ids = self.specialties.get(specialty, np.empty(0, np.int64))
+            present = np.zeros(len(self.ids), dtype=bool)
+            positions = np.searchsorted(self.ids, ids)
+            inside = positions < len(self.ids)
+            positions = positions[inside]
+            present[positions[self.ids[positions] == ids[inside]]] = True
+            mask &= present
+        return mask
+
+    def _key(self, column, value):
+        """Cursor value on the scale of self.keys[column]"""
+        if column != 'price_range':
+            return float(value)
+        position = bisect_left(self.sorted_strings, value)
+        if position < len(self.sorted_strings) and self.sorted_strings[position] == value:
+            return position
+        # A price range no longer present falls between its neighbours
+        return position - 0.5
+
+    def list_page(self, params):
+        """Same (id, sort value, api_json) rows as DesignerRepository.list_page, from memory"""
+        column = params['column']
+        positions = self.orders[column]
+        if params['order'] == 'desc':
+            positions = positions[::-1]
+        if params['filters']:
+            positions = positions[self._filter_mask(params['filters'])[positions]]
+        if params['after'] is not None:
+            value, after_id = params['after']
+            key = self._key(column, value)
+            keys = self.keys[column][positions]
+            ids = self.ids[positions]
+            if params['order'] == 'desc':
+                positions = positions[(keys < key) | ((keys == key) & (ids < after_id))]
+            else:
+                positions = positions[(keys > key) | ((keys == key) & (ids > after_id))]
+        if params['limit'] is not None:
+            # One extra row tells the caller whether another page exists
+            positions = positions[:params['limit'] + 1]
+
+        if column == 'price_range':
+            values = [self.strings[code] for code in self.price[positions].tolist()]
+        else:
+            values = getattr(self, column)[positions].tolist()
+        return list(zip(self.ids[positions].tolist(), values,
+                        [self.api_json[position] for position in positions.tolist()]))
+
+
+class DataVersionWatcher:
+    """Notices commits to a SQLite database made by any other connection"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._version = self._read()
+
+    def _read(self):
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def changed(self):
+        version = self._read()
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+
+class NotifyWatcher:
+    """LISTENs on the Postgres channel the designers triggers NOTIFY"""
+
+    def __init__(self, dsn):
+        self._dsn = dsn
+        self._conn = None
+
+    def changed(self):
+        if self._conn is None:
+            self._conn = psycopg2.connect(self._dsn)
+            self._conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            self._conn.cursor().execute(f'LISTEN {CHANGES_CHANNEL}')
+            # Anything could have changed while we were not listening
+            return True
+        try:
+            self._conn.poll()
+        except psycopg2.Error:
+            self._conn = None
+            return True
+        if not self._conn.notifies:
+            return False
+        self._conn.notifies.clear()
+        return True
+
+
+class CatalogueSnapshot:
+    """Keeps a per-process Snapshot of the designers table current.
+
+    A background thread (started on first use, and again after a fork)
+    loads the table once, then polls the watcher every ``poll_interval``
+    seconds. On a change it loads designers above the snapshot's highest
+    id, and only when the count still disagrees with the maintained
+    designer counter does it compare id lists to drop deleted rows. Each
+    new snapshot is swapped in whole and on_change() is called.
+
+    current() returns None until the first load finishes, and also between
+    a mark_stale() from this worker's own write and the refresh it wakes,
+    so a client reads its writes; other workers' writes show up within
+    about one poll interval.
+    """
+
+    def __init__(self, connect, repository, watcher, poll_interval=0.25, on_change=None):
+        self._connect = connect
+        self._repository = repository
+        self._watcher_factory = watcher
+        self.poll_interval = poll_interval
+        self._on_change = on_change
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        # mark_stale() calls made, and how many of them the current snapshot covers
+        self._requested = 0
+        self._applied = 0
+        self._refreshes = 0
+        self._failures = 0
+        self._last_refresh_ms = 0.0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._snapshot = None
+                self._wake = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='catalogue-snapshot', daemon=True)
+                self._thread.start()
+
+    def current(self):
+        """The latest Snapshot, or None while it is loading or known to be stale"""
+        self._ensure_started()
+        if self._applied != self._requested:
+            return None
+        return self._snapshot
+
+    def mark_stale(self):
+        """Called after this worker changes designers: stop serving until refreshed"""
+        with self._lock:
+            self._requested += 1
+        self._wake.set()
+
+    def _run(self):
+        watcher = None
+        while True:
+            try:
+                if watcher is None:
+                    watcher = self._watcher_factory()
+                if self._snapshot is None:
+                    self._refresh()
+                else:
+                    woken = self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    # Always ask the watcher, so our own writes are not refreshed twice
+                    if watcher.changed() or woken:
+                        self._refresh()
+            except Exception as e:
+                print(f"Error refreshing catalogue snapshot: {e}")
+                with self._lock:
+                    self._failures += 1
+                time.sleep(self.poll_interval)
+
+    def _refresh(self):
+        started = time.perf_counter()
+        requested = self._requested
+        repository = self._repository
+        snapshot = self._snapshot if self._snapshot is not None else Snapshot.empty()
+        conn = self._connect()
+        if not conn:
+            raise RuntimeError('database connection failed')
+        try:
+            designers = [row for batch in repository.snapshot_designers(conn, snapshot.high_water)
+                         for row in batch]
+            specialties = [row for batch in repository.specialty_batches(conn, snapshot.high_water)
+                           for row in batch]
+            updated = snapshot.with_rows(designers, specialties)
+            if len(updated) != repository.totals(conn)['designers']:
+                # Deleted designers, or ones committed below the high-water id
+                ids = np.fromiter((row[0] for batch in repository.designer_ids(conn) for row in batch),
+                                  np.int64)
+                removed = updated.ids[~np.isin(updated.ids, ids)]
+                if len(removed):
+                    updated = updated.without(removed)
+                missing = ids[~np.isin(ids, updated.ids)].tolist()
+                for start in range(0, len(missing), MISSING_BATCH):
+                    updated = updated.with_rows(*repository.snapshot_designers_by_ids(
+                        conn, missing[start:start + MISSING_BATCH]))
+        finally:
+            conn.close()
+
+        if updated is not self._snapshot:
+            self._snapshot = updated
+            if self._on_change is not None:
+                self._on_change()
+        with self._lock:
+            self._applied = max(self._applied, requested)
+            self._refreshes += 1
+            self._last_refresh_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self):
+        snapshot = self._snapshot
+        with self._lock:
+            return {
+                'ready': int(snapshot is not None and self._applied == self._requested),
+                'designers': len(snapshot) if snapshot is not None else 0,
+                'strings': len(snapshot.strings) if snapshot is not None else 0,
+                'refreshes': self._refreshes,
+                'failures': self._failures,
+                'last_refresh_ms': round(self._last_refresh_ms, 1),
+            }
@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class _Entry:
+    """Raw connection plus the bookkeeping the pool needs to recycle it"""
+    __slots__ = ('raw', 'pid', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.pid = os.getpid()
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection:
+    """Borrowed connection; close() hands it back to the pool instead of disconnecting"""
+    __slots__ = ('_pool', '_entry')
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        if self._entry is None:
+            raise AttributeError(f'Connection already returned to pool: {name}')
+        return getattr(self._entry.raw, name)
+
+    @property
+    def raw(self):
+        return self._entry.raw if self._entry is not None else None
+
+    def invalidate(self):
+        """Return the connection and make sure it is never reused"""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry, discard=True)
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry)
+
+
+class ConnectionPool:
+    """Bounded per-process pool of database connections.
+
+    Connections are health-checked when they have sat idle for longer than
+    ``ping_after`` seconds, evicted after ``max_idle`` seconds unused and
+    replaced after ``max_lifetime`` seconds. The pool notices when it is used
+    from a forked child (e.g. a gunicorn worker) and starts over with fresh
+    connections rather than sharing the parent's sockets.
+    """
+
+    def __init__(self, connect, max_size=5, timeout=10.0, max_idle=300.0,
+                 max_lifetime=3600.0, ping_after=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        # Connections inherited across a fork are kept referenced but never
+        # closed, so finalizers cannot tear down the parent's sessions
+        self._orphans = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = []
+        self._checked_out = 0
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._orphans.extend(entry.raw for entry in self._idle)
+            self._reset()
+
+    def _new_entry(self):
+        entry = _Entry(self._connect())
+        with self._cond:
+            self._created += 1
+        return entry
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _ping(raw):
+        if getattr(raw, 'closed', 0):
+            return False
+        try:
+            cur = raw.cursor()
+            cur.execute('SELECT 1')
+            cur.fetchone()
+            cur.close()
+            raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self, now):
+        """Drop idle connections past max_idle; caller holds the lock"""
+        expired = [e for e in self._idle if now - e.last_used > self.max_idle]
+        if expired:
+            self._idle = [e for e in self._idle if now - e.last_used <= self.max_idle]
+            self._recycled += len(expired)
+        return expired
+
+    def acquire(self):
+        """Borrow a connection, waiting up to ``timeout`` seconds for one to free up"""
+        self._check_fork()
+        deadline = time.monotonic() + self.timeout
+        expired = []
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                expired.extend(self._evict_idle(now))
+                if self._idle:
+                    # LIFO keeps the warmest connections in use and lets the rest age out
+                    entry = self._idle.pop()
+                    self._checked_out += 1
+                    break
+                if self._checked_out < self.max_size:
+                    entry = None
+                    self._checked_out += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        for raw in expired:
+            self._close_quietly(raw.raw)
+
+        try:
+            if entry is None:
+                entry = self._new_entry()
+            else:
+                now = time.monotonic()
+                stale = now - entry.created_at > self.max_lifetime
+                if stale or (now - entry.last_used > self.ping_after and not self._ping(entry.raw)):
+                    self._close_quietly(entry.raw)
+                    with self._cond:
+                        self._recycled += 1
+                    entry = self._new_entry()
+        except Exception:
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, entry)
+
+    def release(self, entry, discard=False):
+        """Return a borrowed connection, rolling back anything left uncommitted"""
+        if entry.pid != os.getpid():
+            # Borrowed before a fork; the child must not touch the parent's session
+            self._orphans.append(entry.raw)
+            return
+
+        if not discard:
+            try:
+                entry.raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._checked_out -= 1
+            if discard:
+                self._recycled += 1
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if discard:
+            self._close_quietly(entry.raw)
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close_quietly(entry.raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'checked_out': self._checked_out,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'created': self._created,
+                'recycled': self._recycled,
+            }
@@ -0,0 +1,839 @@
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from metrics import query_shape
+from migrations import SQLITE_API_JSON
+
+try:
+    from psycopg2.extensions import cursor as TupleCursor
+    from psycopg2.extras import execute_values
+except ImportError:  # SQLite-only deployments
+    TupleCursor = execute_values = None
+
+DESIGNER_COLUMNS = ('id', 'name', 'rating', 'description', 'projects', 'experience',
+                    'price_range', 'phone1', 'phone2', 'location', 'specialties',
+                    'portfolio', 'created_at')
+DESIGNER_INSERT_COLUMNS = ('name, rating, description, projects, experience, '
+                           'price_range, phone1, phone2, location, specialties, portfolio')
+# Sort column that lives in designer_stats rather than designers
+POPULARITY_COLUMN = 'shortlist_count'
+# Translated statements remembered per process; odd filter combinations beyond this are
+# translated on every call rather than growing the map
+MAX_STATEMENTS = 1024
+# Prepared statements kept per Postgres connection before falling back to plain execution
+MAX_PREPARED_PER_CONNECTION = 256
+
+INSERT_DESIGNER = f'''
+    INSERT INTO designers ({DESIGNER_INSERT_COLUMNS})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+'''
+# Bulk SQLite inserts stage rows in a per-connection temp table first. Its declared
+# types match designers, so staged values get the affinity they will be stored with
+# and one INSERT ... SELECT can write each row complete with id, api_json and
+# change_seq (the triggers of migration 012 then leave it alone).
+CREATE_DESIGNER_STAGING = '''
+    CREATE TEMP TABLE IF NOT EXISTS designer_import (
+        name TEXT, rating REAL, description TEXT, projects INTEGER, experience INTEGER,
+        price_range TEXT, phone1 TEXT, phone2 TEXT, location TEXT, specialties TEXT, portfolio TEXT
+    )
+'''
+STAGE_DESIGNER = f'''
+    INSERT INTO temp.designer_import ({DESIGNER_INSERT_COLUMNS})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+'''
+# Ids continue from AUTOINCREMENT's high-water mark; change_seq from the change counter
+INSERT_STAGED_DESIGNERS = f'''
+    INSERT INTO designers (id, {DESIGNER_INSERT_COLUMNS}, api_json, change_seq)
+    SELECT id, {DESIGNER_INSERT_COLUMNS}, {SQLITE_API_JSON.format(row='staged')}, change_seq
+    FROM (
+        SELECT designer_import.*,
+               last.id + row_number() OVER (ORDER BY designer_import.rowid) AS id,
+               last.change_seq + row_number() OVER (ORDER BY designer_import.rowid) AS change_seq
+        FROM temp.designer_import, (
+            SELECT max(coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'designers'), 0),
+                       coalesce((SELECT max(id) FROM designers), 0)) AS id,
+                   (SELECT value FROM change_sequence) AS change_seq
+        ) AS last
+    ) AS staged
+    ORDER BY id
+'''
+CLEAR_DESIGNER_STAGING = 'DELETE FROM temp.designer_import'
+SELECT_DESIGNERS = f'SELECT {", ".join(DESIGNER_COLUMNS)} FROM designers'
+COUNT_DESIGNERS = 'SELECT COUNT(*) FROM designers'
+DESIGNER_ID_RANGE = 'SELECT MIN(id), MAX(id) FROM designers'
+RECENT_DESIGNERS = SELECT_DESIGNERS + ' ORDER BY id DESC LIMIT %s'
+DESIGNER_JSON = 'SELECT api_json FROM designers WHERE id = %s'
+DESIGNER_NAME = 'SELECT name FROM designers WHERE id = %s'
+DELETE_SHORTLISTS_FOR = 'DELETE FROM shortlists WHERE designer_id = %s'
+DELETE_REPORTS_FOR = 'DELETE FROM reports WHERE designer_id = %s'
+DELETE_DESIGNER = 'DELETE FROM designers WHERE id = %s'
+SEARCH_SQLITE = '''
+    SELECT d.api_json
+    FROM designers_fts
+    JOIN designers d ON d.id = designers_fts.rowid
+    WHERE designers_fts MATCH %s
+    ORDER BY bm25(designers_fts, 10.0, 1.0, 5.0), d.id
+    LIMIT %s OFFSET %s
+'''
+SEARCH_POSTGRES = '''
+    SELECT api_json
+    FROM designers, to_tsquery('simple', %s) AS query
+    WHERE search_vector @@ query
+    ORDER BY ts_rank(search_vector, query) DESC, id
+    LIMIT %s OFFSET %s
+'''
+SESSION_SHORTLIST = '''
+    SELECT designer_id FROM shortlists
+    WHERE user_session = %s
+    ORDER BY designer_id
+'''
+UNSHORTLIST = '''
+    DELETE FROM shortlists
+    WHERE designer_id = %s AND user_session = %s
+'''
+SHORTLIST = '''
+    INSERT INTO shortlists (designer_id, user_session)
+    VALUES (%s, %s)
+    ON CONFLICT (designer_id, user_session) DO NOTHING
+'''
+# SQLite does not enforce the foreign key, and the counter triggers would count an
+# unknown designer, so toggles and reports only insert for designers that exist
+SHORTLIST_IF_DESIGNER = '''
+    INSERT INTO shortlists (designer_id, user_session)
+    SELECT %s, %s WHERE EXISTS (SELECT 1 FROM designers WHERE id = %s)
+    ON CONFLICT (designer_id, user_session) DO NOTHING
+'''
+TOGGLE_SHORTLIST_POSTGRES = '''
+    WITH removed AS (
+        DELETE FROM shortlists
+        WHERE designer_id = %s AND user_session = %s
+        RETURNING id
+    ), designer AS (
+        SELECT EXISTS (SELECT 1 FROM designers WHERE id = %s) AS found
+    ), added AS (
+        INSERT INTO shortlists (designer_id, user_session)
+        SELECT %s, %s FROM designer WHERE found AND NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT (designer_id, user_session) DO NOTHING
+        RETURNING id
+    )
+    SELECT NOT EXISTS (SELECT 1 FROM removed) AS shortlisted, (SELECT found FROM designer) AS found
+'''
+# Facet index and catalogue snapshot loads: everything past the highest id already held
+FACET_DESIGNERS = 'SELECT id, location, price_range, rating FROM designers WHERE id > %s ORDER BY id'
+SNAPSHOT_DESIGNERS = '''
+    SELECT id, rating, experience, projects, price_range, location, api_json
+    FROM designers WHERE id > %s ORDER BY id
+'''
+SPECIALTIES_AFTER = '''
+    SELECT designer_id, specialty FROM designer_specialties
+    WHERE designer_id > %s ORDER BY designer_id
+'''
+DESIGNER_IDS = 'SELECT id FROM designers ORDER BY id'
+# Change feed: keyset on (change_seq, id), up to the horizon below which every change is committed
+DESIGNER_CHANGES = '''
+    SELECT change_seq, id, api_json FROM designers
+    WHERE (change_seq, id) > (%s, %s) AND change_seq < %s
+    ORDER BY change_seq, id LIMIT %s
+'''
+DESIGNER_TOMBSTONES = '''
+    SELECT change_seq, designer_id FROM designer_tombstones
+    WHERE (change_seq, designer_id) > (%s, %s) AND change_seq < %s
+    ORDER BY change_seq, designer_id LIMIT %s
+'''
+# Oldest transaction id still running; changes stamped at or after it may have company to come
+CHANGE_HORIZON_POSTGRES = 'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+CHANGES_HELD_BACK = '''
+    SELECT EXISTS (SELECT 1 FROM designers WHERE change_seq >= %s)
+        OR EXISTS (SELECT 1 FROM designer_tombstones WHERE change_seq >= %s)
+'''
+# SQLite numbers changes in commit order, so everything visible is final
+SQLITE_CHANGE_HORIZON = 2 ** 63 - 1
+# Counters are kept current by triggers (migration 007); these reads never scan
+CATALOGUE_TOTALS = 'SELECT name, SUM(value) FROM catalogue_stats GROUP BY name'
+TOP_SHORTLISTED = '''
+    SELECT d.id, d.name, s.shortlist_count, s.report_count
+    FROM designer_stats s
+    JOIN designers d ON d.id = s.designer_id
+    WHERE s.shortlist_count > 0
+    ORDER BY s.shortlist_count DESC, s.designer_id DESC
+    LIMIT %s
+'''
+POPULAR_DESIGNERS = '''
+    SELECT s.shortlist_count, d.api_json
+    FROM designer_stats s
+    JOIN designers d ON d.id = s.designer_id
+    WHERE s.shortlist_count > 0
+    ORDER BY s.shortlist_count DESC, s.designer_id DESC
+    LIMIT %s
+'''
+# Sums the window's range of the (bucket, designer_id) key; buckets past the longest
+# window are pruned
+_TRENDING_DESIGNERS = '''
+    SELECT t.adds, d.api_json
+    FROM (
+        SELECT designer_id, SUM(adds) AS adds
+        FROM shortlist_buckets
+        WHERE bucket >= %s
+        GROUP BY {group_key}
+        ORDER BY adds DESC, designer_id DESC
+        LIMIT %s
+    ) t
+    JOIN designers d ON d.id = t.designer_id
+    ORDER BY t.adds DESC, t.designer_id DESC
+'''
+# Unary + stops SQLite walking the designer_id index for the GROUP BY instead of the range
+TRENDING_DESIGNERS_SQLITE = _TRENDING_DESIGNERS.format(group_key='+designer_id')
+TRENDING_DESIGNERS_POSTGRES = _TRENDING_DESIGNERS.format(group_key='designer_id')
+PRUNE_SHORTLIST_BUCKETS = 'DELETE FROM shortlist_buckets WHERE bucket < %s'
+DESIGNER_COUNTS = '''
+    SELECT COALESCE(s.shortlist_count, 0), COALESCE(s.report_count, 0)
+    FROM designers d
+    LEFT JOIN designer_stats s ON s.designer_id = d.id
+    WHERE d.id = %s
+'''
+INSERT_REPORT = '''
+    INSERT INTO reports (designer_id, reason, description, user_session)
+    SELECT %s, %s, %s, %s WHERE EXISTS (SELECT 1 FROM designers WHERE id = %s)
+'''
+# Reports for designers deleted while queued are skipped, not failed on
+INSERT_REPORTS_SQLITE = '''
+    INSERT INTO reports (designer_id, reason, description, user_session)
+    SELECT %s, %s, %s, %s WHERE EXISTS (SELECT 1 FROM designers WHERE id = %s)
+'''
+INSERT_REPORTS_POSTGRES = '''
+    INSERT INTO reports (designer_id, reason, description, user_session)
+    SELECT v.designer_id, v.reason, v.description, v.user_session
+    FROM (VALUES %s) AS v (designer_id, reason, description, user_session)
+    JOIN designers d ON d.id = v.designer_id
+'''
+
+
+class Designer:
+    """One designers row for the admin pages; slots instead of a dict per row"""
+    __slots__ = DESIGNER_COLUMNS
+
+    def __init__(self, row):
+        for name, value in zip(DESIGNER_COLUMNS, row):
+            setattr(self, name, value)
+        # SQLite stores the lists as JSON text; Postgres JSONB arrives decoded
+        if isinstance(self.specialties, str):
+            self.specialties = json.loads(self.specialties)
+        if isinstance(self.portfolio, str):
+            self.portfolio = json.loads(self.portfolio)
+
+
+def _json_text(value):
+    return json.dumps(value) if isinstance(value, list) else value
+
+
+def designer_values(data):
+    """Column values for inserting a designer record; lists are stored as JSON text"""
+    return (data['name'], data['rating'], data['description'],
+            data['projects'], data['experience'], data['price_range'],
+            data['phone1'], data['phone2'], data['location'],
+            _json_text(data['specialties']), _json_text(data['portfolio']))
+
+
+class DesignerRepository:
+    """All SQL the app runs against designers, shortlists and reports.
+
+    Statements are written once with %s placeholders and translated per
+    backend the first time they run, never per call. SQLite then reuses
+    compiled statements from the connection's statement cache (keyed by SQL
+    text); on Postgres each connection PREPAREs a statement on first use and
+    EXECUTEs it afterwards, so the server parses and plans it only once.
+    Rows come back as tuples or Designer objects rather than dicts.
+    Transactions stay with the caller: methods never commit. When given,
+    on_query(shape, seconds) is called after every statement. On SQLite a
+    statement that could not open its transaction because another process
+    holds the write lock is retried up to ``lock_retries`` times.
+    """
+
+    def __init__(self, sqlite, prepare=True, on_query=None, lock_retries=0, lock_backoff=0.05):
+        self.sqlite = sqlite
+        # Server-side prepared statements do not survive transaction-mode poolers (pgbouncer)
+        self.prepare = prepare and not sqlite
+        self.on_query = on_query
+        self.lock_retries = lock_retries
+        self.lock_backoff = lock_backoff
+        self._lock_retried = 0
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._prepared = weakref.WeakKeyDictionary()
+
+    def cursor(self, conn, name=None):
+        """Cursor returning plain tuples on either backend"""
+        if self.sqlite:
+            return conn.cursor()
+        raw = getattr(conn, 'raw', conn)
+        if name:
+            return raw.cursor(name=name, cursor_factory=TupleCursor)
+        return raw.cursor(cursor_factory=TupleCursor)
+
+    def _statement(self, sql):
+        """Backend form of a %s statement: (text, prepared name, parameter count, shape)"""
+        statement = self._statements.get(sql)
+        if statement is None:
+            if self.sqlite:
+                statement = (sql.replace('%s', '?'), None, 0, query_shape(sql))
+            else:
+                count = sql.count('%s')
+                numbers = iter(range(1, count + 1))
+                text = re.sub(r'%s', lambda _: f'${next(numbers)}', sql)
+                name = 'stmt_' + hashlib.sha1(sql.encode('utf-8')).hexdigest()[:16]
+                statement = (text, name, count, query_shape(sql))
+            with self._lock:
+                if len(self._statements) < MAX_STATEMENTS:
+                    self._statements[sql] = statement
+        return statement
+
+    @contextmanager
+    def timed(self, sql):
+        """Report the enclosed statement(s) to on_query under sql's shape"""
+        if self.on_query is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.on_query(query_shape(sql), time.perf_counter() - started)
+
+    def execute(self, cur, sql, params=(), prepare=True):
+        """Run a %s-style statement, reusing the compiled/prepared form when possible"""
+        if not prepare:
+            # One-off shapes (variable IN-lists) are neither cached nor prepared
+            with self.timed(sql):
+                if self.sqlite:
+                    self._retry_locked(cur, cur.execute, sql.replace('%s', '?'), params)
+                else:
+                    cur.execute(sql, params)
+            return
+
+        statement = self._statement(sql)
+        started = time.perf_counter()
+        try:
+            self._execute(cur, sql, params, statement)
+        finally:
+            if self.on_query is not None:
+                self.on_query(statement[3], time.perf_counter() - started)
+
+    def _execute(self, cur, sql, params, statement):
+        text, name, count, _ = statement
+        if self.sqlite:
+            self._retry_locked(cur, cur.execute, text, params)
+            return
+        if not self.prepare:
+            cur.execute(sql, params)
+            return
+
+        with self._lock:
+            prepared = self._prepared.setdefault(cur.connection, set())
+        if name not in prepared:
+            if len(prepared) >= MAX_PREPARED_PER_CONNECTION:
+                cur.execute(sql, params)
+                return
+            # PREPARE is not transactional, so a later rollback does not undo it
+            cur.execute(f'PREPARE {name} AS {text}')
+            prepared.add(name)
+        if count:
+            cur.execute(f'EXECUTE {name} ({", ".join(["%s"] * count)})', params)
+        else:
+            cur.execute(f'EXECUTE {name}')
+
+    def _retry_locked(self, cur, run, *args):
+        """Run a SQLite call, backing off and retrying while the database is locked.
+
+        Only a call made outside a transaction is retried: then the failure
+        was the BEGIN (or a lone read) and nothing has happened yet. Inside
+        a transaction the caller must roll back and start over.
+        """
+        attempt = 0
+        while True:
+            in_transaction = cur.connection.in_transaction
+            try:
+                return run(*args)
+            except sqlite3.OperationalError as e:
+                if in_transaction or attempt >= self.lock_retries or 'locked' not in str(e):
+                    raise
+                # Exponential backoff with jitter, so waiting writers do not retry in step
+                time.sleep(self.lock_backoff * (2 ** attempt) * (0.5 + random.random()))
+                attempt += 1
+                with self._lock:
+                    self._lock_retried += 1
+
+    def lock_retry_count(self):
+        with self._lock:
+            return self._lock_retried
+
+    def prepared_count(self):
+        with self._lock:
+            return sum(len(names) for names in self._prepared.values())
+
+    # Designers
+
+    def count(self, conn):
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, COUNT_DESIGNERS)
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def id_range(self, conn):
+        """(lowest, highest) designer id, or (None, None) when empty"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, DESIGNER_ID_RANGE)
+            return tuple(cur.fetchone())
+        finally:
+            cur.close()
+
+    def recent(self, conn, limit=5):
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, RECENT_DESIGNERS, (limit,))
+            return [Designer(row) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def page_ids(self, conn, filters, before=None, after=None, limit=24):
+        """Ids of one newest-first page of matching designers, plus whether more lie beyond it.
+
+        Pages are keyed on id, which follows insertion order, so any page costs
+        the same as the first. ``before`` pages towards older designers and
+        ``after`` towards newer ones.
+        """
+        where, values = self.filter_clauses(filters)
+        if after is not None:
+            where.append('id > %s')
+            values.append(after)
+            order = 'ASC'
+        else:
+            if before is not None:
+                where.append('id < %s')
+                values.append(before)
+            order = 'DESC'
+        query = f'''
+            SELECT id FROM designers
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY id {order} LIMIT %s
+        '''
+        values.append(limit + 1)
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, query, tuple(values))
+            ids = [row[0] for row in cur.fetchall()]
+        finally:
+            cur.close()
+        more = len(ids) > limit
+        ids = ids[:limit]
+        if after is not None:
+            ids.reverse()
+        return ids, more
+
+    def by_ids(self, conn, designer_ids):
+        """Designer objects for the given ids, keyed by id; missing ids are left out"""
+        if not designer_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(designer_ids))
+        cur = self.cursor(conn)
+        try:
+            # One shape per list length, so not worth a prepared statement
+            self.execute(cur, f'{SELECT_DESIGNERS} WHERE id IN ({placeholders})',
+                         tuple(designer_ids), prepare=False)
+            return {row[0]: Designer(row) for row in cur.fetchall()}
+        finally:
+            cur.close()
+
+    def get_json(self, conn, designer_id):
+        """Precomputed API JSON for one designer, or None"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, DESIGNER_JSON, (designer_id,))
+            row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            cur.close()
+
+    @staticmethod
+    def filter_clauses(filters):
+        """WHERE conditions and their values for parsed list filters"""
+        where = []
+        values = []
+        if 'location' in filters:
+            where.append('location = %s')
+            values.append(filters['location'])
+        if 'price_range' in filters:
+            where.append('price_range = %s')
+            values.append(filters['price_range'])
+        if 'min_rating' in filters:
+            where.append('rating >= %s')
+            values.append(filters['min_rating'])
+        for specialty in filters.get('specialties', []):
+            # Resolved through the (specialty, designer_id) primary key, not the JSON column
+            where.append('id IN (SELECT designer_id FROM designer_specialties WHERE specialty = %s)')
+            values.append(specialty)
+        return where, values
+
+    @classmethod
+    def list_query(cls, params):
+        """Keyset query for a parsed designer list request; rows are (id, sort value, api_json)"""
+        where, values = cls.filter_clauses(params['filters'])
+
+        column = params['column']
+        source, key = 'designers', 'id'
+        if column == POPULARITY_COLUMN:
+            # Counted in designer_stats; its (shortlist_count, designer_id) index gives the order
+            source = 'designers JOIN designer_stats ON designer_stats.designer_id = designers.id'
+            key = 'designer_stats.designer_id'
+        comparison = '<' if params['order'] == 'desc' else '>'
+        if params['after'] is not None:
+            # Row-value comparison lets the (column, id) index seek straight to the page
+            where.append(f'({column}, {key}) {comparison} (%s, %s)')
+            values.extend(params['after'])
+
+        # api_json is maintained by the database, so rows are never decoded here
+        query = f'''
+            SELECT id, {column}, api_json
+            FROM {source}
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY {column} {params['order'].upper()}, {key} {params['order'].upper()}
+        '''
+        if params['limit'] is not None:
+            # Fetch one extra row to learn whether another page exists
+            query += ' LIMIT %s'
+            values.append(params['limit'] + 1)
+        return query, tuple(values)
+
+    def list_page(self, conn, params):
+        cur = self.cursor(conn)
+        try:
+            query, values = self.list_query(params)
+            self.execute(cur, query, values)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def open_stream(self, conn, params, batch_size):
+        """Cursor positioned on every matching designer, for the caller to fetchmany() from"""
+        query, values = self.list_query(params)
+        if self.sqlite:
+            cur = self.cursor(conn)
+        else:
+            # Named cursor keeps the result set on the server and pages it in;
+            # DECLARE cannot wrap EXECUTE, so this one is not prepared
+            cur = self.cursor(conn, name='designers_stream')
+            cur.itersize = batch_size
+        try:
+            self.execute(cur, query, values, prepare=False)
+        except Exception:
+            cur.close()
+            raise
+        return cur
+
+    def _batches(self, conn, sql, params, batch_size, name):
+        if self.sqlite:
+            cur = self.cursor(conn)
+        else:
+            # Server-side cursor, as in open_stream, so a full load is paged in
+            cur = self.cursor(conn, name=name)
+            cur.itersize = batch_size
+        try:
+            self.execute(cur, sql, params, prepare=False)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+
+    def facet_designers(self, conn, after_id, batch_size=5000):
+        """Batches of (id, location, price_range, rating) for designers with id > after_id"""
+        return self._batches(conn, FACET_DESIGNERS, (after_id,), batch_size, 'facet_designers')
+
+    def specialty_batches(self, conn, after_id, batch_size=5000):
+        """Batches of (designer_id, specialty) for designers with id > after_id"""
+        return self._batches(conn, SPECIALTIES_AFTER, (after_id,), batch_size, 'specialty_batches')
+
+    def snapshot_designers(self, conn, after_id, batch_size=5000):
+        """Batches of (id, rating, experience, projects, price_range, location, api_json) past after_id"""
+        return self._batches(conn, SNAPSHOT_DESIGNERS, (after_id,), batch_size, 'snapshot_designers')
+
+    def snapshot_designers_by_ids(self, conn, designer_ids):
+        """Snapshot rows and (designer_id, specialty) rows for the given ids, both in id order"""
+        if not designer_ids:
+            return [], []
+        placeholders = ', '.join(['%s'] * len(designer_ids))
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, f'''
+                SELECT id, rating, experience, projects, price_range, location, api_json
+                FROM designers WHERE id IN ({placeholders}) ORDER BY id
+            ''', tuple(designer_ids), prepare=False)
+            designers = cur.fetchall()
+            self.execute(cur, f'''
+                SELECT designer_id, specialty FROM designer_specialties
+                WHERE designer_id IN ({placeholders}) ORDER BY designer_id
+            ''', tuple(designer_ids), prepare=False)
+            return designers, cur.fetchall()
+        finally:
+            cur.close()
+
+    def designer_ids(self, conn, batch_size=50000):
+        """Batches of every designer id, ascending"""
+        return self._batches(conn, DESIGNER_IDS, (), batch_size, 'designer_ids')
+
+    def changes(self, conn, after, limit):
+        """Designers changed and deleted after the (change_seq, id) position ``after``.
+
+        Returns (designers, tombstones, held_back): up to limit + 1
+        (change_seq, id, api_json) and (change_seq, designer_id) rows, each
+        in change order. On Postgres, changes made by transactions that
+        started after one still running are left for a later call; held_back
+        says some were.
+        """
+        cur = self.cursor(conn)
+        try:
+            if self.sqlite:
+                horizon = SQLITE_CHANGE_HORIZON
+            else:
+                # Taken first: every transaction older than this has finished by the reads below
+                self.execute(cur, CHANGE_HORIZON_POSTGRES)
+                horizon = cur.fetchone()[0]
+            self.execute(cur, DESIGNER_CHANGES, (after[0], after[1], horizon, limit + 1))
+            designers = cur.fetchall()
+            self.execute(cur, DESIGNER_TOMBSTONES, (after[0], after[1], horizon, limit + 1))
+            tombstones = cur.fetchall()
+            held_back = False
+            if not self.sqlite:
+                self.execute(cur, CHANGES_HELD_BACK, (horizon, horizon))
+                held_back = cur.fetchone()[0]
+            return designers, tombstones, held_back
+        finally:
+            cur.close()
+
+    def search(self, conn, terms, limit, offset):
+        """api_json of designers matching every term (as a prefix), best match first"""
+        cur = self.cursor(conn)
+        try:
+            if self.sqlite:
+                # The trailing * turns each term into a prefix query;
+                # bm25 weights: name and specialties count more than description
+                match = ' '.join(f'"{term}"*' for term in terms)
+                self.execute(cur, SEARCH_SQLITE, (match, limit, offset))
+            else:
+                tsquery = ' & '.join(f'{term}:*' for term in terms)
+                self.execute(cur, SEARCH_POSTGRES, (tsquery, limit, offset))
+            return [row[0] for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def insert(self, conn, data):
+        """Insert one validated designer and return its id"""
+        cur = self.cursor(conn)
+        try:
+            if self.sqlite:
+                self.execute(cur, INSERT_DESIGNER, designer_values(data))
+                return cur.lastrowid
+            self.execute(cur, INSERT_DESIGNER + ' RETURNING id', designer_values(data))
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def insert_many(self, conn, rows):
+        """Insert many designer_values() rows with a single batched statement"""
+        cur = self.cursor(conn)
+        try:
+            with self.timed(INSERT_DESIGNER):
+                if self.sqlite:
+                    cur.execute(CREATE_DESIGNER_STAGING)
+                    self._retry_locked(cur, cur.executemany, self._statement(STAGE_DESIGNER)[0], rows)
+                    try:
+                        self._retry_locked(cur, cur.execute, INSERT_STAGED_DESIGNERS)
+                    finally:
+                        cur.execute(CLEAR_DESIGNER_STAGING)
+                else:
+                    # One multi-row VALUES statement per batch instead of a round trip per row
+                    execute_values(cur, f'INSERT INTO designers ({DESIGNER_INSERT_COLUMNS}) VALUES %s',
+                                   rows, page_size=len(rows))
+        finally:
+            cur.close()
+
+    def delete(self, conn, designer_id):
+        """Delete a designer with its shortlists and reports; returns its name, or None if absent"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, DESIGNER_NAME, (designer_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            # Delete related records first (to maintain referential integrity)
+            self.execute(cur, DELETE_SHORTLISTS_FOR, (designer_id,))
+            self.execute(cur, DELETE_REPORTS_FOR, (designer_id,))
+            self.execute(cur, DELETE_DESIGNER, (designer_id,))
+            return row[0]
+        finally:
+            cur.close()
+
+    # Shortlists
+
+    def toggle_shortlist(self, conn, designer_id, user_session):
+        """Remove the shortlist entry if present, otherwise add it.
+
+        Returns the new state, or None (writing nothing) if the designer does not exist.
+        """
+        cur = self.cursor(conn)
+        try:
+            if self.sqlite:
+                # SQLite has no DML in CTEs; the DELETE takes the write lock, so the
+                # INSERT that may follow cannot interleave with another toggle
+                self.execute(cur, UNSHORTLIST, (designer_id, user_session))
+                if cur.rowcount > 0:
+                    return False
+                self.execute(cur, SHORTLIST_IF_DESIGNER, (designer_id, user_session, designer_id))
+                return True if cur.rowcount > 0 else None
+            # One statement, one round trip
+            self.execute(cur, TOGGLE_SHORTLIST_POSTGRES,
+                         (designer_id, user_session, designer_id, designer_id, user_session))
+            shortlisted, found = cur.fetchone()
+            return shortlisted if found else None
+        finally:
+            cur.close()
+
+    def shortlisted_ids(self, conn, user_session):
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, SESSION_SHORTLIST, (user_session,))
+            return [row[0] for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def insert_shortlists(self, conn, rows):
+        """Bulk-insert (designer_id, user_session) rows, skipping ones already present"""
+        cur = self.cursor(conn)
+        try:
+            with self.timed(SHORTLIST):
+                if self.sqlite:
+                    self._retry_locked(cur, cur.executemany, self._statement(SHORTLIST)[0], rows)
+                else:
+                    execute_values(cur, '''
+                        INSERT INTO shortlists (designer_id, user_session) VALUES %s
+                        ON CONFLICT (designer_id, user_session) DO NOTHING
+                    ''', rows, page_size=len(rows))
+        finally:
+            cur.close()
+
+    def apply_shortlist_batch(self, conn, user_session, to_add, to_remove):
+        """Add and remove shortlist entries; returns the ids of to_add now shortlisted"""
+        cur = self.cursor(conn)
+        try:
+            # IN-list length varies per call, so these are not worth preparing
+            if to_remove:
+                placeholders = ', '.join(['%s'] * len(to_remove))
+                self.execute(cur, f'''
+                    DELETE FROM shortlists
+                    WHERE user_session = %s AND designer_id IN ({placeholders})
+                ''', (user_session, *to_remove), prepare=False)
+
+            if not to_add:
+                return set()
+            # Unknown designer ids are skipped rather than failing the whole batch
+            placeholders = ', '.join(['%s'] * len(to_add))
+            self.execute(cur, f'''
+                INSERT INTO shortlists (designer_id, user_session)
+                SELECT id, %s FROM designers WHERE id IN ({placeholders})
+                ON CONFLICT (designer_id, user_session) DO NOTHING
+            ''', (user_session, *to_add), prepare=False)
+            self.execute(cur, f'''
+                SELECT designer_id FROM shortlists
+                WHERE user_session = %s AND designer_id IN ({placeholders})
+            ''', (user_session, *to_add), prepare=False)
+            return {row[0] for row in cur.fetchall()}
+        finally:
+            cur.close()
+
+    # Statistics
+
+    def totals(self, conn):
+        """{'designers': n, 'shortlists': n, 'reports': n} from the trigger-maintained counters"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, CATALOGUE_TOTALS)
+            totals = {'designers': 0, 'shortlists': 0, 'reports': 0}
+            totals.update((name, int(value)) for name, value in cur.fetchall())
+            return totals
+        finally:
+            cur.close()
+
+    def top_shortlisted(self, conn, limit):
+        """(id, name, shortlist_count, report_count) of the most shortlisted designers"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, TOP_SHORTLISTED, (limit,))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def popular(self, conn, limit, since_bucket=None):
+        """(shortlists, api_json) of the most shortlisted designers, all time or since a bucket"""
+        cur = self.cursor(conn)
+        try:
+            if since_bucket is None:
+                self.execute(cur, POPULAR_DESIGNERS, (limit,))
+            else:
+                trending = TRENDING_DESIGNERS_SQLITE if self.sqlite else TRENDING_DESIGNERS_POSTGRES
+                self.execute(cur, trending, (since_bucket, limit))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def prune_shortlist_buckets(self, conn, before_bucket):
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, PRUNE_SHORTLIST_BUCKETS, (before_bucket,))
+        finally:
+            cur.close()
+
+    def designer_counts(self, conn, designer_id):
+        """(shortlist_count, report_count) for a designer, or None if it does not exist"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, DESIGNER_COUNTS, (designer_id,))
+            row = cur.fetchone()
+            return tuple(row) if row else None
+        finally:
+            cur.close()
+
+    # Reports
+
+    def insert_report(self, conn, designer_id, reason, description, user_session):
+        """Insert a report; returns False (writing nothing) if the designer does not exist"""
+        cur = self.cursor(conn)
+        try:
+            self.execute(cur, INSERT_REPORT, (designer_id, reason, description, user_session, designer_id))
+            return cur.rowcount > 0
+        finally:
+            cur.close()
+
+    def insert_reports(self, conn, reports):
+        """Insert (designer_id, reason, description, user_session) rows in one statement"""
+        cur = self.cursor(conn)
+        try:
+            if self.sqlite:
+                with self.timed(INSERT_REPORTS_SQLITE):
+                    self._retry_locked(cur, cur.executemany, self._statement(INSERT_REPORTS_SQLITE)[0],
+                                       [(r[0], r[1], r[2], r[3], r[0]) for r in reports])
+            else:
+                with self.timed(INSERT_REPORTS_POSTGRES):
+                    execute_values(cur, INSERT_REPORTS_POSTGRES, list(reports), page_size=len(reports))
+        finally:
+            cur.close()
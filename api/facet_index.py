@@ -0,0 +1,211 @@
+import threading
+import time
+
+# Facets reported by GET /api/designers/facets, named after their list filters
+FACETS = ('location', 'price_range', 'specialties')
+
+
+def _bits(ids):
+    """Bitmap with the given ids set, built in a bytearray spanning just their range"""
+    low = min(ids)
+    span = bytearray(((max(ids) - low) >> 3) + 1)
+    for designer_id in ids:
+        offset = designer_id - low
+        span[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(span, 'little') << low
+
+
+def _add_bits(masks, key, ids):
+    masks[key] = masks.get(key, 0) | _bits(ids)
+
+
+class FacetState:
+    """Bitmaps of designer ids: one for every designer, one per facet value and rating.
+
+    Bit n is set when designer n has the value, so a count under any filter
+    combination is an AND of a few bitmaps and a popcount. Each bitmap costs
+    about highest-id / 8 bytes.
+    """
+
+    def __init__(self):
+        self.all = 0
+        self.values = {name: {} for name in FACETS}
+        self.ratings = {}
+        self.high_water = 0
+
+    def add_designers(self, rows):
+        """Record (id, location, price_range, rating) rows sorted by id"""
+        if not rows:
+            return
+        groups = {'location': {}, 'price_range': {}}
+        ratings = {}
+        for designer_id, location, price_range, rating in rows:
+            groups['location'].setdefault(location, []).append(designer_id)
+            groups['price_range'].setdefault(price_range, []).append(designer_id)
+            ratings.setdefault(float(rating), []).append(designer_id)
+        self.all |= _bits([row[0] for row in rows])
+        for name, values in groups.items():
+            for value, ids in values.items():
+                _add_bits(self.values[name], value, ids)
+        for rating, ids in ratings.items():
+            _add_bits(self.ratings, rating, ids)
+        self.high_water = max(self.high_water, rows[-1][0])
+
+    def add_specialties(self, rows):
+        """Record (designer_id, specialty) rows sorted by designer_id"""
+        values = {}
+        for designer_id, specialty in rows:
+            values.setdefault(specialty, []).append(designer_id)
+        for specialty, ids in values.items():
+            _add_bits(self.values['specialties'], specialty, ids)
+
+    def merge(self, other):
+        self.all |= other.all
+        for name in FACETS:
+            for value, mask in other.values[name].items():
+                self.values[name][value] = self.values[name].get(value, 0) | mask
+        for rating, mask in other.ratings.items():
+            self.ratings[rating] = self.ratings.get(rating, 0) | mask
+        self.high_water = max(self.high_water, other.high_water)
+
+    def remove(self, designer_id):
+        bit = 1 << designer_id
+        self.all &= ~bit
+        for masks in (*self.values.values(), self.ratings):
+            for key, mask in list(masks.items()):
+                if mask & bit:
+                    mask &= ~bit
+                    if mask:
+                        masks[key] = mask
+                    else:
+                        del masks[key]
+
+    def count(self):
+        return self.all.bit_count()
+
+
+class FacetIndex:
+    """Per-process facet counts over the whole catalogue, kept in memory.
+
+    The first refresh() loads every designer; later ones only load designers
+    with ids above the highest one already indexed, so adds and uploads cost
+    one indexed range query. Deletes made through this worker are applied
+    with remove(). When the indexed count still disagrees with the database
+    (another worker deleted a designer, or a Postgres insert committed below
+    the high-water id) the index is rebuilt, at most once per
+    ``rebuild_interval`` seconds; in between counts may be slightly off.
+    """
+
+    def __init__(self, rebuild_interval=30.0):
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        # One refresh at a time, so a cold worker loads the catalogue once, not once per request
+        self._refresh_lock = threading.Lock()
+        self._state = FacetState()
+        # Bumped by remove() and rebuilds so a load that raced them is not merged
+        self._generation = 0
+        self._loaded_at = None
+        self._rebuilds = 0
+        self._catch_ups = 0
+
+    @staticmethod
+    def _load(designer_batches, specialty_batches):
+        state = FacetState()
+        for rows in designer_batches:
+            state.add_designers(rows)
+        for rows in specialty_batches:
+            state.add_specialties(rows)
+        return state
+
+    def refresh(self, designer_batches, specialty_batches, expected_count):
+        """Bring the index up to date.
+
+        The batch arguments are callables taking an id and returning batches
+        of rows above it (see DesignerRepository.facet_designers and
+        specialty_batches); expected_count is the database's designer count.
+        """
+        with self._refresh_lock:
+            self._refresh(designer_batches, specialty_batches, expected_count)
+
+    def _refresh(self, designer_batches, specialty_batches, expected_count):
+        with self._lock:
+            generation = self._generation
+            high_water = self._state.high_water
+            loaded = self._loaded_at is not None
+        delta = self._load(designer_batches(high_water), specialty_batches(high_water))
+        with self._lock:
+            if generation == self._generation:
+                self._state.merge(delta)
+                if delta.high_water:
+                    self._catch_ups += 1
+                if not loaded:
+                    self._loaded_at = time.monotonic()
+            if (self._loaded_at is None or self._state.count() == expected_count
+                    or time.monotonic() - self._loaded_at < self.rebuild_interval):
+                return
+            generation = self._generation
+        state = self._load(designer_batches(0), specialty_batches(0))
+        with self._lock:
+            if generation == self._generation:
+                self._state = state
+                self._generation += 1
+                self._loaded_at = time.monotonic()
+                self._rebuilds += 1
+
+    def remove(self, designer_id):
+        with self._lock:
+            self._state.remove(designer_id)
+            self._generation += 1
+
+    def counts(self, filters):
+        """{'total': n, 'facets': {facet: [{'value': v, 'count': n}, ...]}} under the filters.
+
+        Location and price range are counted with every filter except their
+        own, so the alternatives to a chosen value stay visible; specialties,
+        which narrow rather than switch, are counted with all filters applied.
+        """
+        with self._lock:
+            state = self._state
+            selected = {}
+            if 'location' in filters:
+                selected['location'] = state.values['location'].get(filters['location'], 0)
+            if 'price_range' in filters:
+                selected['price_range'] = state.values['price_range'].get(filters['price_range'], 0)
+            for specialty in filters.get('specialties', []):
+                mask = state.values['specialties'].get(specialty, 0)
+                selected['specialties'] = selected.get('specialties', state.all) & mask
+            if 'min_rating' in filters:
+                mask = 0
+                for rating, ids in state.ratings.items():
+                    if rating >= filters['min_rating']:
+                        mask |= ids
+                selected['min_rating'] = mask
+
+            def matching(excluded=None):
+                mask = state.all
+                for name, selection in selected.items():
+                    if name != excluded:
+                        mask &= selection
+                return mask
+
+            everything = matching()
+            facets = {}
+            for name in FACETS:
+                scope = everything if name == 'specialties' else matching(name)
+                counted = ((value, (mask & scope).bit_count())
+                           for value, mask in state.values[name].items())
+                facets[name] = [{'value': value, 'count': count}
+                                for value, count in sorted(counted, key=lambda item: (-item[1], item[0]))
+                                if count]
+            return {'total': everything.bit_count(), 'facets': facets}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'designers': self._state.count(),
+                'high_water': self._state.high_water,
+                'values': sum(len(values) for values in self._state.values.values()),
+                'catch_ups': self._catch_ups,
+                'rebuilds': self._rebuilds,
+                'generation': self._generation,
+            }
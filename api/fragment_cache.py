@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """Per-process LRU of rendered HTML fragments, keyed by designer id.
+
+    Designers are never edited in place and ids are never reused, so a
+    fragment only goes stale when its designer is deleted. discard() drops
+    that one entry and bumps the generation; a render that started before
+    the bump passes the generation it saw to put() and is not stored.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._discards = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get_many(self, keys):
+        """Cached fragments for the given keys as {key: html}; absent keys are misses"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                fragment = self._entries.get(key)
+                if fragment is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = fragment
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+
+    def put(self, key, fragment, generation):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = fragment
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._discards += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'discards': self._discards,
+                'generation': self._generation,
+            }
@@ -0,0 +1,182 @@
+"""Build a synthetic designer catalogue for benchmarking.
+
+Loads designers, shortlists and reports straight into the database named by
+DATABASE_URL (SQLite or Postgres), or writes designers to an NDJSON file that
+can be fed to /upload-json. Output is deterministic for a given --seed.
+
+    python generate_catalogue.py --size 100k
+    DATABASE_URL=postgresql://localhost/emptycup_bench python generate_catalogue.py --size 1m
+    python generate_catalogue.py --size 10000 --ndjson designers.ndjson
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+BATCH_SIZE = 5_000
+
+NAME_WORDS = ['Studio', 'Atelier', 'Design', 'Interiors', 'Spaces', 'Works', 'House',
+              'Collective', 'Living', 'Habitat', 'Nest', 'Craft', 'Form', 'Canvas', 'Loft']
+NAME_PREFIXES = ['Epic', 'Urban', 'Zen', 'Modern', 'Bloom', 'Cedar', 'Indigo', 'Terra',
+                 'Lumen', 'Oak', 'Saffron', 'Slate', 'Willow', 'Ember', 'Coral', 'Nova']
+# (city, weight): a few metros dominate, as in the real catalogue
+LOCATIONS = [('Bangalore', 20), ('Mumbai', 18), ('Delhi', 15), ('Hyderabad', 10),
+             ('Chennai', 9), ('Pune', 8), ('Kolkata', 6), ('Ahmedabad', 5),
+             ('Jaipur', 3), ('Kochi', 2), ('Chandigarh', 2), ('Goa', 2)]
+PRICE_RANGES = [('$', 35), ('$$', 45), ('$$$', 20)]
+SPECIALTIES = ['Residential', 'Commercial', 'Modern', 'Minimalist', 'Luxury', 'Contemporary',
+               'Traditional', 'Scandinavian', 'Industrial', 'Bohemian', 'Kitchen', 'Office',
+               'Hospitality', 'Retail', 'Sustainable', 'Art Deco']
+PORTFOLIO_IMAGES = [
+    'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=400',
+    'https://images.unsplash.com/photo-1522708323590-d24dbb6b0267?w=400',
+    'https://images.unsplash.com/photo-1560448204-e02f11c3d0e2?w=400',
+    'https://images.unsplash.com/photo-1618221195710-dd6b41faaea8?w=400',
+    'https://images.unsplash.com/photo-1600210492486-724fe5c67fb0?w=400',
+    'https://images.unsplash.com/photo-1615874959474-d609969a20ed?w=400',
+]
+REPORT_REASONS = ['Fake profile', 'Wrong contact details', 'Inappropriate content',
+                  'Outdated portfolio', 'Spam']
+
+
+def parse_size(value):
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'size must be one of {", ".join(SIZES)} or an integer')
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def make_designer(rng, n):
+    """One valid designer record, shaped like POST /api/designers input"""
+    team = rng.randint(2, 25)
+    experience = rng.randint(1, 30)
+    location = _weighted(rng, LOCATIONS)
+    return {
+        'name': f'{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_WORDS)} {n}',
+        # Ratings cluster around 4, like most review sites
+        'rating': round(min(5.0, max(1.0, rng.gauss(4.0, 0.6))), 1),
+        'description': (f'Team of {team} designers working out of {location} '
+                        f'with an experience of {experience} years.'),
+        'projects': rng.randint(1, 40 * experience),
+        'experience': experience,
+        'price_range': _weighted(rng, PRICE_RANGES),
+        'phone1': f'+91 - 9{rng.randint(10**8, 10**9 - 1)}',
+        'phone2': f'+91 - 9{rng.randint(10**8, 10**9 - 1)}',
+        'location': location,
+        'specialties': rng.sample(SPECIALTIES, rng.randint(1, 4)),
+        'portfolio': rng.sample(PORTFOLIO_IMAGES, rng.randint(1, 5)),
+    }
+
+
+def iter_designers(count, seed):
+    rng = random.Random(seed)
+    for n in range(count):
+        yield make_designer(rng, n + 1)
+
+
+def write_ndjson(path, count, seed):
+    """Write designers as NDJSON for /upload-json"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for designer in iter_designers(count, seed):
+            f.write(json.dumps(designer, separators=(',', ':')) + '\n')
+
+
+def load_database(count, seed, sessions, shortlists_per_session, reports):
+    """Insert designers, then shortlists and reports referencing them"""
+    # Imported late so DATABASE_URL from the command line is honoured
+    from app import get_db_connection, migrate_database, repository
+    from designer_repository import designer_values
+
+    if not migrate_database():
+        sys.exit('Could not migrate the database')
+    conn = get_db_connection()
+    if not conn:
+        sys.exit('Could not connect to the database')
+
+    try:
+        started = time.monotonic()
+        batch = []
+        for designer in iter_designers(count, seed):
+            batch.append(designer_values(designer))
+            if len(batch) >= BATCH_SIZE:
+                repository.insert_many(conn, batch)
+                conn.commit()
+                batch = []
+        if batch:
+            repository.insert_many(conn, batch)
+            conn.commit()
+        print(f'Inserted {count} designers in {time.monotonic() - started:.1f}s')
+
+        # New designers hold the highest ids; shortlists and reports point at them
+        low, high = repository.id_range(conn)
+        first_id = max(low, high - count + 1)
+
+        rng = random.Random(seed + 1)
+        started = time.monotonic()
+        rows = []
+        for s in range(sessions):
+            session = f'bench_session_{s}'
+            for _ in range(rng.randint(0, 2 * shortlists_per_session)):
+                rows.append((rng.randint(first_id, high), session))
+            if len(rows) >= BATCH_SIZE:
+                repository.insert_shortlists(conn, rows)
+                conn.commit()
+                rows = []
+        if rows:
+            repository.insert_shortlists(conn, rows)
+            conn.commit()
+        print(f'Inserted shortlists for {sessions} sessions in {time.monotonic() - started:.1f}s')
+
+        started = time.monotonic()
+        rows = []
+        for _ in range(reports):
+            rows.append((rng.randint(first_id, high), rng.choice(REPORT_REASONS),
+                         'Generated for benchmarking', f'bench_session_{rng.randrange(max(sessions, 1))}'))
+            if len(rows) >= BATCH_SIZE:
+                repository.insert_reports(conn, rows)
+                conn.commit()
+                rows = []
+        if rows:
+            repository.insert_reports(conn, rows)
+            conn.commit()
+        print(f'Inserted {reports} reports in {time.monotonic() - started:.1f}s')
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic designer catalogue')
+    parser.add_argument('--size', type=parse_size, default=SIZES['1k'],
+                        help='number of designers: 1k, 100k, 1m or an integer (default 1k)')
+    parser.add_argument('--database-url', help='defaults to $DATABASE_URL, as for the app')
+    parser.add_argument('--ndjson', metavar='PATH', help='write designers to an NDJSON file instead')
+    parser.add_argument('--sessions', type=int, help='shortlisting sessions (default size / 10)')
+    parser.add_argument('--shortlists-per-session', type=int, default=5)
+    parser.add_argument('--reports', type=int, help='reports to insert (default size / 20)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.ndjson:
+        write_ndjson(args.ndjson, args.size, args.seed)
+        print(f'Wrote {args.size} designers to {args.ndjson}')
+        return
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    sessions = args.sessions if args.sessions is not None else max(1, args.size // 10)
+    reports = args.reports if args.reports is not None else args.size // 20
+    load_database(args.size, args.seed, sessions, args.shortlists_per_session, reports)
+
+
+if __name__ == '__main__':
+    main()
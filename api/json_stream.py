@@ -0,0 +1,125 @@
+import codecs
+import json
+
+CHUNK_SIZE = 64 * 1024
+# Largest single record we are willing to buffer while looking for its end
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789+-.eE'
+_LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+
+
+class JSONStreamError(ValueError):
+    """Malformed or undecodable JSON in a streamed upload"""
+
+
+class _StreamBuffer:
+    """Decoded text window over a byte stream, refilled chunk by chunk"""
+
+    def __init__(self, stream, chunk_size):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._json = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Drop consumed text and append the next decoded chunk"""
+        data = self._stream.read(self._chunk_size)
+        try:
+            text = self._decoder.decode(data, final=not data)
+        except UnicodeDecodeError:
+            raise JSONStreamError('File is not valid UTF-8')
+        if not data:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        if len(self.buf) > MAX_RECORD_SIZE:
+            raise JSONStreamError('Record exceeds the maximum size')
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at end of input"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self.fill()
+
+    def _truncated(self, e):
+        """True when a decode error only means the record runs past the buffered text"""
+        rest = self.buf[e.pos:]
+        if e.msg.startswith('Unterminated string'):
+            return True
+        if e.msg.startswith('Invalid \\uXXXX escape'):
+            # The escape (or the second half of a surrogate pair) may be cut short
+            return len(rest) < 12
+        # Nothing left, or a number or literal cut short ("-", "2.", "tr")
+        return (all(char in _NUMBER_CHARS for char in rest) or
+                any(literal.startswith(rest) for literal in _LITERALS))
+
+    def _may_continue(self, value, end):
+        """True when a number stops short of text that could still extend it ("2." + "5")"""
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        return all(char in _NUMBER_CHARS for char in self.buf[end:])
+
+    def decode_value(self, record_number):
+        """Decode one complete JSON value starting at the next non-whitespace character"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof or not self._truncated(e):
+                    # Anything else is broken for good; reading on would only buffer the rest
+                    raise JSONStreamError(f'Malformed JSON in record {record_number}: {e.msg}')
+                self.fill()
+                continue
+            if not self.eof and (end == len(self.buf) or self._may_continue(value, end)):
+                # A number or literal may continue in the next chunk
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_records(stream, chunk_size=CHUNK_SIZE):
+    """Yield records one at a time from a JSON array or newline-delimited JSON stream.
+
+    Only the current chunk and the record being decoded are held in memory,
+    so callers can process uploads of any size in bounded space.
+    """
+    reader = _StreamBuffer(stream, chunk_size)
+    first = reader.peek()
+    if first == '':
+        raise JSONStreamError('File is empty')
+
+    record_number = 1
+    if first != '[':
+        # Newline-delimited JSON: whitespace-separated values, one record each
+        while reader.peek() != '':
+            yield reader.decode_value(record_number)
+            record_number += 1
+        return
+
+    reader.pos += 1
+    if reader.peek() == ']':
+        reader.pos += 1
+    else:
+        while True:
+            yield reader.decode_value(record_number)
+            record_number += 1
+            separator = reader.peek()
+            reader.pos += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise JSONStreamError(f"Expected ',' or ']' after record {record_number - 1}")
+
+    if reader.peek() != '':
+        raise JSONStreamError('Unexpected data after the designers array')
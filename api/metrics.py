@@ -0,0 +1,119 @@
+import re
+import threading
+
+# Upper bounds in seconds, as Prometheus expects; +Inf is implied
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Distinct query shapes tracked before the rest are folded into one series
+MAX_QUERY_SHAPES = 200
+OTHER_SHAPE = 'other'
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def query_shape(sql):
+    """Stable label for a statement: whitespace collapsed, IN-lists of any length folded"""
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', sql).strip())
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram; callers hold the registry lock"""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """In-process request and query timings, rendered in Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers; Prometheus sums them when it
+    scrapes every worker, or the figures describe whichever worker answered.
+    """
+
+    def __init__(self, slow_query_seconds=0.2):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._request_counts = {}
+        self._queries = {}
+        self._slow_queries = 0
+
+    def observe_request(self, route, method, status, seconds):
+        with self._lock:
+            key = (route, method)
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+            count_key = (route, method, status)
+            self._request_counts[count_key] = self._request_counts.get(count_key, 0) + 1
+
+    def observe_query(self, shape, seconds):
+        slow = self.slow_query_seconds > 0 and seconds >= self.slow_query_seconds
+        with self._lock:
+            histogram = self._queries.get(shape)
+            if histogram is None:
+                label = OTHER_SHAPE if len(self._queries) >= MAX_QUERY_SHAPES else shape
+                histogram = self._queries.setdefault(label, Histogram())
+            histogram.observe(seconds)
+            if slow:
+                self._slow_queries += 1
+        if slow:
+            print(f"Slow query ({seconds * 1000:.1f} ms): {shape}")
+
+    @staticmethod
+    def _histogram_lines(name, labels, histogram):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}'
+        yield f'{name}_sum{{{labels}}} {histogram.total:.6f}'
+        yield f'{name}_count{{{labels}}} {histogram.count}'
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of every series plus the given {name: value} gauges"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP emptycup_http_request_duration_seconds Time to produce a response')
+            lines.append('# TYPE emptycup_http_request_duration_seconds histogram')
+            for (route, method), histogram in sorted(self._requests.items()):
+                labels = f'route="{_label(route)}",method="{method}"'
+                lines.extend(self._histogram_lines('emptycup_http_request_duration_seconds',
+                                                   labels, histogram))
+
+            lines.append('# HELP emptycup_http_requests_total Responses by route, method and status')
+            lines.append('# TYPE emptycup_http_requests_total counter')
+            for (route, method, status), count in sorted(self._request_counts.items()):
+                lines.append(f'emptycup_http_requests_total{{route="{_label(route)}",'
+                             f'method="{method}",status="{status}"}} {count}')
+
+            lines.append('# HELP emptycup_db_query_duration_seconds SQL statement execution time by query shape')
+            lines.append('# TYPE emptycup_db_query_duration_seconds histogram')
+            for shape, histogram in sorted(self._queries.items()):
+                lines.extend(self._histogram_lines('emptycup_db_query_duration_seconds',
+                                                   f'query="{_label(shape)}"', histogram))
+
+            lines.append('# HELP emptycup_db_slow_queries_total Statements slower than the slow-query threshold')
+            lines.append('# TYPE emptycup_db_slow_queries_total counter')
+            lines.append(f'emptycup_db_slow_queries_total {self._slow_queries}')
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,831 @@
+import sqlite3
+import time
+
+# Arbitrary constant shared by every worker; pg_advisory_xact_lock serializes runners on it
+MIGRATION_LOCK_ID = 7_201_451
+# Width of a shortlist_buckets time bucket; baked into the triggers of migration 008
+SHORTLIST_BUCKET_SECONDS = 3600
+
+
+def _base_schema(cur, sqlite):
+    """designers, shortlists and reports tables"""
+    # Create designers table
+    if sqlite:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                rating REAL NOT NULL,
+                description TEXT NOT NULL,
+                projects INTEGER NOT NULL,
+                experience INTEGER NOT NULL,
+                price_range TEXT NOT NULL,
+                phone1 TEXT NOT NULL,
+                phone2 TEXT NOT NULL,
+                location TEXT NOT NULL,
+                specialties TEXT NOT NULL,
+                portfolio TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    else:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designers (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                rating DECIMAL(2,1) NOT NULL,
+                description TEXT NOT NULL,
+                projects INTEGER NOT NULL,
+                experience INTEGER NOT NULL,
+                price_range VARCHAR(10) NOT NULL,
+                phone1 VARCHAR(20) NOT NULL,
+                phone2 VARCHAR(20) NOT NULL,
+                location VARCHAR(100) NOT NULL,
+                specialties JSONB NOT NULL,
+                portfolio JSONB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    # Create shortlists table
+    if sqlite:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS shortlists (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                designer_id INTEGER REFERENCES designers(id),
+                user_session TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(designer_id, user_session)
+            )
+        ''')
+
+        # Create reports table
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                designer_id INTEGER REFERENCES designers(id),
+                reason TEXT NOT NULL,
+                description TEXT,
+                user_session TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    else:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS shortlists (
+                id SERIAL PRIMARY KEY,
+                designer_id INTEGER REFERENCES designers(id),
+                user_session VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(designer_id, user_session)
+            )
+        ''')
+
+        # Create reports table
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS reports (
+                id SERIAL PRIMARY KEY,
+                designer_id INTEGER REFERENCES designers(id),
+                reason VARCHAR(100) NOT NULL,
+                description TEXT,
+                user_session VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+
+def _designer_list_indexes(cur, sqlite):
+    """Indexes backing the keyset sorts and filters of GET /api/designers"""
+    for index_sql in [
+        'CREATE INDEX IF NOT EXISTS idx_designers_rating_id ON designers (rating, id)',
+        'CREATE INDEX IF NOT EXISTS idx_designers_price_range_id ON designers (price_range, id)',
+        'CREATE INDEX IF NOT EXISTS idx_designers_experience_id ON designers (experience, id)',
+        'CREATE INDEX IF NOT EXISTS idx_designers_projects_id ON designers (projects, id)',
+        'CREATE INDEX IF NOT EXISTS idx_designers_location_experience ON designers (location, experience, id)',
+    ]:
+        cur.execute(index_sql)
+
+
+def _search_index(cur, sqlite):
+    """Create the full-text index over name, description and specialties"""
+    if sqlite:
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'designers_fts'")
+        exists = cur.fetchone() is not None
+        # External-content FTS5 table: the index lives here, the text stays in designers
+        cur.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS designers_fts USING fts5(
+                name, description, specialties,
+                content='designers', content_rowid='id',
+                prefix='2 3'
+            )
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_fts_insert AFTER INSERT ON designers BEGIN
+                INSERT INTO designers_fts (rowid, name, description, specialties)
+                VALUES (new.id, new.name, new.description, new.specialties);
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_fts_delete AFTER DELETE ON designers BEGIN
+                INSERT INTO designers_fts (designers_fts, rowid, name, description, specialties)
+                VALUES ('delete', old.id, old.name, old.description, old.specialties);
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_fts_update AFTER UPDATE ON designers BEGIN
+                INSERT INTO designers_fts (designers_fts, rowid, name, description, specialties)
+                VALUES ('delete', old.id, old.name, old.description, old.specialties);
+                INSERT INTO designers_fts (rowid, name, description, specialties)
+                VALUES (new.id, new.name, new.description, new.specialties);
+            END
+        ''')
+        if not exists:
+            # Index designers that were added before the search table existed
+            cur.execute("INSERT INTO designers_fts (designers_fts) VALUES ('rebuild')")
+    else:
+        # Stored generated column: Postgres recomputes it on every insert and update
+        cur.execute('''
+            ALTER TABLE designers ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                setweight(jsonb_to_tsvector('simple', specialties, '["string"]'), 'A') ||
+                setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+            ) STORED
+        ''')
+        cur.execute('''
+            CREATE INDEX IF NOT EXISTS idx_designers_search_vector
+            ON designers USING GIN (search_vector)
+        ''')
+
+
+def _specialties_index(cur, sqlite):
+    """Create designer_specialties, the normalized specialty -> designer index"""
+    if sqlite:
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'designer_specialties'")
+        exists = cur.fetchone() is not None
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designer_specialties (
+                specialty TEXT NOT NULL,
+                designer_id INTEGER NOT NULL REFERENCES designers(id),
+                PRIMARY KEY (specialty, designer_id)
+            ) WITHOUT ROWID
+        ''')
+        # Triggers keep the index in step with the specialties JSON on every write path
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_specialties_insert AFTER INSERT ON designers BEGIN
+                INSERT OR IGNORE INTO designer_specialties (specialty, designer_id)
+                SELECT value, new.id FROM json_each(new.specialties);
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_specialties_update AFTER UPDATE OF specialties ON designers BEGIN
+                DELETE FROM designer_specialties WHERE designer_id = old.id;
+                INSERT OR IGNORE INTO designer_specialties (specialty, designer_id)
+                SELECT value, new.id FROM json_each(new.specialties);
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_specialties_delete AFTER DELETE ON designers BEGIN
+                DELETE FROM designer_specialties WHERE designer_id = old.id;
+            END
+        ''')
+        backfill = '''
+            INSERT OR IGNORE INTO designer_specialties (specialty, designer_id)
+            SELECT j.value, d.id FROM designers d, json_each(d.specialties) j
+        '''
+    else:
+        cur.execute("SELECT to_regclass('designer_specialties') IS NOT NULL AS present")
+        exists = cur.fetchone()['present']
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designer_specialties (
+                specialty VARCHAR(100) NOT NULL,
+                designer_id INTEGER NOT NULL REFERENCES designers(id) ON DELETE CASCADE,
+                PRIMARY KEY (specialty, designer_id)
+            )
+        ''')
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION designers_sync_specialties() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' THEN
+                    DELETE FROM designer_specialties WHERE designer_id = OLD.id;
+                END IF;
+                INSERT INTO designer_specialties (specialty, designer_id)
+                SELECT value, NEW.id FROM jsonb_array_elements_text(NEW.specialties)
+                ON CONFLICT DO NOTHING;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cur.execute('''
+            DROP TRIGGER IF EXISTS designers_specialties_sync ON designers
+        ''')
+        # Deletes are covered by ON DELETE CASCADE
+        cur.execute('''
+            CREATE TRIGGER designers_specialties_sync
+            AFTER INSERT OR UPDATE OF specialties ON designers
+            FOR EACH ROW EXECUTE FUNCTION designers_sync_specialties()
+        ''')
+        backfill = '''
+            INSERT INTO designer_specialties (specialty, designer_id)
+            SELECT jsonb_array_elements_text(specialties), id FROM designers
+            ON CONFLICT DO NOTHING
+        '''
+
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_designer_specialties_designer
+        ON designer_specialties (designer_id)
+    ''')
+    if not exists:
+        # Index designers that were added before the table existed
+        cur.execute(backfill)
+
+
+def _secondary_indexes(cur, sqlite):
+    """Indexes for the delete routes' child-table scans and the admin list sort"""
+    # shortlists(designer_id, ...) is already led by UNIQUE(designer_id, user_session) and
+    # designers(experience, ...) by idx_designers_experience_id, so neither gets a copy
+    for index_sql in [
+        'CREATE INDEX IF NOT EXISTS idx_reports_designer_id ON reports (designer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_shortlists_user_session ON shortlists (user_session)',
+        'CREATE INDEX IF NOT EXISTS idx_designers_created_at ON designers (created_at)',
+    ]:
+        cur.execute(index_sql)
+
+
+# API representation of a designer row, built by the database on every write
+SQLITE_API_JSON = '''json_object(
+    'id', {row}.id, 'name', {row}.name, 'rating', {row}.rating,
+    'description', {row}.description, 'projects', {row}.projects,
+    'experience', {row}.experience, 'price_range', {row}.price_range,
+    'priceRange', {row}.price_range, 'phone1', {row}.phone1, 'phone2', {row}.phone2,
+    'location', {row}.location, 'specialties', json({row}.specialties),
+    'portfolio', json({row}.portfolio)
+)'''
+
+_POSTGRES_API_JSON = '''jsonb_build_object(
+    'id', NEW.id, 'name', NEW.name, 'rating', NEW.rating,
+    'description', NEW.description, 'projects', NEW.projects,
+    'experience', NEW.experience, 'price_range', NEW.price_range,
+    'priceRange', NEW.price_range, 'phone1', NEW.phone1, 'phone2', NEW.phone2,
+    'location', NEW.location, 'specialties', NEW.specialties,
+    'portfolio', NEW.portfolio
+)::text'''
+
+# Every column the API representation is built from
+_API_JSON_SOURCE_COLUMNS = ('name, rating, description, projects, experience, price_range, '
+                            'phone1, phone2, location, specialties, portfolio')
+
+
+def _precomputed_api_json(cur, sqlite):
+    """designers.api_json: each designer's serialized API representation"""
+    if sqlite:
+        cur.execute('ALTER TABLE designers ADD COLUMN api_json TEXT')
+        # Writing api_json must not re-index the row in FTS, so narrow that trigger
+        cur.execute('DROP TRIGGER IF EXISTS designers_fts_update')
+        cur.execute('''
+            CREATE TRIGGER designers_fts_update AFTER UPDATE OF name, description, specialties
+            ON designers BEGIN
+                INSERT INTO designers_fts (designers_fts, rowid, name, description, specialties)
+                VALUES ('delete', old.id, old.name, old.description, old.specialties);
+                INSERT INTO designers_fts (rowid, name, description, specialties)
+                VALUES (new.id, new.name, new.description, new.specialties);
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER designers_api_json_insert AFTER INSERT ON designers BEGIN
+                UPDATE designers SET api_json = {SQLITE_API_JSON.format(row='new')}
+                WHERE id = new.id;
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER designers_api_json_update AFTER UPDATE OF {_API_JSON_SOURCE_COLUMNS}
+            ON designers BEGIN
+                UPDATE designers SET api_json = {SQLITE_API_JSON.format(row='new')}
+                WHERE id = new.id;
+            END
+        ''')
+        cur.execute(f'UPDATE designers SET api_json = {SQLITE_API_JSON.format(row="designers")}')
+    else:
+        cur.execute('ALTER TABLE designers ADD COLUMN IF NOT EXISTS api_json TEXT')
+        cur.execute(f'''
+            CREATE OR REPLACE FUNCTION designers_build_api_json() RETURNS trigger AS $$
+            BEGIN
+                NEW.api_json := {_POSTGRES_API_JSON};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cur.execute('DROP TRIGGER IF EXISTS designers_api_json ON designers')
+        cur.execute(f'''
+            CREATE TRIGGER designers_api_json
+            BEFORE INSERT OR UPDATE OF {_API_JSON_SOURCE_COLUMNS} ON designers
+            FOR EACH ROW EXECUTE FUNCTION designers_build_api_json()
+        ''')
+        # Touch a source column so the trigger fills in existing rows
+        cur.execute('UPDATE designers SET name = name')
+
+
+def _catalogue_stats(cur, sqlite):
+    """Counter tables behind the dashboard and /api/stats, maintained by triggers"""
+    if sqlite:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS catalogue_stats (
+                name TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (name, shard)
+            ) WITHOUT ROWID
+        ''')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designer_stats (
+                designer_id INTEGER PRIMARY KEY REFERENCES designers(id),
+                shortlist_count INTEGER NOT NULL DEFAULT 0,
+                report_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # SQLite has one writer at a time, so a single shard per counter is enough
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_stats_insert AFTER INSERT ON designers BEGIN
+                INSERT INTO catalogue_stats (name, shard, value) VALUES ('designers', 0, 1)
+                ON CONFLICT (name, shard) DO UPDATE SET value = value + 1;
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_stats_delete AFTER DELETE ON designers BEGIN
+                INSERT INTO catalogue_stats (name, shard, value) VALUES ('designers', 0, -1)
+                ON CONFLICT (name, shard) DO UPDATE SET value = value - 1;
+                DELETE FROM designer_stats WHERE designer_id = old.id;
+            END
+        ''')
+        for table, column in (('shortlists', 'shortlist_count'), ('reports', 'report_count')):
+            cur.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_stats_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO catalogue_stats (name, shard, value) VALUES ('{table}', 0, 1)
+                    ON CONFLICT (name, shard) DO UPDATE SET value = value + 1;
+                    INSERT INTO designer_stats (designer_id, {column}) VALUES (new.designer_id, 1)
+                    ON CONFLICT (designer_id) DO UPDATE SET {column} = {column} + 1;
+                END
+            ''')
+            cur.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_stats_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO catalogue_stats (name, shard, value) VALUES ('{table}', 0, -1)
+                    ON CONFLICT (name, shard) DO UPDATE SET value = value - 1;
+                    UPDATE designer_stats SET {column} = {column} - 1
+                    WHERE designer_id = old.designer_id;
+                END
+            ''')
+    else:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS catalogue_stats (
+                name VARCHAR(50) NOT NULL,
+                shard INTEGER NOT NULL,
+                value BIGINT NOT NULL,
+                PRIMARY KEY (name, shard)
+            )
+        ''')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designer_stats (
+                designer_id INTEGER PRIMARY KEY REFERENCES designers(id) ON DELETE CASCADE,
+                shortlist_count INTEGER NOT NULL DEFAULT 0,
+                report_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # Statement-level triggers apply one delta per statement, so a bulk import
+        # costs one counter update rather than one per row. Each backend adds to
+        # its own shard, so concurrent writers do not queue on a single hot row.
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION catalogue_stats_count() RETURNS trigger AS $$
+            DECLARE
+                delta BIGINT;
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    SELECT count(*) INTO delta FROM new_rows;
+                ELSE
+                    SELECT -count(*) INTO delta FROM old_rows;
+                END IF;
+                IF delta <> 0 THEN
+                    INSERT INTO catalogue_stats (name, shard, value)
+                    VALUES (TG_ARGV[0], pg_backend_pid() % 8, delta)
+                    ON CONFLICT (name, shard) DO UPDATE SET value = catalogue_stats.value + EXCLUDED.value;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        # Rows are locked in designer_id order so concurrent batches cannot deadlock
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION designer_stats_count() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    EXECUTE format(
+                        'INSERT INTO designer_stats (designer_id, %1$I)
+                         SELECT designer_id, count(*) FROM new_rows
+                         WHERE designer_id IS NOT NULL
+                         GROUP BY designer_id ORDER BY designer_id
+                         ON CONFLICT (designer_id) DO UPDATE SET %1$I = designer_stats.%1$I + EXCLUDED.%1$I',
+                        TG_ARGV[0]);
+                ELSE
+                    PERFORM 1 FROM designer_stats
+                    WHERE designer_id IN (SELECT designer_id FROM old_rows)
+                    ORDER BY designer_id FOR UPDATE;
+                    EXECUTE format(
+                        'UPDATE designer_stats s SET %1$I = s.%1$I - d.n
+                         FROM (SELECT designer_id, count(*) AS n FROM old_rows GROUP BY designer_id) d
+                         WHERE s.designer_id = d.designer_id',
+                        TG_ARGV[0]);
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        for table, column in (('designers', None), ('shortlists', 'shortlist_count'),
+                              ('reports', 'report_count')):
+            for event, transition in (('insert', 'NEW TABLE AS new_rows'),
+                                      ('delete', 'OLD TABLE AS old_rows')):
+                cur.execute(f'DROP TRIGGER IF EXISTS {table}_stats_{event} ON {table}')
+                cur.execute(f'''
+                    CREATE TRIGGER {table}_stats_{event}
+                    AFTER {event.upper()} ON {table} REFERENCING {transition}
+                    FOR EACH STATEMENT EXECUTE FUNCTION catalogue_stats_count('{table}')
+                ''')
+                if column:
+                    cur.execute(f'DROP TRIGGER IF EXISTS {table}_designer_stats_{event} ON {table}')
+                    cur.execute(f'''
+                        CREATE TRIGGER {table}_designer_stats_{event}
+                        AFTER {event.upper()} ON {table} REFERENCING {transition}
+                        FOR EACH STATEMENT EXECUTE FUNCTION designer_stats_count('{column}')
+                    ''')
+
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_designer_stats_shortlists
+        ON designer_stats (shortlist_count, designer_id)
+    ''')
+
+    # Start the counters from what is already there
+    cur.execute('DELETE FROM catalogue_stats')
+    cur.execute('DELETE FROM designer_stats')
+    for table in ('designers', 'shortlists', 'reports'):
+        cur.execute(f"INSERT INTO catalogue_stats (name, shard, value) SELECT '{table}', 0, COUNT(*) FROM {table}")
+    cur.execute('''
+        INSERT INTO designer_stats (designer_id, shortlist_count, report_count)
+        SELECT d.id,
+               (SELECT COUNT(*) FROM shortlists s WHERE s.designer_id = d.id),
+               (SELECT COUNT(*) FROM reports r WHERE r.designer_id = d.id)
+        FROM designers d
+        WHERE EXISTS (SELECT 1 FROM shortlists s WHERE s.designer_id = d.id)
+           OR EXISTS (SELECT 1 FROM reports r WHERE r.designer_id = d.id)
+    ''')
+
+
+def _popularity(cur, sqlite):
+    """A designer_stats row for every designer, and hourly shortlist counts for trending"""
+    if sqlite:
+        # Zero rows too, so popularity order is a walk of the shortlist_count index
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_popularity_insert AFTER INSERT ON designers BEGIN
+                INSERT OR IGNORE INTO designer_stats (designer_id) VALUES (new.id);
+            END
+        ''')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS shortlist_buckets (
+                bucket INTEGER NOT NULL,
+                designer_id INTEGER NOT NULL REFERENCES designers(id),
+                adds INTEGER NOT NULL,
+                PRIMARY KEY (bucket, designer_id)
+            ) WITHOUT ROWID
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS shortlists_buckets_insert AFTER INSERT ON shortlists BEGIN
+                INSERT INTO shortlist_buckets (bucket, designer_id, adds)
+                VALUES (CAST(strftime('%s', 'now') AS INTEGER) / {SHORTLIST_BUCKET_SECONDS},
+                        new.designer_id, 1)
+                ON CONFLICT (bucket, designer_id) DO UPDATE SET adds = adds + 1;
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_buckets_delete AFTER DELETE ON designers BEGIN
+                DELETE FROM shortlist_buckets WHERE designer_id = old.id;
+            END
+        ''')
+        cur.execute('INSERT OR IGNORE INTO designer_stats (designer_id) SELECT id FROM designers')
+        created_bucket = f"CAST(strftime('%s', created_at) AS INTEGER) / {SHORTLIST_BUCKET_SECONDS}"
+    else:
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION designer_stats_seed() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO designer_stats (designer_id)
+                SELECT id FROM new_rows ORDER BY id
+                ON CONFLICT (designer_id) DO NOTHING;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cur.execute('DROP TRIGGER IF EXISTS designers_popularity_insert ON designers')
+        cur.execute('''
+            CREATE TRIGGER designers_popularity_insert
+            AFTER INSERT ON designers REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION designer_stats_seed()
+        ''')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS shortlist_buckets (
+                bucket INTEGER NOT NULL,
+                designer_id INTEGER NOT NULL REFERENCES designers(id) ON DELETE CASCADE,
+                adds INTEGER NOT NULL,
+                PRIMARY KEY (bucket, designer_id)
+            )
+        ''')
+        # One upsert per statement, rows taken in designer_id order like designer_stats_count
+        cur.execute(f'''
+            CREATE OR REPLACE FUNCTION shortlist_buckets_count() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO shortlist_buckets (bucket, designer_id, adds)
+                SELECT floor(extract(epoch FROM now()) / {SHORTLIST_BUCKET_SECONDS})::integer,
+                       designer_id, count(*)
+                FROM new_rows
+                GROUP BY designer_id ORDER BY designer_id
+                ON CONFLICT (bucket, designer_id)
+                DO UPDATE SET adds = shortlist_buckets.adds + EXCLUDED.adds;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cur.execute('DROP TRIGGER IF EXISTS shortlists_buckets_insert ON shortlists')
+        cur.execute('''
+            CREATE TRIGGER shortlists_buckets_insert
+            AFTER INSERT ON shortlists REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION shortlist_buckets_count()
+        ''')
+        cur.execute('''
+            INSERT INTO designer_stats (designer_id) SELECT id FROM designers
+            ON CONFLICT (designer_id) DO NOTHING
+        ''')
+        created_bucket = f'floor(extract(epoch FROM created_at) / {SHORTLIST_BUCKET_SECONDS})::integer'
+
+    # Deleting a designer removes its buckets through this index
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_shortlist_buckets_designer
+        ON shortlist_buckets (designer_id)
+    ''')
+    # Start the buckets from when the existing shortlists were made
+    cur.execute('DELETE FROM shortlist_buckets')
+    cur.execute(f'''
+        INSERT INTO shortlist_buckets (bucket, designer_id, adds)
+        SELECT {created_bucket}, designer_id, COUNT(*)
+        FROM shortlists
+        WHERE created_at IS NOT NULL
+        GROUP BY {created_bucket}, designer_id
+    ''')
+
+
+def _designer_change_notify(cur, sqlite):
+    """NOTIFY designers_changed after any statement that adds or removes designers"""
+    if sqlite:
+        # Catalogue snapshots watch PRAGMA data_version instead
+        return
+    # One notification per statement; Postgres folds duplicates within a transaction
+    cur.execute('''
+        CREATE OR REPLACE FUNCTION designers_changed_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('designers_changed', TG_OP);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    cur.execute('DROP TRIGGER IF EXISTS designers_changed_notify ON designers')
+    cur.execute('''
+        CREATE TRIGGER designers_changed_notify
+        AFTER INSERT OR DELETE ON designers
+        FOR EACH STATEMENT EXECUTE FUNCTION designers_changed_notify()
+    ''')
+
+
+def _change_feed(cur, sqlite):
+    """designers.change_seq, designer_tombstones and updated_at, maintained by triggers"""
+    # Rows already present start at position 0 and are ordered by id within it
+    if sqlite:
+        cur.execute('ALTER TABLE designers ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designer_tombstones (
+                designer_id INTEGER PRIMARY KEY,
+                change_seq INTEGER NOT NULL,
+                deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # SQLite commits one writer at a time, so a plain counter numbers changes in commit order
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS change_sequence (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                value INTEGER NOT NULL
+            )
+        ''')
+        cur.execute('INSERT OR IGNORE INTO change_sequence (id, value) VALUES (1, 0)')
+        stamp = '''
+            UPDATE change_sequence SET value = value + 1;
+            UPDATE designers SET change_seq = (SELECT value FROM change_sequence),
+                                 updated_at = CURRENT_TIMESTAMP
+            WHERE id = new.id;
+        '''
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS designers_change_insert AFTER INSERT ON designers BEGIN
+                {stamp}
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS designers_change_update
+            AFTER UPDATE OF {_API_JSON_SOURCE_COLUMNS} ON designers BEGIN
+                {stamp}
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS designers_change_delete AFTER DELETE ON designers BEGIN
+                UPDATE change_sequence SET value = value + 1;
+                INSERT INTO designer_tombstones (designer_id, change_seq)
+                VALUES (old.id, (SELECT value FROM change_sequence))
+                ON CONFLICT (designer_id) DO UPDATE
+                SET change_seq = excluded.change_seq, deleted_at = CURRENT_TIMESTAMP;
+            END
+        ''')
+    else:
+        cur.execute('ALTER TABLE designers ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT 0')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS designer_tombstones (
+                designer_id INTEGER PRIMARY KEY,
+                change_seq BIGINT NOT NULL,
+                deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Concurrent writers commit out of order, so changes are stamped with their
+        # transaction id and readers only go up to the oldest one still running
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION designers_stamp_change() RETURNS trigger AS $$
+            BEGIN
+                NEW.change_seq := pg_current_xact_id()::text::bigint;
+                NEW.updated_at := CURRENT_TIMESTAMP;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cur.execute('DROP TRIGGER IF EXISTS designers_stamp_change ON designers')
+        cur.execute(f'''
+            CREATE TRIGGER designers_stamp_change
+            BEFORE INSERT OR UPDATE OF {_API_JSON_SOURCE_COLUMNS} ON designers
+            FOR EACH ROW EXECUTE FUNCTION designers_stamp_change()
+        ''')
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION designers_tombstone() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO designer_tombstones (designer_id, change_seq)
+                SELECT id, pg_current_xact_id()::text::bigint FROM old_rows
+                ORDER BY id
+                ON CONFLICT (designer_id) DO UPDATE
+                SET change_seq = EXCLUDED.change_seq, deleted_at = CURRENT_TIMESTAMP;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cur.execute('DROP TRIGGER IF EXISTS designers_tombstone ON designers')
+        cur.execute('''
+            CREATE TRIGGER designers_tombstone
+            AFTER DELETE ON designers REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION designers_tombstone()
+        ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_designers_change_seq ON designers (change_seq, id)')
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_designer_tombstones_change_seq
+        ON designer_tombstones (change_seq, designer_id)
+    ''')
+
+
+def _specialty_text(cur, sqlite):
+    """designer_specialties.specialty as TEXT on Postgres, like designers.specialties itself"""
+    if sqlite:
+        # Already TEXT
+        return
+    # VARCHAR(100) made the index trigger reject designers with a longer specialty.
+    # VARCHAR to TEXT is binary compatible, so neither the table nor its index is rewritten
+    cur.execute('ALTER TABLE designer_specialties ALTER COLUMN specialty TYPE TEXT')
+
+
+def _insert_stamps(cur, sqlite):
+    """Let an insert supply api_json and change_seq rather than have triggers rewrite the row"""
+    if not sqlite:
+        # BEFORE triggers already fill both in before the row is written
+        return
+    # Each AFTER INSERT UPDATE wrote every new row a second and third time. Bulk
+    # imports now set both columns themselves; other inserts leave them unset
+    cur.execute('DROP TRIGGER IF EXISTS designers_api_json_insert')
+    cur.execute(f'''
+        CREATE TRIGGER designers_api_json_insert AFTER INSERT ON designers
+        WHEN new.api_json IS NULL BEGIN
+            UPDATE designers SET api_json = {SQLITE_API_JSON.format(row='new')}
+            WHERE id = new.id;
+        END
+    ''')
+    # The counter still advances once per row, so a supplied change_seq is the value it reaches
+    cur.execute('DROP TRIGGER IF EXISTS designers_change_insert')
+    cur.execute('''
+        CREATE TRIGGER designers_change_insert AFTER INSERT ON designers BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            UPDATE designers SET change_seq = (SELECT value FROM change_sequence),
+                                 updated_at = CURRENT_TIMESTAMP
+            WHERE id = new.id AND new.change_seq = 0;
+        END
+    ''')
+
+
+# Forward-only and append-only: never edit or renumber an applied migration.
+# Each step is idempotent so databases created before versioning adopt cleanly.
+MIGRATIONS = [
+    (1, 'base_schema', _base_schema),
+    (2, 'designer_list_indexes', _designer_list_indexes),
+    (3, 'search_index', _search_index),
+    (4, 'specialties_index', _specialties_index),
+    (5, 'secondary_indexes', _secondary_indexes),
+    (6, 'precomputed_api_json', _precomputed_api_json),
+    (7, 'catalogue_stats', _catalogue_stats),
+    (8, 'popularity', _popularity),
+    (9, 'designer_change_notify', _designer_change_notify),
+    (10, 'change_feed', _change_feed),
+    (11, 'specialty_text', _specialty_text),
+    (12, 'insert_stamps', _insert_stamps),
+]
+
+
+def _begin_immediate(cur, lock_timeout):
+    """BEGIN IMMEDIATE, waiting up to lock_timeout seconds rather than the busy timeout"""
+    deadline = time.monotonic() + lock_timeout
+    waiting = False
+    while True:
+        try:
+            cur.execute('BEGIN IMMEDIATE')
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or time.monotonic() >= deadline:
+                raise
+            if not waiting:
+                print("Waiting for another worker's migration to finish")
+                waiting = True
+            time.sleep(0.1)
+
+
+def run_migrations(conn, sqlite, lock_timeout=600):
+    """Apply every pending migration in one locked transaction.
+
+    conn must be a raw DB-API connection. Concurrent callers (one per
+    gunicorn worker) queue on a lock -- SQLite's write lock via BEGIN
+    IMMEDIATE, retried for up to ``lock_timeout`` seconds since the
+    connection's busy timeout is much shorter than a long migration, or a
+    transaction-scoped advisory lock on Postgres -- and then find nothing
+    left to do. Returns the versions this call applied.
+    """
+    if sqlite:
+        previous_isolation = conn.isolation_level
+        # Autocommit mode so we control BEGIN/COMMIT around the DDL ourselves
+        conn.isolation_level = None
+    cur = conn.cursor()
+    try:
+        if sqlite:
+            _begin_immediate(cur, lock_timeout)
+        else:
+            cur.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cur.execute('SELECT version FROM schema_migrations')
+        current = {row['version'] for row in cur.fetchall()}
+
+        applied = []
+        for version, name, migrate in MIGRATIONS:
+            if version in current:
+                continue
+            started = time.monotonic()
+            migrate(cur, sqlite)
+            param = '?' if sqlite else '%s'
+            cur.execute(f'INSERT INTO schema_migrations (version, name) VALUES ({param}, {param})',
+                        (version, name))
+            print(f"Applied migration {version:03d}_{name} in {time.monotonic() - started:.2f}s")
+            applied.append(version)
+
+        if sqlite:
+            cur.execute('COMMIT')
+        else:
+            conn.commit()
+        return applied
+    except Exception:
+        if sqlite:
+            if conn.in_transaction:
+                cur.execute('ROLLBACK')
+        else:
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
+        if sqlite:
+            conn.isolation_level = previous_isolation
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+from db_pool import PoolTimeout
+
+
+class _Replica:
+    __slots__ = ('name', 'pool', 'down_until', 'borrows', 'failures')
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.down_until = 0.0
+        self.borrows = 0
+        self.failures = 0
+
+
+class ReplicaRouter:
+    """Spreads read-only connections over read replicas, each with its own pool.
+
+    acquire() picks a healthy replica -- the one with the fewest
+    connections checked out by this process (``least_outstanding``), or
+    simply the next one (``round_robin``) -- and returns None when the
+    read is pinned or every replica is down, so the caller reads from the
+    primary. A replica whose
+    connection attempt or health check fails is skipped for
+    ``retry_interval`` seconds and then tried again by the next borrow.
+
+    Read-your-writes: note_write() pins a session's reads to the primary
+    for ``window`` seconds, and note_generation() does the same for every
+    read once the response cache generation changes, so a lagging replica
+    cannot refill the cache with rows from before the write.
+    """
+
+    def __init__(self, replicas, strategy='least_outstanding', retry_interval=10.0,
+                 window=5.0, max_sessions=10000):
+        self.strategy = strategy
+        self.retry_interval = retry_interval
+        self.window = window
+        self.max_sessions = max_sessions
+        self._replicas = [_Replica(name, pool) for name, pool in replicas]
+        self._lock = threading.Lock()
+        self._next = 0
+        self._sessions = OrderedDict()
+        self._generation = None
+        self._generation_changed_at = float('-inf')
+        self._primary_reads = 0
+
+    def _candidates(self, now):
+        healthy = [replica for replica in self._replicas if replica.down_until <= now]
+        if not healthy:
+            return healthy
+        with self._lock:
+            start = self._next % len(healthy)
+            self._next += 1
+        # Rotating the start spreads ties evenly under least_outstanding too
+        healthy = healthy[start:] + healthy[:start]
+        if self.strategy == 'least_outstanding':
+            healthy.sort(key=lambda replica: replica.pool.stats()['checked_out'])
+        return healthy
+
+    def acquire(self, pinned=False):
+        """A pooled connection to a replica, or None when the primary should be used"""
+        now = time.monotonic()
+        for replica in [] if pinned else self._candidates(now):
+            try:
+                conn = replica.pool.acquire()
+            except PoolTimeout:
+                # Busy rather than broken
+                continue
+            except Exception as e:
+                print(f"Read replica {replica.name} unavailable: {e}")
+                with self._lock:
+                    replica.failures += 1
+                    replica.down_until = now + self.retry_interval
+                continue
+            with self._lock:
+                replica.borrows += 1
+            return conn
+        with self._lock:
+            self._primary_reads += 1
+        return None
+
+    def note_write(self, user_session=None):
+        """Send this session's reads to the primary for the next ``window`` seconds"""
+        if not user_session:
+            return
+        with self._lock:
+            self._sessions[user_session] = time.monotonic() + self.window
+            self._sessions.move_to_end(user_session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def note_generation(self, generation):
+        """Record the response cache generation seen by a read"""
+        with self._lock:
+            if generation != self._generation:
+                if self._generation is not None:
+                    self._generation_changed_at = time.monotonic()
+                self._generation = generation
+
+    def pinned(self, user_session=None):
+        """True when a read must go to the primary to see a recent write"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._generation_changed_at < self.window:
+                return True
+            if not user_session:
+                return False
+            until = self._sessions.get(user_session)
+            if until is None:
+                return False
+            if until <= now:
+                del self._sessions[user_session]
+                return False
+            return True
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            stats = {
+                'replicas': len(self._replicas),
+                'healthy': sum(1 for replica in self._replicas if replica.down_until <= now),
+                'primary_reads': self._primary_reads,
+                'pinned_sessions': len(self._sessions),
+            }
+            for index, replica in enumerate(self._replicas):
+                stats[f'replica{index}_healthy'] = int(replica.down_until <= now)
+                stats[f'replica{index}_borrows'] = replica.borrows
+                stats[f'replica{index}_failures'] = replica.failures
+                stats[f'replica{index}_checked_out'] = replica.pool.stats()['checked_out']
+            return stats
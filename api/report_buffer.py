@@ -0,0 +1,120 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class ReportWriteBehind:
+    """Bounded in-process queue of reports drained by a background flusher.
+
+    Requests enqueue and return at once. The flusher thread inserts queued
+    reports in one transaction per batch, whenever ``batch_size`` reports are
+    waiting or ``flush_interval`` seconds have passed. A full queue pushes
+    back on callers instead of growing, and pending reports are flushed when
+    the process exits.
+    """
+
+    def __init__(self, flush, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 put_timeout=0.5):
+        self._flush = flush
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._queued = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._failed = 0
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        # Started lazily, and again after a fork, since threads do not survive fork()
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='report-flusher', daemon=True)
+                self._thread.start()
+
+    def submit(self, report):
+        """Queue a report; returns False when the queue stayed full (caller should back off)"""
+        self._ensure_started()
+        try:
+            self._queue.put(report, timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._queued += 1
+        return True
+
+    def _take_batch(self):
+        """Wait for the first report, then gather more until the batch or deadline fills"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            # flush returns how many of the reports it could not store
+            failed = self._flush(batch)
+        except Exception as e:
+            print(f"Error flushing {len(batch)} reports: {e}")
+            failed = len(batch)
+        with self._lock:
+            self._flushed += len(batch) - failed
+            self._failed += failed
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+    def shutdown(self, timeout=10.0):
+        """Stop the flusher and write out everything still queued"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'queued': self._queued,
+                'flushed': self._flushed,
+                'dropped': self._dropped,
+                'failed': self._failed,
+            }
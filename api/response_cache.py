@@ -0,0 +1,285 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the shared cache needs flock()
+    fcntl = None
+
+
+class CachedBody:
+    """Serialized response body with its strong validator"""
+    __slots__ = ('body', 'mimetype', 'etag')
+
+    def __init__(self, body, mimetype, etag=None):
+        self.body = body
+        self.mimetype = mimetype
+        # Content hash, so every worker derives the same ETag for the same data
+        self.etag = etag or hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """Per-process LRU of serialized GET response bodies.
+
+    Writers call invalidate(), which drops every entry and bumps the
+    generation. A reader that started before the bump passes the generation
+    it saw to put(), so a body computed from pre-write data is never stored.
+    invalidate() only reaches this process, so entries also expire after
+    ``ttl`` seconds: that bounds how long other workers serve bodies from
+    before a write they did not see.
+    """
+
+    def __init__(self, max_entries=256, ttl=5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._not_modified = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] <= time.monotonic():
+                del self._entries[key]
+                cached = None
+            if cached is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return cached[1]
+
+    def put(self, key, body, mimetype, generation):
+        entry = CachedBody(body, mimetype)
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return entry
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, entry)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'not_modified': self._not_modified,
+                'invalidations': self._invalidations,
+                'generation': self._generation,
+            }
+
+
+# Shared cache file layout: a header, then fixed-size slots grouped in sets of SLOT_WAYS
+_HEADER = struct.Struct('<8sQQQQ')  # magic, generation, slots, slot bytes, store counter
+_HEADER_BYTES = 64
+_SLOT = struct.Struct('<QQ20s40sB32sI')  # generation, store stamp, key sha1, etag, mimetype, body length
+_MAGIC = b'ECRC0001'
+SLOT_WAYS = 4
+
+
+class SharedResponseCache:
+    """ResponseCache whose entries and generation live in one memory-mapped file.
+
+    Every worker on the host maps the same file (put it on /dev/shm), so a
+    body rendered by one worker is served by all of them, and invalidate()
+    in any worker bumps the shared generation: entries stamped with an
+    older one stop matching everywhere at once. Each key hashes to a set
+    of SLOT_WAYS slots of ``slot_bytes``; a full set reuses its oldest
+    slot. flock() orders readers and writers across processes. Bodies too
+    big for a slot are kept per process, still checked against the shared
+    generation. A worker bumps the generation when it first maps the file,
+    since the database may have changed while no worker was running.
+    """
+
+    def __init__(self, path, max_entries=256, slot_bytes=128 * 1024, max_oversize=16):
+        self.path = path
+        self.max_entries = max_entries
+        self.slot_bytes = slot_bytes
+        self.max_oversize = max_oversize
+        self._sets = max(1, -(-max_entries // SLOT_WAYS))
+        self._size = _HEADER_BYTES + self._sets * SLOT_WAYS * slot_bytes
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._oversize = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._not_modified = 0
+
+    def _attach(self):
+        """Map the file once per process; flock() locks do not survive a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                magic, generation, slots, slot_bytes, stamp = _HEADER.unpack(
+                    os.pread(fd, _HEADER.size, 0).ljust(_HEADER.size, b'\0'))
+                if (magic != _MAGIC or slots != self._sets * SLOT_WAYS or slot_bytes != self.slot_bytes
+                        or os.fstat(fd).st_size != self._size):
+                    # New file or another layout: start from zeroed slots
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self._size)
+                    stamp = 0
+                os.pwrite(fd, _HEADER.pack(_MAGIC, generation + 1, self._sets * SLOT_WAYS,
+                                           self.slot_bytes, stamp), 0)
+                self._map = mmap.mmap(fd, self._size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._oversize.clear()
+            self._pid = os.getpid()
+
+    def _locked(self, operation):
+        fcntl.flock(self._fd, operation)
+
+    def _generation(self):
+        return struct.unpack_from('<Q', self._map, 8)[0]
+
+    def _set_offsets(self, digest):
+        first = int.from_bytes(digest[:8], 'little') % self._sets * SLOT_WAYS
+        return [_HEADER_BYTES + (first + way) * self.slot_bytes for way in range(SLOT_WAYS)]
+
+    @property
+    def generation(self):
+        self._attach()
+        return self._generation()
+
+    def get(self, key):
+        self._attach()
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        with self._lock:
+            self._locked(fcntl.LOCK_SH)
+            try:
+                generation = self._generation()
+                entry = None
+                for offset in self._set_offsets(digest):
+                    slot_generation, _, slot_digest, etag, mimetype_length, mimetype, length = \
+                        _SLOT.unpack_from(self._map, offset)
+                    if slot_generation == generation and slot_digest == digest:
+                        start = offset + _SLOT.size
+                        entry = CachedBody(self._map[start:start + length],
+                                           mimetype[:mimetype_length].decode('ascii'),
+                                           etag.decode('ascii'))
+                        break
+            finally:
+                self._locked(fcntl.LOCK_UN)
+            if entry is None:
+                local = self._oversize.get(key)
+                if local is not None and local[0] == generation:
+                    entry = local[1]
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return entry
+
+    def put(self, key, body, mimetype, generation):
+        entry = CachedBody(body, mimetype)
+        if self.max_entries <= 0:
+            return entry
+        self._attach()
+        mimetype_bytes = mimetype.encode('ascii')
+        if len(body) > self.slot_bytes - _SLOT.size or len(mimetype_bytes) > 32:
+            with self._lock:
+                if generation == self._generation():
+                    self._oversize[key] = (generation, entry)
+                    self._oversize.move_to_end(key)
+                    while len(self._oversize) > self.max_oversize:
+                        self._oversize.popitem(last=False)
+            return entry
+
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        with self._lock:
+            self._locked(fcntl.LOCK_EX)
+            try:
+                magic, current, slots, slot_bytes, stamp = _HEADER.unpack_from(self._map, 0)
+                if generation != current:
+                    return entry
+                # The slot already holding this key, else a stale one, else the oldest
+                chosen = None
+                chosen_rank = None
+                for offset in self._set_offsets(digest):
+                    slot_generation, slot_stamp, slot_digest = _SLOT.unpack_from(self._map, offset)[:3]
+                    if slot_generation == current and slot_digest == digest:
+                        chosen = offset
+                        break
+                    rank = (slot_generation == current, slot_stamp)
+                    if chosen is None or rank < chosen_rank:
+                        chosen, chosen_rank = offset, rank
+                stamp += 1
+                _HEADER.pack_into(self._map, 0, magic, current, slots, slot_bytes, stamp)
+                _SLOT.pack_into(self._map, chosen, current, stamp, digest, entry.etag.encode('ascii'),
+                                len(mimetype_bytes), mimetype_bytes, len(body))
+                start = chosen + _SLOT.size
+                self._map[start:start + len(body)] = body
+            finally:
+                self._locked(fcntl.LOCK_UN)
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def invalidate(self):
+        self._attach()
+        with self._lock:
+            self._locked(fcntl.LOCK_EX)
+            try:
+                struct.pack_into('<Q', self._map, 8, self._generation() + 1)
+            finally:
+                self._locked(fcntl.LOCK_UN)
+            self._oversize.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        self._attach()
+        with self._lock:
+            generation = self._generation()
+            entries = sum(
+                1 for index in range(self._sets * SLOT_WAYS)
+                if struct.unpack_from('<Q', self._map, _HEADER_BYTES + index * self.slot_bytes)[0] == generation)
+            return {
+                'entries': entries,
+                'max_entries': self._sets * SLOT_WAYS,
+                'oversize_entries': sum(1 for cached, _ in self._oversize.values() if cached == generation),
+                'hits': self._hits,
+                'misses': self._misses,
+                'not_modified': self._not_modified,
+                'invalidations': self._invalidations,
+                'generation': generation,
+            }
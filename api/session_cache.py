@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionShortlistCache:
+    """Per-process LRU of each recent session's shortlisted designer ids.
+
+    Toggles made through this worker update cached sessions in place. Writes
+    handled by other workers are only picked up once an entry is older than
+    ``ttl`` seconds, which bounds how stale a multi-worker read can be.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=30.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        # Bumped on every mutation so a slow DB read cannot overwrite a newer update
+        self._version = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self, user_session):
+        with self._lock:
+            cached = self._sessions.get(user_session)
+            if cached is None or time.monotonic() - cached[0] > self.ttl:
+                self._misses += 1
+                return None
+            self._sessions.move_to_end(user_session)
+            self._hits += 1
+            return sorted(cached[1])
+
+    def put(self, user_session, designer_ids, version):
+        if self.max_sessions <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._sessions[user_session] = (time.monotonic(), set(designer_ids))
+            self._sessions.move_to_end(user_session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def apply(self, user_session, designer_id, shortlisted):
+        """Record a committed toggle for a session that is already cached"""
+        with self._lock:
+            self._version += 1
+            cached = self._sessions.get(user_session)
+            if cached is None:
+                return
+            if shortlisted:
+                cached[1].add(designer_id)
+            else:
+                cached[1].discard(designer_id)
+            self._sessions.move_to_end(user_session)
+
+    def forget_designer(self, designer_id):
+        """Drop a deleted designer from every cached session"""
+        with self._lock:
+            self._version += 1
+            for _, designer_ids in self._sessions.values():
+                designer_ids.discard(designer_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+
+
+def connect(path, readonly=False, busy_timeout=5.0, mmap_bytes=0, cache_kib=0, cached_statements=256,
+            wal=False):
+    """Open a SQLite connection for the pool.
+
+    With wal=True the database is switched to WAL journaling (a persistent
+    setting) with synchronous=NORMAL, which is durable against application
+    crashes and only risks the last commits on power loss. Writer
+    connections begin transactions with BEGIN IMMEDIATE, so a writer waits
+    for the write lock up front instead of failing when it upgrades a read
+    lock. Read-only connections open the file with mode=ro and never block
+    or take the write lock. Automatic checkpoints are left to
+    WalCheckpointer.
+    """
+    if readonly:
+        uri = 'file:' + urllib.request.pathname2url(os.path.abspath(path)) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=busy_timeout, check_same_thread=False,
+                               cached_statements=cached_statements)
+    else:
+        conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False,
+                               cached_statements=cached_statements,
+                               isolation_level='IMMEDIATE' if wal else '')
+    if wal:
+        if not readonly:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA wal_autocheckpoint=0')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    if mmap_bytes:
+        conn.execute(f'PRAGMA mmap_size={int(mmap_bytes)}')
+    if cache_kib:
+        # Negative means KiB rather than pages
+        conn.execute(f'PRAGMA cache_size=-{int(cache_kib)}')
+    conn.row_factory = sqlite3.Row  # This makes rows behave like dictionaries
+    return conn
+
+
+class WalCheckpointer:
+    """Checkpoints the WAL of a SQLite database from a background thread.
+
+    Every ``interval`` seconds it runs a PASSIVE checkpoint, which copies
+    what it can back into the database without waiting on anyone. When the
+    -wal file has grown past ``max_wal_bytes`` (long readers kept earlier
+    checkpoints from finishing) it runs a TRUNCATE checkpoint instead,
+    which briefly waits for readers and writers and resets the file. The
+    thread starts on first use and again after a fork.
+    """
+
+    def __init__(self, path, interval=5.0, max_wal_bytes=64 * 1024 * 1024, busy_timeout=1.0):
+        self.path = path
+        self.interval = interval
+        self.max_wal_bytes = max_wal_bytes
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._checkpoints = 0
+        self._truncations = 0
+        self._incomplete = 0
+        self._failures = 0
+        self._wal_pages = 0
+        self._last_checkpoint_ms = 0.0
+
+    def ensure_started(self):
+        if self.interval <= 0 or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='wal-checkpoint', daemon=True)
+                self._thread.start()
+
+    def _wal_size(self):
+        try:
+            return os.path.getsize(self.path + '-wal')
+        except OSError:
+            return 0
+
+    def _run(self):
+        conn = None
+        while True:
+            time.sleep(self.interval)
+            try:
+                if conn is None:
+                    conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+                self.checkpoint(conn)
+            except Exception as e:
+                print(f"Error checkpointing SQLite WAL: {e}")
+                with self._lock:
+                    self._failures += 1
+
+    def checkpoint(self, conn):
+        truncate = self._wal_size() > self.max_wal_bytes
+        started = time.perf_counter()
+        busy, wal_pages, copied = conn.execute(
+            f'PRAGMA wal_checkpoint({"TRUNCATE" if truncate else "PASSIVE"})').fetchone()
+        with self._lock:
+            self._checkpoints += 1
+            self._truncations += int(truncate and not busy)
+            # Pages still in the WAL because a reader is using them
+            self._incomplete += int(bool(busy) or copied < wal_pages)
+            self._wal_pages = wal_pages
+            self._last_checkpoint_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checkpoints': self._checkpoints,
+                'truncations': self._truncations,
+                'incomplete': self._incomplete,
+                'failures': self._failures,
+                'wal_pages': self._wal_pages,
+                'wal_bytes': self._wal_size(),
+                'last_checkpoint_ms': round(self._last_checkpoint_ms, 1),
+            }
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The API modules import each other as top-level modules, so put api/ on the path
+# whether pytest runs from api/ or from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+import unittest
+
+from catalogue_snapshot import Snapshot, np
+
+
+def designer(designer_id, rating=4.0):
+    return (designer_id, rating, 5, 10, '$$', 'Bangalore', f'{{"id":{designer_id}}}')
+
+
+def page(snapshot, specialties):
+    rows = snapshot.list_page({'column': 'rating', 'order': 'desc', 'filters': {'specialties': specialties},
+                               'after': None, 'limit': None})
+    return sorted(row[0] for row in rows)
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class SnapshotSpecialtyTest(unittest.TestCase):
+
+    def test_specialty_filter(self):
+        snapshot = Snapshot.empty().with_rows(
+            [designer(1), designer(2), designer(3)],
+            [(1, 'Modern'), (2, 'Modern'), (2, 'Rustic'), (3, 'Rustic')])
+        self.assertEqual(page(snapshot, ['Modern']), [1, 2])
+        self.assertEqual(page(snapshot, ['Modern', 'Rustic']), [2])
+        self.assertEqual(page(snapshot, ['Minimal']), [])
+
+    def test_specialty_above_the_loaded_designers_is_dropped(self):
+        # Designer 3 was committed between reading designers and specialties
+        snapshot = Snapshot.empty().with_rows(
+            [designer(1), designer(2)], [(1, 'Modern'), (2, 'Modern'), (3, 'Modern')])
+        self.assertEqual(page(snapshot, ['Modern']), [1, 2])
+
+        snapshot = snapshot.with_rows([designer(3)], [(3, 'Modern')])
+        self.assertEqual(page(snapshot, ['Modern']), [1, 2, 3])
+
+    def test_specialty_in_an_id_gap_is_not_given_to_a_neighbour(self):
+        snapshot = Snapshot.empty().with_rows(
+            [designer(1), designer(3)], [(1, 'Modern'), (2, 'Rustic'), (3, 'Modern')])
+        self.assertEqual(page(snapshot, ['Rustic']), [])
+        self.assertEqual(page(snapshot, ['Modern']), [1, 3])
+
+    def test_filter_ignores_ids_outside_the_snapshot(self):
+        snapshot = Snapshot.empty().with_rows([designer(1), designer(3)], [(1, 'Modern')])
+        snapshot.specialties['Modern'] = np.array([1, 2, 7], np.int64)
+        self.assertEqual(page(snapshot, ['Modern']), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Stands in for a DB-API connection and records what the pool does to it"""
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.healthy = True
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        if not self.healthy:
+            raise sqlite3.OperationalError('server closed the connection')
+        return sqlite3.connect(':memory:').cursor()
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+    def connect(self):
+        raw = FakeConnection()
+        self.created.append(raw)
+        return raw
+
+    def pool(self, **options):
+        return ConnectionPool(self.connect, **options)
+
+    def test_returned_connection_is_reused(self):
+        pool = self.pool()
+        conn = pool.acquire()
+        raw = conn.raw
+        self.assertEqual(pool.stats()['checked_out'], 1)
+        conn.close()
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertEqual(pool.stats(), {'max_size': 5, 'checked_out': 0, 'idle': 1, 'waiting': 0,
+                                        'created': 1, 'recycled': 0})
+        self.assertIs(pool.acquire().raw, raw)
+        self.assertEqual(len(self.created), 1)
+
+    def test_close_twice_returns_once(self):
+        pool = self.pool()
+        conn = pool.acquire()
+        conn.close()
+        conn.close()
+        self.assertEqual(pool.stats()['idle'], 1)
+        with self.assertRaises(AttributeError):
+            conn.cursor()
+
+    def test_invalidated_connection_is_closed(self):
+        pool = self.pool()
+        conn = pool.acquire()
+        raw = conn.raw
+        conn.invalidate()
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+        self.assertEqual(pool.stats()['recycled'], 1)
+        self.assertIsNot(pool.acquire().raw, raw)
+
+    def test_acquire_times_out_when_exhausted(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        held = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        held.close()
+        pool.acquire()
+
+    def test_waiter_gets_a_returned_connection(self):
+        pool = self.pool(max_size=1, timeout=5)
+        held = pool.acquire()
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+        waiter.start()
+        while pool.stats()['waiting'] == 0:
+            pass
+        held.close()
+        waiter.join(5)
+        self.assertEqual(len(borrowed), 1)
+        self.assertEqual(len(self.created), 1)
+
+    def test_connect_failure_frees_the_slot(self):
+        def connect():
+            raise sqlite3.OperationalError('unable to open database file')
+        pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(sqlite3.OperationalError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['checked_out'], 0)
+
+    def test_dead_idle_connection_is_replaced(self):
+        pool = self.pool(ping_after=0)
+        conn = pool.acquire()
+        raw = conn.raw
+        conn.close()
+        raw.healthy = False
+        self.assertIsNot(pool.acquire().raw, raw)
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_idle_and_old_connections_are_recycled(self):
+        for options in ({'max_idle': 10}, {'max_lifetime': 10}):
+            with self.subTest(**options):
+                self.created = []
+                pool = self.pool(**options)
+                with mock.patch('db_pool.time.monotonic', return_value=1000.0):
+                    pool.acquire().close()
+                with mock.patch('db_pool.time.monotonic', return_value=1011.0):
+                    pool.acquire()
+                self.assertEqual(len(self.created), 2)
+                self.assertTrue(self.created[0].closed)
+                self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_forked_child_starts_over(self):
+        pool = self.pool()
+        parent_idle = pool.acquire()
+        borrowed = pool.acquire()
+        parent_raw, borrowed_raw = parent_idle.raw, borrowed.raw
+        parent_idle.close()
+
+        with mock.patch('db_pool.os.getpid', return_value=os.getpid() + 1):
+            conn = pool.acquire()
+            self.assertNotIn(conn.raw, (parent_raw, borrowed_raw))
+            self.assertEqual(pool.stats()['created'], 1)
+            # The parent's connections are neither reused nor closed by the child
+            borrowed.close()
+            self.assertFalse(parent_raw.closed)
+            self.assertFalse(borrowed_raw.closed)
+            self.assertEqual(borrowed_raw.rollbacks, 0)
+            self.assertEqual(pool.stats()['checked_out'], 1)
+            self.assertEqual(pool.stats()['idle'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from designer_repository import DesignerRepository, designer_values
+from migrations import SQLITE_API_JSON, run_migrations
+
+
+def designer(name, **fields):
+    data = {'name': name, 'rating': 4.5, 'description': 'Interiors', 'projects': 10, 'experience': 5,
+            'price_range': '$$', 'phone1': '+91-9876543210', 'phone2': '+91-9876543211',
+            'location': 'Bangalore', 'specialties': ['Modern'], 'portfolio': ['https://example.com/1.jpg']}
+    data.update(fields)
+    return data
+
+
+class SQLiteBulkInsertTest(unittest.TestCase):
+    """insert_many() writes api_json and change_seq itself; the result must match the triggers"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.conn = sqlite3.connect(os.path.join(self.tmp, 'test.db'))
+        self.conn.row_factory = sqlite3.Row
+        self.addCleanup(self.conn.close)
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_migrations(self.conn, True)
+        self.repository = DesignerRepository(True)
+
+    def insert_many(self, designers):
+        self.repository.insert_many(self.conn, [designer_values(data) for data in designers])
+        self.conn.commit()
+
+    def rows(self):
+        return self.conn.execute(f'''
+            SELECT id, name, api_json, {SQLITE_API_JSON.format(row='designers')} AS expected, change_seq
+            FROM designers ORDER BY id
+        ''').fetchall()
+
+    def test_api_json_matches_the_trigger(self):
+        self.insert_many([
+            designer('Plain'),
+            # Values the column affinity converts: the JSON must show them as stored
+            designer('Whole rating', rating=4, projects='12', experience=3.0),
+            designer(12345, price_range='$', specialties=['Modern', 'Rustic'], portfolio=[]),
+            designer('Unicode ✓ "quoted"', description='Line\nbreak'),
+        ])
+        designer_id = self.repository.insert(self.conn, designer('Single'))
+        self.conn.commit()
+
+        rows = self.rows()
+        self.assertEqual(len(rows), 5)
+        for row in rows:
+            with self.subTest(name=row['name']):
+                self.assertEqual(row['api_json'], row['expected'])
+        self.assertEqual(rows[-1]['id'], designer_id)
+        self.assertIn('"rating":4.0', rows[1]['api_json'])
+        self.assertIn('"projects":12', rows[1]['api_json'])
+        self.assertIn('"name":"12345"', rows[2]['api_json'])
+
+    def test_ids_and_change_seq_continue_across_batches(self):
+        self.insert_many([designer(f'First {i}') for i in range(3)])
+        self.repository.insert(self.conn, designer('Single'))
+        self.conn.commit()
+        self.insert_many([designer(f'Second {i}') for i in range(3)])
+
+        rows = self.rows()
+        self.assertEqual([row['id'] for row in rows], list(range(1, 8)))
+        self.assertEqual([row['change_seq'] for row in rows], list(range(1, 8)))
+        self.assertEqual(self.conn.execute('SELECT value FROM change_sequence').fetchone()[0], 7)
+        self.assertEqual([row['name'] for row in rows][4:], ['Second 0', 'Second 1', 'Second 2'])
+
+    def test_deleted_ids_are_not_reused(self):
+        self.insert_many([designer(f'Designer {i}') for i in range(3)])
+        self.conn.execute('DELETE FROM designers WHERE id = 3')
+        self.conn.commit()
+        self.insert_many([designer('After delete')])
+        self.assertEqual([row['id'] for row in self.rows()], [1, 2, 4])
+
+    def test_other_triggers_still_run(self):
+        self.insert_many([designer('Searchable Studio', specialties=['Modern', 'Rustic'])])
+        self.assertEqual(self.conn.execute(
+            "SELECT rowid FROM designers_fts WHERE designers_fts MATCH 'searchable'").fetchall()[0][0], 1)
+        self.assertEqual([row[0] for row in self.conn.execute(
+            'SELECT specialty FROM designer_specialties ORDER BY specialty')], ['Modern', 'Rustic'])
+        self.assertEqual(self.conn.execute(
+            "SELECT value FROM catalogue_stats WHERE name = 'designers'").fetchone()[0], 1)
+        self.assertEqual(self.conn.execute('SELECT count(*) FROM designer_stats').fetchone()[0], 1)
+
+    def test_failed_batch_inserts_nothing(self):
+        self.insert_many([designer('Kept')])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.repository.insert_many(self.conn, [designer_values(designer('Fine')),
+                                                    designer_values(designer('Broken', projects=None))])
+        self.conn.rollback()
+        self.insert_many([designer('Next')])
+        self.assertEqual([row['name'] for row in self.rows()], ['Kept', 'Next'])
+        self.assertEqual(self.conn.execute('SELECT count(*) FROM temp.designer_import').fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import io
+import json
+import unittest
+
+from json_stream import JSONStreamError, iter_json_records
+
+RECORDS = [
+    {'name': 'Å Designer', 'rating': 2.5, 'projects': 12},
+    {'rating': 2.5e3, 'experience': -0.125, 'price': 1E-2},
+    12345678901234567890,
+    -7,
+    3.75,
+    True,
+    None,
+    'plain text ✓',
+    [1.5, 2, [], {}],
+]
+
+
+class SplitStream:
+    """Returns the data in two reads, split at a given byte offset"""
+
+    def __init__(self, data, split):
+        self._parts = [data[:split], data[split:]]
+
+    def read(self, size):
+        while self._parts:
+            part = self._parts.pop(0)
+            if part:
+                return part
+        return b''
+
+
+class IterJsonRecordsTest(unittest.TestCase):
+
+    def assertSplitsDecode(self, data):
+        for split in range(len(data) + 1):
+            with self.subTest(split=split):
+                self.assertEqual(list(iter_json_records(SplitStream(data, split))), RECORDS)
+
+    def test_ndjson_split_at_every_offset(self):
+        data = '\n'.join(json.dumps(record, ensure_ascii=False) for record in RECORDS).encode('utf-8')
+        self.assertSplitsDecode(data)
+        # A number as the last thing in the file, without a trailing newline
+        self.assertSplitsDecode(data + b'\n')
+
+    def test_array_split_at_every_offset(self):
+        self.assertSplitsDecode(json.dumps(RECORDS, ensure_ascii=False).encode('utf-8'))
+        self.assertSplitsDecode(json.dumps(RECORDS, indent=2).encode('utf-8'))
+
+    def test_every_chunk_size(self):
+        data = json.dumps(RECORDS, ensure_ascii=False).encode('utf-8')
+        for chunk_size in range(1, 40):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_records(io.BytesIO(data), chunk_size)), RECORDS)
+
+    def test_malformed_record_fails_without_reading_on(self):
+        data = b'[{"a":1},{"a":,}' + b',{"a":1}' * (3 * 1024 * 1024) + b']'
+        stream = io.BytesIO(data)
+        records = iter_json_records(stream)
+        self.assertEqual(next(records), {'a': 1})
+        with self.assertRaisesRegex(JSONStreamError, 'Malformed JSON in record 2'):
+            next(records)
+        # Stopped within the first chunk instead of buffering up to MAX_RECORD_SIZE
+        self.assertLessEqual(stream.tell(), 64 * 1024)
+
+    def test_truncated_tokens_wait_for_more_input(self):
+        for data in (b'["abc\\u00e9def"]', b'["\\ud83d\\ude00"]', b'[true, false, null]', b'[-12.5e+3]'):
+            expected = json.loads(data)
+            for split in range(len(data) + 1):
+                with self.subTest(data=data, split=split):
+                    self.assertEqual(list(iter_json_records(SplitStream(data, split))), expected)
+
+    def test_malformed_number_still_fails(self):
+        for data in (b'[2.]', b'2.\n3', b'[1e]'):
+            with self.subTest(data=data), self.assertRaises(JSONStreamError):
+                list(iter_json_records(SplitStream(data, 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
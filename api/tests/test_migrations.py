@@ -0,0 +1,93 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from migrations import MIGRATIONS, run_migrations
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SQLiteMigrationsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'test.db')
+
+    def connect(self, timeout=5.0):
+        conn = sqlite3.connect(self.path, timeout=timeout)
+        conn.row_factory = sqlite3.Row
+        self.addCleanup(conn.close)
+        return conn
+
+    def schema(self, conn):
+        return conn.execute('SELECT type, name, sql FROM sqlite_master ORDER BY type, name').fetchall()
+
+    def hold_write_lock(self):
+        holder = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(holder.close)
+        holder.execute('BEGIN IMMEDIATE')
+        return holder
+
+    def test_second_run_applies_nothing(self):
+        conn = self.connect()
+        self.assertEqual(run_migrations(conn, True), [version for version, _, _ in MIGRATIONS])
+        schema = [tuple(row) for row in self.schema(conn)]
+
+        self.assertEqual(run_migrations(self.connect(), True), [])
+        self.assertEqual([tuple(row) for row in self.schema(conn)], schema)
+
+    def test_schema_migrations_records_every_version(self):
+        conn = self.connect()
+        run_migrations(conn, True)
+        run_migrations(conn, True)
+        rows = conn.execute('SELECT version, name, applied_at FROM schema_migrations ORDER BY version').fetchall()
+        self.assertEqual([row['version'] for row in rows], list(range(1, 13)))
+        self.assertEqual([(row['version'], row['name']) for row in rows],
+                         [(version, name) for version, name, _ in MIGRATIONS])
+        self.assertTrue(all(row['applied_at'] for row in rows))
+
+    def test_migrated_database_accepts_designers(self):
+        conn = self.connect()
+        run_migrations(conn, True)
+        conn.execute("INSERT INTO designers (name, rating, description, projects, experience, price_range, "
+                     "phone1, phone2, location, specialties, portfolio) "
+                     "VALUES ('Test', 4.0, 'd', 1, 1, '$', 'p1', 'p2', 'Pune', '[\"Modern\"]', '[]')")
+        conn.commit()
+        row = conn.execute('SELECT api_json FROM designers').fetchone()
+        self.assertIn('"name":"Test"', row['api_json'].replace(' ', ''))
+
+    def test_waits_for_a_lock_held_past_the_busy_timeout(self):
+        holder = self.hold_write_lock()
+        release = threading.Timer(0.5, holder.execute, ('COMMIT',))
+        release.start()
+        self.addCleanup(release.join)
+        applied = run_migrations(self.connect(timeout=0.1), True, lock_timeout=10)
+        self.assertEqual(len(applied), len(MIGRATIONS))
+
+    def test_gives_up_after_the_lock_timeout(self):
+        holder = self.hold_write_lock()
+        conn = self.connect(timeout=0.1)
+        with self.assertRaises(sqlite3.OperationalError):
+            run_migrations(conn, True, lock_timeout=0.3)
+        holder.execute('ROLLBACK')
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(len(run_migrations(conn, True)), len(MIGRATIONS))
+
+    def test_app_refuses_to_start_when_migrating_fails(self):
+        self.hold_write_lock()
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + self.path, AUTO_MIGRATE='true',
+                   SQLITE_BUSY_TIMEOUT='0.1', MIGRATION_LOCK_TIMEOUT='0.5')
+        result = subprocess.run([sys.executable, '-c', 'import app'], cwd=API_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('Database migration failed; refusing to start', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from response_cache import ResponseCache, SharedResponseCache, fcntl
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_put_then_get(self):
+        cache = ResponseCache()
+        stored = cache.put('/api/designers?', b'{"designers":[]}', 'application/json', cache.generation)
+        entry = cache.get('/api/designers?')
+        self.assertEqual(entry.body, b'{"designers":[]}')
+        self.assertEqual(entry.mimetype, 'application/json')
+        self.assertEqual(entry.etag, stored.etag)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_etag_follows_the_body(self):
+        cache = ResponseCache()
+        first = cache.put('a', b'one', 'application/json', cache.generation)
+        again = cache.put('b', b'one', 'application/json', cache.generation)
+        other = cache.put('c', b'two', 'application/json', cache.generation)
+        self.assertEqual(first.etag, again.etag)
+        self.assertNotEqual(first.etag, other.etag)
+
+    def test_invalidate_drops_entries(self):
+        cache = ResponseCache()
+        cache.put('a', b'one', 'application/json', cache.generation)
+        cache.invalidate()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_put_from_before_an_invalidation_is_not_stored(self):
+        cache = ResponseCache()
+        generation = cache.generation
+        cache.invalidate()
+        entry = cache.put('a', b'stale', 'application/json', generation)
+        self.assertEqual(entry.body, b'stale')
+        self.assertIsNone(cache.get('a'))
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(ttl=5.0)
+        with mock.patch('response_cache.time.monotonic', return_value=100.0):
+            cache.put('a', b'one', 'application/json', cache.generation)
+        with mock.patch('response_cache.time.monotonic', return_value=104.9):
+            self.assertIsNotNone(cache.get('a'))
+        with mock.patch('response_cache.time.monotonic', return_value=105.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        for key in ('a', 'b'):
+            cache.put(key, key.encode(), 'application/json', cache.generation)
+        cache.get('a')
+        cache.put('c', b'c', 'application/json', cache.generation)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_disabled_cache_stores_nothing(self):
+        for cache in (ResponseCache(max_entries=0), ResponseCache(ttl=0)):
+            cache.put('a', b'one', 'application/json', cache.generation)
+            self.assertIsNone(cache.get('a'))
+
+
+@unittest.skipIf(fcntl is None, 'the shared cache needs fcntl')
+class SharedResponseCacheTest(unittest.TestCase):
+    """Two instances on one file stand in for two workers"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'responses')
+
+    def workers(self, **options):
+        first = SharedResponseCache(self.path, max_entries=8, slot_bytes=1024, **options)
+        second = SharedResponseCache(self.path, max_entries=8, slot_bytes=1024, **options)
+        # Mapping the file bumps the generation, so attach both before storing anything
+        first.stats()
+        second.stats()
+        return first, second
+
+    def test_body_stored_by_one_worker_is_served_by_another(self):
+        first, second = self.workers()
+        stored = first.put('a', b'{"designers":[]}', 'application/json', first.generation)
+        entry = second.get('a')
+        self.assertEqual(entry.body, b'{"designers":[]}')
+        self.assertEqual(entry.mimetype, 'application/json')
+        self.assertEqual(entry.etag, stored.etag)
+        self.assertEqual(second.stats()['entries'], 1)
+
+    def test_invalidate_reaches_every_worker(self):
+        first, second = self.workers()
+        first.put('a', b'one', 'application/json', first.generation)
+        second.invalidate()
+        self.assertEqual(first.generation, second.generation)
+        self.assertIsNone(first.get('a'))
+        self.assertIsNone(second.get('a'))
+
+    def test_put_from_before_another_workers_invalidation_is_not_stored(self):
+        first, second = self.workers()
+        generation = first.generation
+        second.invalidate()
+        first.put('a', b'stale', 'application/json', generation)
+        self.assertIsNone(first.get('a'))
+        self.assertIsNone(second.get('a'))
+
+    def test_attaching_a_new_worker_starts_a_new_generation(self):
+        first, _ = self.workers()
+        first.put('a', b'one', 'application/json', first.generation)
+        late = SharedResponseCache(self.path, max_entries=8, slot_bytes=1024)
+        self.assertIsNone(late.get('a'))
+        self.assertIsNone(first.get('a'))
+
+    def test_full_set_reuses_its_oldest_slot(self):
+        # A single set of ways: the fifth key replaces the first one stored
+        cache = SharedResponseCache(os.path.join(self.tmp, 'small'), max_entries=4, slot_bytes=1024)
+        generation = cache.generation
+        for key in 'abcde':
+            cache.put(key, key.encode(), 'application/json', generation)
+        self.assertIsNone(cache.get('a'))
+        for key in 'bcde':
+            self.assertEqual(cache.get(key).body, key.encode())
+
+    def test_oversize_bodies_stay_in_the_worker_but_follow_the_generation(self):
+        first, second = self.workers()
+        body = b'x' * 2048
+        first.put('big', body, 'application/json', first.generation)
+        self.assertEqual(first.get('big').body, body)
+        self.assertIsNone(second.get('big'))
+        self.assertEqual(first.stats()['oversize_entries'], 1)
+        second.invalidate()
+        self.assertIsNone(first.get('big'))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork()')
+    def test_forked_worker_shares_the_file(self):
+        cache = SharedResponseCache(self.path, max_entries=8, slot_bytes=1024)
+        cache.stats()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                cache.put('child', b'from child', 'application/json', cache.generation)
+                status = 0
+            finally:
+                os._exit(status)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertEqual(cache.get('child').body, b'from child')
+
+
+class CachedResponseTest(unittest.TestCase):
+    """ETag and If-None-Match handling of the cached GET endpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        environ = {'DATABASE_URL': 'sqlite:///' + os.path.join(cls.tmp, 'test.db'),
+                   'AUTO_MIGRATE': 'true', 'CATALOGUE_SNAPSHOT': 'false'}
+        cls.env = mock.patch.dict(os.environ, environ)
+        cls.env.start()
+        os.environ.pop('RESPONSE_CACHE_SHARED_PATH', None)
+        try:
+            import app
+            cls.app = importlib.reload(app)
+        except Exception:
+            cls.env.stop()
+            shutil.rmtree(cls.tmp)
+            raise
+        cls.client = cls.app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app.db_pool.close_all()
+        cls.env.stop()
+        shutil.rmtree(cls.tmp)
+
+    def add_designer(self, name):
+        response = self.client.post('/api/designers', json={
+            'name': name, 'rating': 4.5, 'description': 'Interiors', 'projects': 10,
+            'experience': 5, 'price_range': '$$', 'phone1': '+91-9876543210',
+            'phone2': '+91-9876543211', 'location': 'Bangalore', 'specialties': ['Modern'],
+            'portfolio': ['https://example.com/1.jpg']})
+        self.assertEqual(response.status_code, 201)
+
+    def test_conditional_get(self):
+        first = self.client.get('/api/designers')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertTrue(first.cache_control.no_cache)
+
+        again = self.client.get('/api/designers', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b'')
+        self.assertEqual(again.headers['ETag'], etag)
+
+        self.add_designer('Etag Designer')
+        changed = self.client.get('/api/designers', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertIn(b'Etag Designer', changed.data)
+
+    def test_each_query_has_its_own_etag(self):
+        self.add_designer('Query Designer')
+        everyone = self.client.get('/api/designers')
+        filtered = self.client.get('/api/designers?location=Nowhere')
+        self.assertNotEqual(everyone.headers['ETag'], filtered.headers['ETag'])
+        stale = self.client.get('/api/designers?location=Nowhere',
+                                headers={'If-None-Match': everyone.headers['ETag']})
+        self.assertEqual(stale.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
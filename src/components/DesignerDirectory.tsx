@@ -36,6 +36,30 @@ interface Designer {
   portfolio: string[];
 }
 
+interface DesignerChanges {
+  designers: Designer[];
+  deleted: number[];
+  cursor: string;
+  has_more: boolean;
+}
+
+interface DesignerCache {
+  cursor: string;
+  designers: Designer[];
+}
+
+// Last synced catalogue; later visits only fetch what changed since its cursor
+const DESIGNER_CACHE_KEY = 'emptycup.designers';
+
+const readDesignerCache = (): DesignerCache | null => {
+  try {
+    const raw = localStorage.getItem(DESIGNER_CACHE_KEY);
+    return raw ? JSON.parse(raw) : null;
+  } catch {
+    return null;
+  }
+};
+
 interface SortOption {
   label: string;
   key: keyof Designer;
@@ -80,6 +104,7 @@ const DesignerDirectory = () => {
     console.log('Environment in DesignerDirectory:', import.meta.env);
     console.log('VITE_API_BASE_URL in DesignerDirectory:', import.meta.env.VITE_API_BASE_URL);
     loadDesigners();
+    loadShortlist();
   }, []);
 
   useEffect(() => {
@@ -94,28 +119,55 @@ const DesignerDirectory = () => {
       const controller = new AbortController();
       const timeoutId = setTimeout(() => controller.abort(), 10000); // 10 second timeout
 
-      const response = await fetch(`${apiUrl}/designers`, {
-        method: 'GET',
-        headers: {
-          'Accept': 'application/json',
-          'Content-Type': 'application/json',
-        },
-        signal: controller.signal
-      });
+      const cached = readDesignerCache();
+      const byId = new Map<number, Designer>((cached?.designers ?? []).map(designer => [designer.id, designer]));
+      let cursor = cached?.cursor;
+      let hasMore = true;
+
+      while (hasMore) {
+        const params = new URLSearchParams({ limit: '5000' });
+        if (cursor) {
+          params.set('since', cursor);
+        }
+        const response = await fetch(`${apiUrl}/designers/changes?${params}`, {
+          method: 'GET',
+          headers: {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+          },
+          signal: controller.signal
+        });
+        console.log('Response status:', response.status);
+
+        if (response.status === 400 && cursor) {
+          // The cached cursor is not valid for this server; sync from scratch
+          byId.clear();
+          cursor = undefined;
+          continue;
+        }
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status} ${response.statusText}`);
+        }
+
+        const changes: DesignerChanges = await response.json();
+        changes.designers.forEach(designer => byId.set(designer.id, designer));
+        changes.deleted.forEach(id => byId.delete(id));
+        cursor = changes.cursor;
+        hasMore = changes.has_more;
+      }
 
       clearTimeout(timeoutId);
-      console.log('Response status:', response.status);
-      console.log('Response headers:', Object.fromEntries(response.headers.entries()));
 
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status} ${response.statusText}`);
-      }
-
-      const data = await response.json();
+      const data = Array.from(byId.values());
       console.log('Loaded designers:', data.length, 'designers');
-      console.log('First designer:', data[0]);
       setDesigners(data);
       setApiError(null);
+      try {
+        localStorage.setItem(DESIGNER_CACHE_KEY, JSON.stringify({ cursor, designers: data }));
+      } catch (storageError) {
+        // Over quota: the next visit syncs from scratch again
+        console.warn('Could not cache designers:', storageError);
+      }
     } catch (error) {
       console.error('Error loading designers:', error);
       const errorMessage = error instanceof Error ? error.message : 'Unknown error occurred';
@@ -132,6 +184,28 @@ const DesignerDirectory = () => {
     }
   };
 
+  const loadShortlist = async () => {
+    try {
+      const apiUrl = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5001/api';
+      const response = await fetch(`${apiUrl}/shortlists?user_session=default_session`, {
+        method: 'GET',
+        headers: {
+          'Accept': 'application/json',
+        }
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      setShortlistedIds(new Set<number>(data.designer_ids));
+    } catch (error) {
+      // Shortlist starts empty if it cannot be restored; toggling still works
+      console.error('Error loading shortlist:', error);
+    }
+  };
+
   const applyFilters = () => {
     let filtered = designers.filter(designer => !hiddenIds.has(designer.id));
 